@@ -0,0 +1,153 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from run_new_model import fit_base_metabolism, simulate_weight
+
+# Arrays shared by every refit, set once per worker process by `_init_worker`.
+_SHARED = {}
+
+
+def _init_worker(
+    W_act, residuals, C_in, C_sport, B_fit, bias, lambda_val, block_length
+):
+    _SHARED.update(
+        W_act=W_act,
+        residuals=residuals,
+        C_in=C_in,
+        C_sport=C_sport,
+        B_fit=B_fit,
+        bias=bias,
+        lambda_val=lambda_val,
+        block_length=block_length,
+    )
+
+
+def resample_residuals(residuals, block_length, rng):
+    """
+    Draws a moving-block bootstrap sample of the residuals.
+
+    Blocks of `block_length` consecutive days keep the day-to-day correlation of
+    water retention; a block length of 1 is the plain residual bootstrap. The
+    first residual is skipped because the model pins W_act(0) to W_obs(0).
+    """
+    pool = residuals[1:] if len(residuals) > 1 else residuals
+    N = len(residuals)
+    block_length = max(1, min(block_length, len(pool)))
+    n_blocks = -(-N // block_length)
+    starts = rng.integers(0, len(pool) - block_length + 1, size=n_blocks)
+    indices = (starts[:, None] + np.arange(block_length)).ravel()[:N]
+    return pool[indices]
+
+
+def _refit_chunk(seeds):
+    """Runs the bootstrap refits for a chunk of seeds inside a worker process."""
+    W_act = _SHARED["W_act"]
+    C_in = _SHARED["C_in"]
+    C_sport = _SHARED["C_sport"]
+
+    B_samples = np.full((len(seeds), len(W_act)), np.nan)
+    water_samples = np.full((len(seeds), len(W_act)), np.nan)
+    for i, seed in enumerate(seeds):
+        rng = np.random.default_rng(seed)
+        W_boot = W_act + resample_residuals(
+            _SHARED["residuals"], _SHARED["block_length"], rng
+        )
+        # Warm-start from the point estimate: when the bounds are active,
+        # L-BFGS-B then only needs a few iterations.
+        result = fit_base_metabolism(
+            W_boot, C_in, C_sport, _SHARED["lambda_val"], initial_B=_SHARED["B_fit"]
+        )
+        if not result.success:
+            continue
+        B_samples[i] = result.x
+        water_samples[i] = W_boot - simulate_weight(W_boot[0], C_in, C_sport, result.x)
+    B_bias, water_bias = _SHARED["bias"]
+    return B_samples + B_bias, water_samples + water_bias
+
+
+def bootstrap_weight_model(
+    W_obs,
+    C_in,
+    C_sport,
+    B_fit,
+    lambda_val=1.0,
+    n_bootstrap=200,
+    n_workers=None,
+    seed=None,
+    block_length=7,
+    quantiles=(0.05, 0.5, 0.95),
+):
+    """
+    Computes per-day uncertainty bands for B(t) and water retention with a residual block bootstrap.
+
+    Pseudo weight series are built by adding resampled residual blocks to the fitted
+    weight curve, and each one is refitted in a process pool.
+
+    Args:
+        W_obs, C_in, C_sport (np.ndarray): The daily series the point estimate was fitted on.
+        B_fit (np.ndarray): The point estimate of B(t), used to build the fitted curve and as warm start.
+        lambda_val (float): Hyperparameter for L2 regularization on B(t) differences.
+        n_bootstrap (int): Number of bootstrap refits.
+        n_workers (int, optional): Worker processes; defaults to the CPU count, 1 runs in-process.
+        seed (int, optional): Seed for reproducible bands, independent of `n_workers`.
+        block_length (int): Length in days of the resampled residual blocks.
+        quantiles (tuple): Quantiles reported for each day.
+
+    Returns:
+        pd.DataFrame: One row per day with 'Base_Metabolism_q<p>' and 'Water_Retention_q<p>' columns.
+    """
+    W_obs = np.asarray(W_obs, dtype=float)
+    C_in = np.asarray(C_in, dtype=float)
+    C_sport = np.asarray(C_sport, dtype=float)
+    B_fit = np.asarray(B_fit, dtype=float)
+
+    W_act = simulate_weight(W_obs[0], C_in, C_sport, B_fit)
+    residuals = W_obs - W_act
+
+    # Refitting the already smoothed curve smooths B(t) a second time, so the
+    # replicates are re-centred on the point estimate by the difference between
+    # the original fit and a fit of the fitted curve.
+    B_ref = fit_base_metabolism(W_act, C_in, C_sport, lambda_val, initial_B=B_fit).x
+    water_ref = W_act - simulate_weight(W_act[0], C_in, C_sport, B_ref)
+    bias = (B_fit - B_ref, residuals - water_ref)
+    shared = (W_act, residuals, C_in, C_sport, B_fit, bias, lambda_val, block_length)
+
+    # One child seed per replicate, so results do not depend on how they are chunked.
+    seeds = np.random.SeedSequence(seed).spawn(n_bootstrap)
+    n_workers = n_workers or os.cpu_count() or 1
+    n_workers = min(n_workers, n_bootstrap)
+
+    if n_workers <= 1:
+        _init_worker(*shared)
+        B_samples, water_samples = _refit_chunk(seeds)
+    else:
+        # A few chunks per worker balances the load while keeping pickling overhead low.
+        chunks = [c.tolist() for c in np.array_split(np.array(seeds), n_workers * 4)]
+        with ProcessPoolExecutor(
+            max_workers=n_workers, initializer=_init_worker, initargs=shared
+        ) as executor:
+            outputs = list(executor.map(_refit_chunk, [c for c in chunks if c]))
+        B_samples = np.vstack([b for b, _ in outputs])
+        water_samples = np.vstack([w for _, w in outputs])
+
+    n_failed = int(np.isnan(B_samples[:, 0]).sum())
+    if n_failed:
+        print(
+            f"Warning: {n_failed} of {n_bootstrap} bootstrap refits failed and were ignored."
+        )
+
+    bands = {}
+    for name, samples in (
+        ("Base_Metabolism", B_samples),
+        ("Water_Retention", water_samples),
+    ):
+        if n_failed == n_bootstrap:
+            values = np.full((len(quantiles), len(W_obs)), np.nan)
+        else:
+            values = np.nanquantile(samples, quantiles, axis=0)
+        for q, row in zip(quantiles, values):
+            bands[f"{name}_q{q * 100:g}"] = row
+    return pd.DataFrame(bands)
@@ -5,23 +5,148 @@ from unidecode import unidecode
 from nutrient import Nutrient
 
 
+def normalize_food_name(s):
+    # Convert to lowercase, remove accents, and replace all non-alphanumeric characters with a single underscore.
+    s = unidecode(s.lower())
+    s = re.sub(r"[^a-z0-9]+", "_", s)
+    s = s.strip("_")
+    return s
+
+
+def formula_food_name(name):
+    """
+    Spelling of a food name that parses back to the same food in a formula.
+
+    Names made of plain words are kept. Others, e.g. with digits, accents or
+    operator characters like 'Yaourt 0% (nature)', are written normalized
+    ('yaourt_0_nature'), which `build_food_pattern` matches back to the name.
+    """
+    if re.fullmatch(r"[A-Za-z]+(?:[ _][A-Za-z]+)*", name):
+        return name
+    return normalize_food_name(name)
+
+
+def build_food_pattern(normalization_map):
+    """
+    Builds the regex matching any of the food names of a normalization map, and the
+    map from matched text (separators removed, lowercased) to the original name.
+    """
+    # Build a single regex pattern from all known food names for efficiency
+    sorted_normalized_food_names = sorted(
+        normalization_map.keys(), key=len, reverse=True
+    )
+
+    # Create a map from the found normalized text to the original name
+    found_to_original_map = {}
+    pattern_list = []
+    for normalized_name in sorted_normalized_food_names:
+        original_name = normalization_map[normalized_name]
+
+        # Create a regex pattern for the current food name
+        pattern_parts = [re.escape(part) for part in normalized_name.split("_")]
+        pattern_text = "[_ -]+".join(pattern_parts)
+        pattern_list.append(pattern_text)
+
+        # Store the mapping from the clean, lowercased version to the original
+        found_to_original_map[normalized_name.replace("_", "")] = original_name
+
+    # Combine all patterns into a single regex
+    combined_pattern = re.compile(
+        r"\b(" + "|".join(pattern_list) + r")\b", flags=re.IGNORECASE
+    )
+    return combined_pattern, found_to_original_map
+
+
 class FormulaParser:
-    def __init__(self, nutrition_data_path="nutrition_values.json"):
-        with open(nutrition_data_path, "r") as f:
-            nutrition_list = json.load(f)
+    def __init__(
+        self,
+        nutrition_data_path="nutrition_values.json",
+        nutrition_list=None,
+        imputations_path=None,
+    ):
+        # nutrition_list, when given, replaces the JSON file (e.g. rows loaded from a NutritionStore)
+        if nutrition_list is None:
+            with open(nutrition_data_path, "r") as f:
+                nutrition_list = json.load(f)
+        # Optionally fill missing values with estimates of nutrient_imputation.py
+        if imputations_path is not None:
+            from nutrient_imputation import apply_imputations, load_imputations
+
+            nutrition_list = apply_imputations(
+                nutrition_list, load_imputations(imputations_path)
+            )
         self.nutrition_data = {
             item["Nom"]: item for item in nutrition_list if "Nom" in item
         }
         self.normalization_map = {
             self._normalize(k): k for k in self.nutrition_data.keys()
         }
+        self._food_pattern = None
 
     def _normalize(self, s):
-        # Convert to lowercase, remove accents, and replace all non-alphanumeric characters with a single underscore.
-        s = unidecode(s.lower())
-        s = re.sub(r"[^a-z0-9]+", "_", s)
-        s = s.strip("_")
-        return s
+        return normalize_food_name(s)
+
+    def add_foods(self, rows):
+        """
+        Adds or replaces foods (rows keyed like nutrition_values.json).
+
+        The food regex is only rebuilt when a new name appears, so updating the
+        values of known foods stays cheap.
+        """
+        for item in rows:
+            if "Nom" not in item:
+                continue
+            normalized_name = self._normalize(item["Nom"])
+            previous_name = self.normalization_map.get(normalized_name)
+            if previous_name is None:
+                self._food_pattern = None
+            elif previous_name != item["Nom"]:
+                del self.nutrition_data[previous_name]
+                self._food_pattern = None
+            self.nutrition_data[item["Nom"]] = item
+            self.normalization_map[normalized_name] = item["Nom"]
+
+    def remove_foods(self, names):
+        """Removes foods by name; names that are not known are ignored."""
+        for name in names:
+            if self.nutrition_data.pop(name, None) is None:
+                continue
+            normalized_name = self._normalize(name)
+            if self.normalization_map.get(normalized_name) == name:
+                del self.normalization_map[normalized_name]
+            self._food_pattern = None
+
+    def _get_food_pattern(self):
+        """
+        Returns the compiled food regex and its matched-text map (see `build_food_pattern`).
+
+        Both only depend on the food database, so they are built once and reused
+        for every formula instead of being rebuilt on each call.
+        """
+        if self._food_pattern is None:
+            self._food_pattern = build_food_pattern(self.normalization_map)
+        return self._food_pattern
+
+    def _replace_food_names(self, formula, food_vars_map):
+        """Replaces every known food name in the formula by a __FOOD_<n>__ variable."""
+        combined_pattern, found_to_original_map = self._get_food_pattern()
+
+        def replacer(match):
+            # Normalize the matched string by removing separators and making it lowercase
+            matched_text = match.group(0)
+            normalized_match = re.sub(r"[_ -]+", "", matched_text.lower())
+
+            # Find the corresponding original name
+            original_name = found_to_original_map.get(normalized_match)
+            if original_name is None:
+                # This should not happen if the regex is built correctly
+                return matched_text
+
+            var_name = f"__FOOD_{len(food_vars_map)}__"
+            food_vars_map[var_name] = original_name
+            return var_name
+
+        return combined_pattern.sub(replacer, formula)
 
     def _parse_and_prepare_formula(self, formula_str: str):
         # 1. Pre-processing
@@ -30,8 +155,11 @@ class FormulaParser:
         formula = re.sub(r"(?<!\d),(\d)", r"0.\1", formula)
         # Add spaces around operators to ease parsing
         formula = re.sub(r"([*\/+\-\(\)])", r" \1 ", formula)
-        # Handle implicit multiplication like "2(..." or "2x..."
-        formula = re.sub(r"(\d)\s*([a-zA-Z\(])", r"\1 * \2", formula)
+        # Handle implicit multiplication like "2(..." or "2x...", but not within a
+        # word like "coca_0sucre"
+        formula = re.sub(
+            r"(?<![\w.])(\d+(?:\.\d+)?|\.\d+)\s*([a-zA-Z\(])", r"\1 * \2", formula
+        )
         formula = re.sub(r"(\))\s*([a-zA-Z\(])", r"\1 * \2", formula)
         formula = re.sub(r"(\))\s*(\d)", r"\1 * \2", formula)
         # Collapse multiple spaces
@@ -42,46 +170,7 @@ class FormulaParser:
         pythonic_formula = formula
 
         # First, identify and replace known food names (multi-word and single-word)
-        # Build a single regex pattern from all known food names for efficiency
-        sorted_normalized_food_names = sorted(
-            self.normalization_map.keys(), key=len, reverse=True
-        )
-
-        # Create a map from the found normalized text to the original name
-        found_to_original_map = {}
-        pattern_list = []
-        for normalized_name in sorted_normalized_food_names:
-            original_name = self.normalization_map[normalized_name]
-
-            # Create a regex pattern for the current food name
-            pattern_parts = [re.escape(part) for part in normalized_name.split("_")]
-            pattern_text = "[_ -]+".join(pattern_parts)
-            pattern_list.append(pattern_text)
-
-            # Store the mapping from the clean, lowercased version to the original
-            found_to_original_map[normalized_name.replace("_", "")] = original_name
-
-        # Combine all patterns into a single regex
-        combined_pattern = r"\b(" + "|".join(pattern_list) + r")\b"
-
-        def replacer(match):
-            # Normalize the matched string by removing separators and making it lowercase
-            matched_text = match.group(0)
-            normalized_match = re.sub(r"[_ -]+", "", matched_text.lower())
-
-            # Find the corresponding original name
-            original_name = found_to_original_map.get(normalized_match)
-            if original_name is None:
-                # This should not happen if the regex is built correctly
-                return matched_text
-
-            var_name = f"__FOOD_{len(food_vars_map)}__"
-            food_vars_map[var_name] = original_name
-            return var_name
-
-        pythonic_formula = re.sub(
-            combined_pattern, replacer, pythonic_formula, flags=re.IGNORECASE
-        )
+        pythonic_formula = self._replace_food_names(pythonic_formula, food_vars_map)
 
         # 3. Correction of typos for remaining words
         remaining_words = set(re.findall(r"[a-zA-Z_][a-zA-Z0-9_]*", pythonic_formula))
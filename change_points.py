@@ -0,0 +1,171 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Default penalties of `detect_change_points`. The fitted base metabolism is
+# smooth, so its penalty is set from the shift worth reporting: two 60-day
+# segments 100 kcal apart. Other series use the BIC penalty of `pelt`.
+DEFAULT_PENALTIES = {"Base_Metabolism": 60 / 2 * 100**2}
+
+
+def noise_level(x):
+    """
+    Robust standard deviation of the noise of a series, from the median absolute
+    first difference, so that level shifts barely affect it.
+    """
+    differences = np.abs(np.diff(np.asarray(x, dtype=float)))
+    if len(differences) == 0:
+        return 0.0
+    return float(np.median(differences) / (0.6745 * np.sqrt(2)))
+
+
+def pelt(x, penalty=None, min_size=7):
+    """
+    Change points in the mean of a series, with the PELT algorithm.
+
+    Minimizes the sum over segments of the squared deviations from the segment
+    mean, plus `penalty` per change point. Segment costs come from prefix sums in
+    O(1), and candidate segment starts that can no longer be optimal are pruned,
+    which makes the search close to linear in the series length.
+
+    Args:
+        x (np.ndarray): The series, without NaN.
+        penalty (float, optional): Cost of one change point, in squared units of x.
+            Defaults to 2 * sigma^2 * log(n) (BIC), with sigma from `noise_level`.
+            Splitting segments of lengths a and b whose means differ by d lowers
+            the cost by a * b / (a + b) * d**2, so the penalty sets the smallest
+            shift worth reporting. Smoothed series such as Base_Metabolism have
+            little day-to-day noise, so they need an explicit penalty.
+        min_size (int): Minimum segment length, in days.
+
+    Returns:
+        np.ndarray: Indices where a new segment starts, 0 excluded.
+    """
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    if n < 2 * min_size:
+        return np.array([], dtype=int)
+    if np.isnan(x).any():
+        raise ValueError("The series contains NaN values.")
+    if penalty is None:
+        penalty = 2 * noise_level(x) ** 2 * np.log(n)
+
+    # Centering keeps the prefix sums of squares well conditioned.
+    x = x - x.mean()
+    S1 = np.r_[0.0, np.cumsum(x)]
+    S2 = np.r_[0.0, np.cumsum(x**2)]
+
+    F = np.full(n + 1, np.inf)
+    F[0] = -penalty
+    last_change = np.zeros(n + 1, dtype=int)
+    candidates = np.array([0])
+    for t in range(min_size, n + 1):
+        if t >= 2 * min_size:
+            # t - min_size becomes a possible start once its own prefix has a
+            # segmentation with segments of at least min_size.
+            candidates = np.append(candidates, t - min_size)
+        lengths = t - candidates
+        costs = (S2[t] - S2[candidates]) - (S1[t] - S1[candidates]) ** 2 / lengths
+        totals = F[candidates] + costs
+        best = np.argmin(totals)
+        F[t] = totals[best] + penalty
+        last_change[t] = candidates[best]
+        candidates = candidates[totals <= F[t]]
+
+    change_points = []
+    t = n
+    while t > 0:
+        t = last_change[t]
+        if t > 0:
+            change_points.append(t)
+    return np.array(change_points[::-1], dtype=int)
+
+
+def segment_summary(x, change_points, timestamps=None):
+    """
+    Per-segment boundaries and means.
+
+    Returns:
+        pd.DataFrame: One row per segment with Start and End (inclusive positions, or
+            timestamps if given), Length, Mean and Shift from the previous segment.
+    """
+    x = np.asarray(x, dtype=float)
+    starts = np.r_[0, change_points].astype(int)
+    ends = np.r_[change_points, len(x)].astype(int)
+    S1 = np.r_[0.0, np.cumsum(x)]
+    means = (S1[ends] - S1[starts]) / (ends - starts)
+    summary = pd.DataFrame(
+        {
+            "Start": starts if timestamps is None else np.asarray(timestamps)[starts],
+            "End": ends - 1 if timestamps is None else np.asarray(timestamps)[ends - 1],
+            "Length": ends - starts,
+            "Mean": means,
+            "Shift": np.r_[np.nan, np.diff(means)],
+        }
+    )
+    return summary
+
+
+def detect_change_points(
+    results_df, columns=("Base_Metabolism", "Water_Retention"), penalty=None, min_size=7
+):
+    """
+    Regime changes in the outputs of `run_new_weight_model`.
+
+    Args:
+        results_df (pd.DataFrame): Model results with a 'Timestamp' column.
+        columns (tuple): Series to segment; rows where a series is NaN are skipped.
+        penalty (float | dict, optional): See `pelt`; a dict sets it per column.
+            Defaults to `DEFAULT_PENALTIES`.
+        min_size (int): Minimum segment length, in days.
+
+    Returns:
+        dict: Maps each column to its `segment_summary` DataFrame.
+    """
+    if penalty is None:
+        penalty = DEFAULT_PENALTIES
+    segments = {}
+    for column in columns:
+        valid = results_df[column].notna()
+        x = results_df.loc[valid, column].to_numpy(dtype=float)
+        column_penalty = penalty.get(column) if isinstance(penalty, dict) else penalty
+        change_points = pelt(x, column_penalty, min_size)
+        segments[column] = segment_summary(
+            x, change_points, results_df.loc[valid, "Timestamp"].to_numpy()
+        )
+    return segments
+
+
+def _pelt_task(args):
+    return pelt(*args)
+
+
+def detect_change_points_batch(series, penalty=None, min_size=7, n_workers=None):
+    """
+    Runs `pelt` on many series, e.g. one per user or per model output, in parallel.
+
+    Args:
+        series (list | np.ndarray): Series of any lengths, or a 2D array of rows.
+        penalty (float | list, optional): See `pelt`; a list sets it per series.
+        min_size (int): Minimum segment length, in days.
+        n_workers (int, optional): Worker processes; defaults to the CPU count, 1 runs in-process.
+
+    Returns:
+        list: The change point indices of each series.
+    """
+    series = list(series)
+    penalties = (
+        penalty if isinstance(penalty, (list, tuple)) else [penalty] * len(series)
+    )
+    tasks = [(x, p, min_size) for x, p in zip(series, penalties)]
+    n_workers = min(n_workers or os.cpu_count() or 1, len(tasks))
+    if n_workers <= 1:
+        return [_pelt_task(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        return list(
+            executor.map(
+                _pelt_task, tasks, chunksize=max(1, len(tasks) // (4 * n_workers))
+            )
+        )
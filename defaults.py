@@ -0,0 +1,6 @@
+# Default file locations shared by the scripts and `nutrition_cli.py`. This module
+# only holds constants, so the CLI can import it without loading pandas or scipy.
+
+# Model results written by `run_new_weight_model` and read by the plots, forecast,
+# water, changes and export commands.
+RESULTS_CSV_PATH = "new_model_results.csv"
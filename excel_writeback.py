@@ -0,0 +1,259 @@
+import hashlib
+import json
+import math
+import os
+import re
+import tempfile
+import zipfile
+from xml.sax.saxutils import quoteattr, unescape
+
+import pandas as pd
+from openpyxl import Workbook
+
+from nutrition_store import NUTRIENT_COLUMNS, date_key
+
+RESULTS_SHEET = "Résultats"
+
+WORKSHEET_TYPE = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+)
+WORKSHEET_CONTENT_TYPE = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+)
+RELATIONSHIPS_NAMESPACE = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+)
+
+
+def results_table(results_df, nutrients_df=None):
+    """
+    One row per day with its nutrient totals and model outputs.
+
+    Args:
+        results_df (pd.DataFrame): Model results with a 'Timestamp' column, e.g.
+            `new_model_results.csv` with 'Base_Metabolism', 'Water_Retention' and,
+            after `explain_water_retention`, 'Water_Explained'.
+        nutrients_df (pd.DataFrame, optional): Date-indexed daily nutrients, e.g.
+            `NutritionStore.daily_nutrients_range()`; columns of `NUTRIENT_COLUMNS`.
+
+    Returns:
+        pd.DataFrame: 'Date' ('YYYY-MM-DD') followed by the nutrient and model
+            columns, sorted by date.
+    """
+    results = results_df.copy()
+    results.index = pd.Index(results.pop("Timestamp").map(date_key), name="Date")
+    if nutrients_df is not None and len(nutrients_df):
+        nutrients = nutrients_df[
+            [c for c in NUTRIENT_COLUMNS if c in nutrients_df.columns]
+        ].copy()
+        nutrients.index = pd.Index(nutrients.index.map(date_key), name="Date")
+        results = nutrients.join(results, how="outer")
+    return results.sort_index().reset_index()
+
+
+def write_back_results(
+    workbook_path,
+    output_path,
+    table,
+    sheet_name=RESULTS_SHEET,
+    state_path=None,
+):
+    """
+    Writes a results sheet into a copy of the journal workbook.
+
+    The workbook is never loaded by openpyxl: the sheet is streamed with openpyxl's
+    write-only mode into a scratch workbook, and its XML part is spliced into a
+    copy of the journal's zip archive. Every other part, the 'Journal' sheet with
+    its formulas included, is copied unchanged, so the cost depends on the results
+    and not on the size of the workbook. A sheet of the same name, e.g. from an
+    earlier write-back into the same file, is replaced.
+
+    A hash of each row and the checksums of the source parts are kept in a state
+    file. When no row changed and the source workbook is the same, nothing is
+    written.
+
+    Args:
+        workbook_path (str): The journal, e.g. 'Journal nutrition.xlsx'.
+        output_path (str): The updated copy; may be `workbook_path` itself, which is
+            then replaced atomically.
+        table (pd.DataFrame): Rows of the sheet, e.g. from `results_table`.
+        sheet_name (str): Name of the results sheet.
+        state_path (str, optional): State file; defaults to
+            '<output_path>.writeback.json'.
+
+    Returns:
+        tuple: (written, changed_dates)
+            written (bool): Whether the output was (re)written.
+            changed_dates (list): Dates ('Date' values) added, changed or removed
+                since the previous write-back.
+    """
+    state_path = state_path or f"{output_path}.writeback.json"
+    state = {"source": {}, "rows": {}}
+    if os.path.exists(state_path):
+        with open(state_path, "r") as f:
+            state = json.load(f)
+
+    rows = [_cell_values(row) for row in table.itertuples(index=False)]
+    row_hashes = {
+        str(row[0]): hashlib.sha1(
+            json.dumps(row, ensure_ascii=False).encode()
+        ).hexdigest()
+        for row in rows
+    }
+    changed_dates = sorted(
+        day
+        for day in set(row_hashes) | set(state["rows"])
+        if row_hashes.get(day) != state["rows"].get(day)
+    )
+
+    with zipfile.ZipFile(workbook_path) as source:
+        source_parts = _part_checksums(source, sheet_name)
+        if (
+            not changed_dates
+            and source_parts == state["source"]
+            and os.path.exists(output_path)
+        ):
+            return False, []
+        sheet_xml = _stream_sheet(list(table.columns), rows)
+        _splice_sheet(source, output_path, sheet_name, sheet_xml)
+    if os.path.abspath(output_path) == os.path.abspath(workbook_path):
+        # The next source is the output, whose workbook part lists the new sheet.
+        with zipfile.ZipFile(output_path) as output:
+            source_parts = _part_checksums(output, sheet_name)
+
+    with open(state_path, "w") as f:
+        json.dump({"source": source_parts, "rows": row_hashes}, f)
+    return True, changed_dates
+
+
+def _cell_values(row):
+    # NaN cells are left empty.
+    return [
+        None if isinstance(value, float) and math.isnan(value) else value
+        for value in (v.item() if hasattr(v, "item") else v for v in row)
+    ]
+
+
+def _stream_sheet(header, rows):
+    # Write-only cells carry no shared-string or style indices (strings are
+    # inline), so the sheet part is valid inside any workbook.
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    with tempfile.TemporaryFile() as scratch:
+        wb.save(scratch)
+        scratch.seek(0)
+        with zipfile.ZipFile(scratch) as archive:
+            return archive.read("xl/worksheets/sheet1.xml")
+
+
+def _workbook_sheets(source):
+    # (name, relationship id) of each sheet, and the relationship targets.
+    workbook_xml = source.read("xl/workbook.xml").decode("utf-8")
+    rels_xml = source.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+    sheets = []
+    for tag in re.findall(r"<(?:\w+:)?sheet\b[^>]*>", workbook_xml):
+        name = re.search(r'\bname="([^"]*)"', tag).group(1)
+        rel_id = re.search(r'\b\w+:id="([^"]*)"', tag).group(1)
+        sheets.append((unescape(name, {"&quot;": '"'}), rel_id))
+    targets = {}
+    for tag in re.findall(r"<(?:\w+:)?Relationship\b[^>]*>", rels_xml):
+        rel_id = re.search(r'\bId="([^"]*)"', tag).group(1)
+        targets[rel_id] = re.search(r'\bTarget="([^"]*)"', tag).group(1)
+    return workbook_xml, rels_xml, sheets, targets
+
+
+def _part_name(target):
+    return target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+
+
+def _part_checksums(archive, sheet_name):
+    # CRC-32 of every part but the results sheet, read from the zip directory.
+    _, _, sheets, targets = _workbook_sheets(archive)
+    results_parts = {
+        _part_name(targets[rel_id]) for name, rel_id in sheets if name == sheet_name
+    }
+    return {
+        info.filename: info.CRC
+        for info in archive.infolist()
+        if info.filename not in results_parts
+    }
+
+
+def _splice_sheet(source, output_path, sheet_name, sheet_xml):
+    workbook_xml, rels_xml, sheets, targets = _workbook_sheets(source)
+    existing = [rel_id for name, rel_id in sheets if name == sheet_name]
+    replaced = {}
+    if existing:
+        part = _part_name(targets[existing[0]])
+        replaced[part] = sheet_xml
+    else:
+        names = set(source.namelist())
+        number = 1
+        while f"xl/worksheets/sheet{number}.xml" in names:
+            number += 1
+        part = f"xl/worksheets/sheet{number}.xml"
+        rel_id = "rId1"
+        for index in range(1, len(targets) + 2):
+            rel_id = f"rId{index}"
+            if rel_id not in targets:
+                break
+        sheet_ids = [int(i) for i in re.findall(r'\bsheetId="(\d+)"', workbook_xml)]
+        prefix = re.search(
+            rf'xmlns:(\w+)="{re.escape(RELATIONSHIPS_NAMESPACE)}"', workbook_xml
+        )
+        id_attribute = (
+            f"{prefix.group(1)}:id"
+            if prefix
+            else f'xmlns:r="{RELATIONSHIPS_NAMESPACE}" r:id'
+        )
+        sheet_tag = (
+            f"<sheet name={quoteattr(sheet_name)} "
+            f'sheetId="{max(sheet_ids, default=0) + 1}" {id_attribute}="{rel_id}"/>'
+        )
+        replaced["xl/workbook.xml"] = _insert_before(
+            workbook_xml, "</sheets>", sheet_tag
+        )
+        replaced["xl/_rels/workbook.xml.rels"] = _insert_before(
+            rels_xml,
+            "</Relationships>",
+            f'<Relationship Id="{rel_id}" Type="{WORKSHEET_TYPE}" '
+            f'Target="/{part}"/>',
+        )
+        replaced["[Content_Types].xml"] = _insert_before(
+            source.read("[Content_Types].xml").decode("utf-8"),
+            "</Types>",
+            f'<Override PartName="/{part}" ContentType="{WORKSHEET_CONTENT_TYPE}"/>',
+        )
+        replaced[part] = sheet_xml
+
+    # Written next to the output and renamed, so the output is never half-written.
+    directory = os.path.dirname(os.path.abspath(output_path))
+    fd, temporary_path = tempfile.mkstemp(suffix=".xlsx", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f, zipfile.ZipFile(
+            f, "w", zipfile.ZIP_DEFLATED
+        ) as target:
+            for info in source.infolist():
+                if info.filename in replaced:
+                    data = replaced.pop(info.filename)
+                    if isinstance(data, str):
+                        data = data.encode("utf-8")
+                    target.writestr(info, data, zipfile.ZIP_DEFLATED)
+                else:
+                    target.writestr(info, source.read(info))
+            for filename, data in replaced.items():
+                target.writestr(filename, data)
+        os.replace(temporary_path, output_path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def _insert_before(xml, closing_tag, element):
+    position = xml.rfind(closing_tag)
+    if position < 0:
+        raise ValueError(f"Malformed workbook part: no {closing_tag}.")
+    return xml[:position] + element + xml[position:]
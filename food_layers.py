@@ -0,0 +1,182 @@
+import json
+import os
+from collections import ChainMap
+from collections.abc import Mapping
+
+import numpy as np
+
+from calculate_nutrition import FormulaParser, build_food_pattern, normalize_food_name
+from nutrient import NUTRIENT_KEYS
+
+
+class BaseFoodIndex(Mapping):
+    """
+    Shared, read-only base food database.
+
+    Nutrient values live in one (n_foods, n_nutrients) float matrix, NaN where a
+    value is missing, which `load(..., mmap=True)` memory-maps so that processes
+    serving different users share the same pages. Rows are rebuilt as dicts on
+    access, and the compiled food regex is built once per process and shared by
+    every overlay parser.
+    """
+
+    def __init__(self, names, values):
+        self.names = list(names)
+        self.values = values
+        self._positions = {name: i for i, name in enumerate(self.names)}
+        self.normalization_map = {normalize_food_name(n): n for n in self.names}
+        self._food_pattern = None
+
+    @classmethod
+    def from_nutrition_list(cls, nutrition_list):
+        rows = [item for item in nutrition_list if "Nom" in item]
+        values = np.array(
+            [
+                [
+                    np.nan if item.get(key) is None else item[key]
+                    for key in NUTRIENT_KEYS
+                ]
+                for item in rows
+            ],
+            dtype=float,
+        ).reshape(len(rows), len(NUTRIENT_KEYS))
+        return cls([item["Nom"] for item in rows], values)
+
+    @classmethod
+    def from_json(cls, nutrition_data_path="nutrition_values.json"):
+        with open(nutrition_data_path, "r") as f:
+            return cls.from_nutrition_list(json.load(f))
+
+    def save(self, directory):
+        """Writes the index as `names.json` and `values.npy` into a directory."""
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "names.json"), "w") as f:
+            json.dump(
+                {"names": self.names, "keys": NUTRIENT_KEYS}, f, ensure_ascii=False
+            )
+        np.save(os.path.join(directory, "values.npy"), self.values)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Loads a saved index; with `mmap` the value matrix is a read-only memory map."""
+        with open(os.path.join(directory, "names.json"), "r") as f:
+            meta = json.load(f)
+        if meta["keys"] != NUTRIENT_KEYS:
+            raise ValueError(
+                f"Index at {directory} was saved with other nutrient keys."
+            )
+        values = np.load(
+            os.path.join(directory, "values.npy"), mmap_mode="r" if mmap else None
+        )
+        return cls(meta["names"], values)
+
+    def get_food_pattern(self):
+        if self._food_pattern is None:
+            self._food_pattern = build_food_pattern(self.normalization_map)
+        return self._food_pattern
+
+    def __getitem__(self, name):
+        row = self.values[self._positions[name]]
+        item = {"Nom": name}
+        for key, value in zip(NUTRIENT_KEYS, row):
+            if not np.isnan(value):
+                item[key] = float(value)
+        return item
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+
+class LayeredFormulaParser(FormulaParser):
+    """
+    A FormulaParser resolving foods through a small per-user overlay on top of a
+    shared `BaseFoodIndex`.
+
+    The overlay holds the user's added or overridden foods; name matching, typo
+    correction and nutrient lookup see the overlay first and the base second.
+    Only the overlay (its rows, names and regex) is allocated per user.
+    """
+
+    def __init__(self, base, overlay_foods=()):
+        self.base = base
+        self.overlay_data = {}
+        self.overlay_normalization_map = {}
+        self.nutrition_data = ChainMap(self.overlay_data, base)
+        self.normalization_map = ChainMap(
+            self.overlay_normalization_map, base.normalization_map
+        )
+        self._food_pattern = None
+        self.add_foods(overlay_foods)
+
+    def add_foods(self, rows):
+        for item in rows:
+            if "Nom" not in item:
+                continue
+            normalized_name = self._normalize(item["Nom"])
+            previous_name = self.overlay_normalization_map.get(normalized_name)
+            if previous_name is not None and previous_name != item["Nom"]:
+                del self.overlay_data[previous_name]
+            if normalized_name not in self.normalization_map:
+                self._food_pattern = None
+            self.overlay_data[item["Nom"]] = item
+            self.overlay_normalization_map[normalized_name] = item["Nom"]
+
+    def remove_foods(self, names):
+        # Only overlay foods can be removed; the shared base is read-only.
+        for name in names:
+            if self.overlay_data.pop(name, None) is None:
+                continue
+            normalized_name = self._normalize(name)
+            if self.overlay_normalization_map.get(normalized_name) == name:
+                del self.overlay_normalization_map[normalized_name]
+            self._food_pattern = None
+
+    def _get_food_pattern(self):
+        # Only names the base does not know need an overlay regex: overridden
+        # base names are matched by the base regex and resolve to the overlay row.
+        if self._food_pattern is None:
+            new_names = {
+                normalized: name
+                for normalized, name in self.overlay_normalization_map.items()
+                if normalized not in self.base.normalization_map
+            }
+            self._food_pattern = build_food_pattern(new_names) if new_names else None
+        return self._food_pattern
+
+    def _replace_food_names(self, formula, food_vars_map):
+        layers = [self.base.get_food_pattern()]
+        if self._get_food_pattern() is not None:
+            layers.insert(0, self._food_pattern)
+
+        # Leftmost-longest match across the layers, as a single regex would give.
+        matches = []
+        for pattern, found_to_original_map in layers:
+            for match in pattern.finditer(formula):
+                normalized_match = match.group(0).lower()
+                for separator in "_ -":
+                    normalized_match = normalized_match.replace(separator, "")
+                original_name = found_to_original_map.get(normalized_match)
+                if original_name is not None:
+                    matches.append((match.start(), -match.end(), original_name))
+        matches.sort()
+
+        parts = []
+        position = 0
+        for start, negative_end, original_name in matches:
+            if start < position:
+                continue
+            var_name = f"__FOOD_{len(food_vars_map)}__"
+            food_vars_map[var_name] = self.normalization_map[
+                self._normalize(original_name)
+            ]
+            parts.append(formula[position:start])
+            parts.append(var_name)
+            position = -negative_end
+        parts.append(formula[position:])
+        return "".join(parts)
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from run_new_model import KCAL_PER_KG
+
+
+def forecast_weight_scenarios(
+    start_weight,
+    calories_in,
+    calories_sport=0.0,
+    base_metabolism=2000.0,
+    target_weight=None,
+):
+    """
+    Simulates weight trajectories for many future diet and sport plans at once.
+
+    Uses the dynamics of the weight model, W(t) = W(t-1) + (C_in(t) - C_sport(t) - B(t)) / 7700,
+    with broadcasting and a cumulative sum along the horizon instead of Python loops.
+
+    Args:
+        start_weight (float | np.ndarray): Weight on the day before the horizon; one per scenario allowed.
+        calories_in (np.ndarray): Planned daily intake, shape (n_scenarios, n_days) or (n_days,).
+        calories_sport (float | np.ndarray): Planned sport calories, broadcastable to calories_in.
+        base_metabolism (float | np.ndarray): B(t) over the horizon, broadcastable to calories_in.
+        target_weight (float, optional): Weight whose first crossing is reported in the summary.
+
+    Returns:
+        tuple: (trajectories, summary)
+            trajectories (np.ndarray): Weight at the end of each day, shape (n_scenarios, n_days).
+            summary (pd.DataFrame): One row per scenario with final, min and max weight, total
+                change, mean daily balance and, with a target, 'Days_To_Target' (-1 if never reached).
+    """
+    calories_in = np.atleast_2d(np.asarray(calories_in, dtype=float))
+    balance = calories_in - np.asarray(calories_sport, dtype=float)
+    balance = balance - np.asarray(base_metabolism, dtype=float)
+    start_weight = np.asarray(start_weight, dtype=float).reshape(-1, 1)
+
+    trajectories = start_weight + np.cumsum(balance / KCAL_PER_KG, axis=1)
+
+    summary = pd.DataFrame(
+        {
+            "Final_Weight": trajectories[:, -1],
+            "Total_Change": trajectories[:, -1] - start_weight[:, 0],
+            "Min_Weight": trajectories.min(axis=1),
+            "Max_Weight": trajectories.max(axis=1),
+            "Mean_Daily_Balance": balance.mean(axis=1),
+        }
+    )
+    if target_weight is not None:
+        # Losing weight if the target is below the start, gaining otherwise.
+        losing = target_weight < start_weight
+        reached = np.where(
+            losing, trajectories <= target_weight, trajectories >= target_weight
+        )
+        summary["Days_To_Target"] = np.where(
+            reached.any(axis=1), reached.argmax(axis=1) + 1, -1
+        )
+    return trajectories, summary
+
+
+def forecast_from_results(
+    results_df,
+    calories_in,
+    calories_sport=0.0,
+    target_weight=None,
+    baseline_days=14,
+):
+    """
+    Forecasts from the output of `run_new_weight_model`.
+
+    Trajectories start from the last modelled weight (Actual_Weight, free of water
+    retention noise), and B(t) is held at its mean over the last `baseline_days`.
+
+    Returns:
+        tuple: See `forecast_weight_scenarios`.
+    """
+    last_rows = results_df.tail(baseline_days)
+    return forecast_weight_scenarios(
+        results_df["Actual_Weight"].iloc[-1],
+        calories_in,
+        calories_sport,
+        base_metabolism=last_rows["Base_Metabolism"].mean(),
+        target_weight=target_weight,
+    )
@@ -0,0 +1,181 @@
+import json
+import os
+
+import pandas as pd
+
+from nutrition_store import date_key
+from process_journal_food_sport_weight import (
+    evaluate_sport_formula,
+    process_date_column,
+    transform_sport_formula,
+)
+
+# Keys of a log entry, as in the extracted journal, plus optional precomputed values.
+LOG_FIELDS = ["Date", "recorded food", "weight", "sport", "Cals", "Sport ajusté"]
+
+
+def append_entry(log_path, entry):
+    """
+    Appends one day to the log, e.g. {"Date": "2025-07-12", "weight": 80.1,
+    "recorded food": "1.5 * Pomme", "sport": "14*8"}.
+
+    A 'Date' of '=' (or no 'Date') means the day after the previous entry, like
+    the '=A2+1' formulas of the workbook. Fields may be given in separate entries
+    for the same day; they are merged.
+    """
+    unknown = set(entry) - set(LOG_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown log field(s): {', '.join(sorted(unknown))}")
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def read_new_entries(log_path, offset=0):
+    """
+    Reads the complete lines written after a byte offset.
+
+    A trailing line without its newline is still being written and is left for the
+    next read. If the file is shorter than the offset, it was truncated or
+    replaced and is read from the start.
+
+    Returns:
+        tuple: (entries, errors, new_offset)
+            entries (list): (byte offset, dict) of each parsed line.
+            errors (dict): Maps byte offsets of unreadable lines to the error message.
+            new_offset (int): Offset to resume from.
+    """
+    if not os.path.exists(log_path):
+        return [], {}, offset
+    with open(log_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < offset:
+            offset = 0
+        f.seek(offset)
+        data = f.read()
+
+    complete = data[: data.rfind(b"\n") + 1]
+    entries, errors = [], {}
+    position = offset
+    for line in complete.splitlines(keepends=True):
+        text = line.strip()
+        if text:
+            try:
+                entry = json.loads(text)
+                if not isinstance(entry, dict):
+                    raise ValueError("A log entry must be a JSON object.")
+                entries.append((position, entry))
+            except ValueError as e:
+                errors[position] = str(e)
+        position += len(line)
+    return entries, errors, offset + len(complete)
+
+
+def prepare_entries(entries, previous_date=None):
+    """
+    Validates log entries and converts them to journal records.
+
+    Dates follow `process_date_column`: a date string, or a formula ('=' or a
+    missing 'Date') for the day after the previous entry. Sport formulas go through
+    `transform_sport_formula`, as in the workbook extraction, and entries whose
+    sport `evaluate_sport_formula` rejects are invalid.
+
+    Args:
+        entries (list): (byte offset, dict) pairs from `read_new_entries`.
+        previous_date (str, optional): Date of the last entry of earlier reads.
+
+    Returns:
+        tuple: (records, errors), the journal records with 'YYYY-MM-DD' dates, and a
+            dict mapping byte offsets of invalid entries to the error message.
+    """
+    valid, errors = [], {}
+    has_previous = previous_date is not None
+    for position, entry in entries:
+        entry = dict(entry)
+        entry.setdefault("Date", "=")
+        unknown = set(entry) - set(LOG_FIELDS)
+        date_value = str(entry["Date"]).strip()
+        weight = entry.get("weight")
+        try:
+            if unknown:
+                raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+            if date_value.startswith("="):
+                if not has_previous:
+                    raise ValueError("Relative date without a previous entry.")
+            else:
+                pd.to_datetime(date_value)
+            if weight is not None and not isinstance(weight, (int, float)):
+                raise ValueError(f"Invalid weight: {weight!r}")
+            evaluate_sport_formula(entry.get("sport"))
+        except (ValueError, TypeError) as e:
+            errors[position] = str(e)
+            continue
+        has_previous = True
+        valid.append(entry)
+
+    if not valid:
+        return [], errors
+    # The previous date heads the frame so that relative dates continue from it.
+    df = pd.DataFrame([{"Date": previous_date}] if previous_date else [])
+    df = pd.concat([df, pd.DataFrame(valid)], ignore_index=True)
+    df = process_date_column(df).iloc[1 if previous_date else 0 :]
+    df["Date"] = df["Date"].map(date_key)
+    if "sport" in df.columns:
+        df["sport"] = df["sport"].apply(transform_sport_formula)
+
+    records = [
+        {key: value for key, value in record.items() if not _is_missing(value)}
+        for record in df.to_dict("records")
+    ]
+    return records, errors
+
+
+def tail_journal_log(log_path, store, parser=None):
+    """
+    Merges the entries appended to a log since the last call into a NutritionStore.
+
+    The byte offset and the date of the last entry are kept in the store, so each
+    call only reads the new lines. Entries update the given fields of their day
+    and keep the others. With a parser, the nutrient totals of the changed days
+    are recomputed too.
+
+    Args:
+        log_path (str): The JSONL log (see `append_entry`).
+        store (NutritionStore): The journal store.
+        parser (FormulaParser, optional): Parser for `refresh_daily_nutrients`.
+
+    Returns:
+        tuple: (changed_dates, errors), the 'YYYY-MM-DD' dates added or changed, and
+            a dict mapping byte offsets (or dates, for formulas) to error messages.
+    """
+    key = os.path.abspath(log_path)
+    state = store.get_meta(f"journal_log:{key}", {"offset": 0, "last_date": None})
+    entries, errors, offset = read_new_entries(log_path, state["offset"])
+    if offset < state["offset"]:
+        # The log was replaced; relative dates restart with it.
+        state["last_date"] = None
+    records, invalid = prepare_entries(entries, state["last_date"])
+    errors.update(invalid)
+
+    merged = {}
+    for record in records:
+        day = record["Date"]
+        if day not in merged:
+            # The day's own row; timed rows of the same day are left as they are.
+            existing = [r for r in store.journal_range(day, day) if r["Date"] == day]
+            merged[day] = existing[0] if existing else {}
+        merged[day].update(record)
+    changed = store.upsert_journal(merged.values())
+    if parser is not None and changed:
+        errors.update(store.refresh_daily_nutrients(parser, changed))
+
+    store.set_meta(
+        f"journal_log:{key}",
+        {
+            "offset": offset,
+            "last_date": records[-1]["Date"] if records else state["last_date"],
+        },
+    )
+    return changed, errors
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
@@ -0,0 +1,214 @@
+import numpy as np
+from scipy import sparse
+from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+
+from calculate_nutrition import formula_food_name
+
+# Target names, as in `Nutrient.to_dict()`, and their nutrition_values.json keys
+TARGET_KEYS = {
+    "calories": "Calories / 100g",
+    "protein": "Protéine",
+    "fat": "Fat",
+    "sfat": "SFat",
+    "carbs": "Carbs",
+    "sugar": "Sugar",
+    "free_sugar": "Free sugar",
+    "fibres": "Fibres",
+    "salt": "Sel",
+    "alcohol": "Alcool",
+    "water": "Water",
+}
+
+
+def journal_foods(parser, formulas):
+    """
+    Names of the foods used in journal formulas, e.g. to plan only with foods
+    that were actually eaten.
+
+    Args:
+        parser (FormulaParser): Parser holding the food table.
+        formulas (iterable): 'recorded food' formulas; empty ones are skipped.
+
+    Returns:
+        set: Food names as keyed in `parser.nutrition_data`.
+    """
+    names = set()
+    for formula in formulas:
+        if not formula:
+            continue
+        _, food_vars_map, _ = parser._parse_and_prepare_formula(str(formula))
+        names.update(
+            parser.normalization_map[parser._normalize(name)]
+            for name in food_vars_map.values()
+        )
+    return names
+
+
+def plan_meals(
+    parser,
+    targets,
+    foods=None,
+    max_quantity=3.0,
+    portion=0.01,
+    max_foods=None,
+    preferences=None,
+    max_candidates=100,
+    time_limit=10.0,
+):
+    """
+    Picks food quantities meeting daily nutrient targets with linear programming.
+
+    Each candidate food is a variable, its quantity in units of 100g as in the
+    journal formulas, and each target bounds a nutrient total, a row of the
+    sparse nutrient matrix. The objective is the total (preference-weighted)
+    quantity, so the plan is the lightest one meeting the targets.
+
+    The LP relaxation is first solved over every candidate food. Whole portions
+    and the `max_foods` limit are then enforced by a MILP restricted to the foods
+    of the LP solution and the `max_candidates` foods with the smallest reduced
+    costs, which keeps the integer stage small; both stages run HiGHS through scipy.
+
+    Args:
+        parser (FormulaParser): Parser holding the per-100g food table.
+        targets (dict): Maps target names of `TARGET_KEYS` to (min, max) totals, None
+            for an open side, e.g. {"calories": (1800, 2200), "protein": (120, None),
+            "salt": (None, 5)}.
+        foods (iterable, optional): Candidate food names, e.g. from `journal_foods`;
+            every food of the parser by default. Foods missing a targeted nutrient
+            are left out, since the parser would count it as 0.
+        max_quantity (float): Upper bound on each food, in units of 100g.
+        portion (float): Quantities are whole multiples of it; the default of 0.01
+            (1g) makes the rounded formula still meet the targets exactly.
+        max_foods (int, optional): Maximum number of distinct foods in the plan.
+        preferences (dict, optional): Maps food names to a cost per 100g (default 1);
+            lower costs make a food more likely to be picked.
+        max_candidates (int): Foods considered by the integer stage besides those of
+            the LP solution.
+        time_limit (float): Time limit of each solver stage, in seconds.
+
+    Returns:
+        tuple: (formula, quantities, totals)
+            formula (str): Journal formula, e.g. '1.5 * Pomme + 0.8 * Oeuf au plat';
+                names that would not parse back are spelled per `formula_food_name`.
+            quantities (dict): Maps food names to quantities, in units of 100g.
+            totals (Nutrient): The formula evaluated back by the parser.
+
+    Raises:
+        ValueError: If a target or food is unknown or no plan meets the targets.
+    """
+    unknown = set(targets) - set(TARGET_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown target(s): {', '.join(sorted(unknown))}")
+    keys = [TARGET_KEYS[name] for name in targets]
+
+    if foods is None:
+        names = list(parser.nutrition_data)
+    else:
+        names = []
+        for name in foods:
+            normalized_name = parser._normalize(name)
+            if normalized_name not in parser.normalization_map:
+                raise ValueError(f"Undefined food item: {name}")
+            names.append(parser.normalization_map[normalized_name])
+        names = list(dict.fromkeys(names))
+    candidates = [
+        (name, parser.nutrition_data[name])
+        for name in names
+        if all(parser.nutrition_data[name].get(key) is not None for key in keys)
+    ]
+    if not candidates:
+        raise ValueError("No candidate food has values for every targeted nutrient.")
+    names = [name for name, _ in candidates]
+
+    # Nutrient totals as rows of a sparse (n_targets, n_foods) matrix.
+    nutrient_matrix = sparse.csr_array(
+        np.array([[row[key] for _, row in candidates] for key in keys], dtype=float)
+    )
+    lower = np.array([-np.inf if lo is None else lo for lo, _ in targets.values()])
+    upper = np.array([np.inf if hi is None else hi for _, hi in targets.values()])
+    preferences = preferences or {}
+    cost = np.array([preferences.get(name, 1.0) for name in names], dtype=float)
+
+    # LP relaxation over every candidate, as A x <= upper and -A x <= -lower rows.
+    has_upper, has_lower = np.isfinite(upper), np.isfinite(lower)
+    relaxation = linprog(
+        cost,
+        A_ub=sparse.vstack(
+            [nutrient_matrix[has_upper], -nutrient_matrix[has_lower]], format="csr"
+        ),
+        b_ub=np.r_[upper[has_upper], -lower[has_lower]],
+        bounds=(0, max_quantity),
+        method="highs",
+        options={"time_limit": time_limit},
+    )
+    if relaxation.status != 0:
+        raise ValueError(f"No meal plan meets the targets: {relaxation.message}")
+
+    reduced_costs = relaxation.lower.marginals
+    keep = np.union1d(
+        np.flatnonzero(relaxation.x > 1e-9),
+        np.argsort(reduced_costs, kind="stable")[:max_candidates],
+    )
+    quantities = _integer_plan(
+        nutrient_matrix[:, keep],
+        lower,
+        upper,
+        cost[keep],
+        max_quantity,
+        portion,
+        max_foods,
+        time_limit,
+    )
+    quantities = {
+        names[i]: round(float(q), 6) for i, q in zip(keep, quantities) if q > 0
+    }
+    formula = " + ".join(
+        f"{q:g} * {formula_food_name(name)}" for name, q in quantities.items()
+    )
+    totals = parser.calculate_nutrition_for_day(formula, "") if formula else None
+    return formula, quantities, totals
+
+
+def _integer_plan(
+    nutrient_matrix, lower, upper, cost, max_quantity, portion, max_foods, time_limit
+):
+    # Variables are whole portions, plus with max_foods one binary "used" flag per
+    # food: portions <= max_portions * used and sum(used) <= max_foods.
+    n_targets, n = nutrient_matrix.shape
+    n_used = 0 if max_foods is None else n
+    max_portions = np.floor(max_quantity / portion + 1e-9)
+
+    constraints = [
+        LinearConstraint(
+            sparse.hstack(
+                [nutrient_matrix * portion, sparse.csr_array((n_targets, n_used))]
+            ),
+            lower,
+            upper,
+        )
+    ]
+    if n_used:
+        identity = sparse.eye_array(n)
+        constraints += [
+            LinearConstraint(
+                sparse.hstack([identity, -max_portions * identity]), -np.inf, 0
+            ),
+            LinearConstraint(
+                sparse.hstack(
+                    [sparse.csr_array((1, n)), sparse.csr_array(np.ones((1, n)))]
+                ),
+                0,
+                max_foods,
+            ),
+        ]
+
+    result = milp(
+        np.r_[cost * portion, np.zeros(n_used)],
+        integrality=np.ones(n + n_used),
+        bounds=Bounds(0, np.r_[np.full(n, max_portions), np.ones(n_used)]),
+        constraints=constraints,
+        options={"time_limit": time_limit},
+    )
+    if result.x is None:
+        raise ValueError(f"No meal plan meets the targets: {result.message}")
+    return np.round(result.x[:n]) * portion
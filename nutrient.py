@@ -88,9 +88,11 @@ class Nutrient:
             return new_nutrient
         elif isinstance(other, (int, float)):
             # When adding a float, assume it's an adjustment to calories
-            new_data = self.to_dict()  # Start with current values
+            new_data = self.to_nutrition_values()  # Start with current values
             new_data["Calories / 100g"] = self.calories + other
-            return Nutrient(new_data)
+            new_nutrient = Nutrient(new_data)
+            new_nutrient.missing_foods = list(self.missing_foods)
+            return new_nutrient
         return NotImplemented
 
     def __radd__(self, other):
@@ -117,9 +119,11 @@ class Nutrient:
             return new_nutrient
         elif isinstance(other, (int, float)):
             # When subtracting a float, assume it's an adjustment to calories
-            new_data = self.to_dict()  # Start with current values
+            new_data = self.to_nutrition_values()  # Start with current values
             new_data["Calories / 100g"] = self.calories - other
-            return Nutrient(new_data)
+            new_nutrient = Nutrient(new_data)
+            new_nutrient.missing_foods = list(self.missing_foods)
+            return new_nutrient
         return NotImplemented
 
     def __rsub__(self, other):
@@ -127,7 +131,7 @@ class Nutrient:
         if isinstance(other, (int, float)):
             # This is less common, but if it happens, it means 'float - Nutrient'
             # We'll assume it means 'float - Nutrient.calories' and other nutrients are negative
-            new_data = self.to_dict()
+            new_data = self.to_nutrition_values()
             new_data["Calories / 100g"] = other - self.calories
             # For other nutrients, it's ambiguous, so we'll make them negative
             for key in new_data:
@@ -151,6 +155,22 @@ class Nutrient:
     def __repr__(self):
         return f"Nutrient(cal={self.calories}, prot={self.protein}, fat={self.fat}, sodium={self.sodium})"
 
+    def to_nutrition_values(self):
+        # Inverse of __init__: the values keyed like the rows of nutrition_values.json
+        return {
+            "Calories / 100g": self.calories,
+            "Protéine": self.protein,
+            "Fat": self.fat,
+            "SFat": self.sfat,
+            "Carbs": self.carbs,
+            "Sugar": self.sugar,
+            "Free sugar": self.free_sugar,
+            "Fibres": self.fibres,
+            "Sel": self.salt,
+            "Alcool": self.alcohol,
+            "Water": self.water,
+        }
+
     def to_dict(self):
         return {
             "calories": self.calories,
@@ -166,3 +186,7 @@ class Nutrient:
             "water": self.water,
             "sodium": self.sodium,
         }
+
+
+# Keys of the nutrient columns, as in nutrition_values.json
+NUTRIENT_KEYS = list(Nutrient({}).to_nutrition_values())
@@ -0,0 +1,259 @@
+import json
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.spatial import cKDTree
+
+from nutrient import NUTRIENT_KEYS
+
+# Imputed values are capped by the nutrient that contains them.
+UPPER_BOUNDS = {"SFat": "Fat", "Sugar": "Carbs", "Free sugar": "Sugar"}
+
+
+def name_token_matrix(names, min_length=3):
+    """
+    Name tokens of each food as rows of a sparse matrix.
+
+    Tokens are the words of the name with at least `min_length` letters, without
+    case and accents, weighted by their inverse document frequency so that 'poulet'
+    counts more than 'sauce'. Rows are scaled to unit length: the dot product of
+    two rows is the cosine similarity of the names.
+
+    Returns:
+        tuple: (matrix, idf), a (n_foods, n_tokens) CSR array and the token weights.
+    """
+    words = (
+        pd.Series(names, dtype=object)
+        .str.lower()
+        .str.normalize("NFKD")
+        .str.encode("ascii", "ignore")
+        .str.decode("ascii")
+        .str.findall(rf"[a-z]{{{min_length},}}")
+        .map(set)
+        .explode()
+        .dropna()
+    )
+    columns, vocabulary = pd.factorize(words)
+    rows = words.index.to_numpy()
+    matrix = sparse.csr_array(
+        (np.ones(len(rows)), (rows, columns)), shape=(len(names), len(vocabulary))
+    )
+    frequency = np.bincount(columns, minlength=len(vocabulary))
+    idf = np.log((1 + len(names)) / (1 + frequency)) + 1
+    matrix = sparse.csr_array(matrix * idf)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+    matrix = sparse.csr_array(
+        sparse.diags_array(1 / np.where(norms > 0, norms, 1.0)) @ matrix
+    )
+    return matrix, idf
+
+
+def impute_missing_nutrients(
+    nutrition_list,
+    k=5,
+    n_candidates=30,
+    n_name_candidates=10,
+    n_components=4,
+    name_weight=1.0,
+    chunk_size=2000,
+):
+    """
+    Estimates the missing nutrient values of a food table from similar foods.
+
+    Candidates for each food with missing values are its `n_candidates` nearest
+    foods in nutrients, plus up to `n_name_candidates` foods sharing its rarest name
+    token. The nearest foods come from one KD-tree over the leading
+    `n_components` principal components of the standardized values (missing ones
+    at the column mean), since KD-trees slow down sharply beyond a few dimensions.
+
+    Each candidate is scored by the RMS standardized difference over the nutrients
+    both foods have, plus `name_weight` times one minus the cosine similarity of
+    the names. A missing nutrient is the inverse-score weighted mean of the `k`
+    best candidates having it, capped per `UPPER_BOUNDS`.
+
+    Foods are processed in chunks of (food, candidate, nutrient) arrays, so the
+    work is linear in the number of foods, with no loop over food pairs. Foods
+    without any nutrient value are left as they are.
+
+    Args:
+        nutrition_list (list): Rows of nutrition_values.json.
+        k (int): Neighbours averaged per missing value.
+        n_candidates (int): Nearest foods in nutrients considered per food.
+        n_name_candidates (int): Foods sharing the rarest name token considered.
+        n_components (int): Dimensions of the candidate search.
+        name_weight (float): Weight of the name dissimilarity in the score.
+        chunk_size (int): Foods scored at once; bounds the memory use.
+
+    Returns:
+        list: One record per food with imputed values, e.g. {"Nom": "Crêpe",
+            "Imputed": {"Fibres": 1.2}, "Neighbours": ["Crêpe sucrée", ...]}.
+    """
+    rows = [item for item in nutrition_list if "Nom" in item]
+    names = [item["Nom"] for item in rows]
+    values = np.array(
+        [
+            [np.nan if item.get(key) is None else item[key] for key in NUTRIENT_KEYS]
+            for item in rows
+        ],
+        dtype=float,
+    ).reshape(len(rows), len(NUTRIENT_KEYS))
+    present = ~np.isnan(values)
+    counts = np.maximum(present.sum(axis=0), 1)
+    mean = np.nansum(values, axis=0) / counts
+    scale = np.sqrt(np.nansum((values - mean) ** 2, axis=0) / counts)
+    scaled = np.where(present, (values - mean) / np.where(scale > 0, scale, 1.0), 0)
+    filled = np.nan_to_num(values)
+    targets = np.flatnonzero(~present.all(axis=1) & present.any(axis=1))
+    if len(targets) == 0:
+        return []
+
+    tokens, idf = name_token_matrix(names)
+    postings = tokens.tocsc()
+    postings.sort_indices()
+    rarest = np.full(len(rows), -1)
+    has_tokens = np.diff(tokens.indptr) > 0
+    token_idf = idf[tokens.indices]
+    # Position of the highest idf within each row's slice of `tokens.indices`.
+    row_of = np.repeat(np.arange(len(rows)), np.diff(tokens.indptr))
+    order = np.lexsort((-token_idf, row_of))
+    rarest[has_tokens] = tokens.indices[order[tokens.indptr[:-1][has_tokens]]]
+
+    _, _, components = np.linalg.svd(scaled, full_matrices=False)
+    projected = scaled @ components[:n_components].T
+    tree = cKDTree(projected)
+    imputed = np.full(values.shape, np.nan)
+    neighbours = np.full((len(rows), k), -1)
+    n_tree = min(n_candidates + 1, len(rows))
+    for start in range(0, len(targets), chunk_size):
+        chunk = targets[start : start + chunk_size]
+        _, nearest = tree.query(projected[chunk], k=n_tree, workers=-1)
+        candidates = np.hstack(
+            [
+                nearest.reshape(len(chunk), n_tree),
+                _posting_candidates(postings, rarest[chunk], n_name_candidates),
+            ]
+        )
+        candidates.sort(axis=1)
+        valid = (candidates >= 0) & (candidates != chunk[:, None])
+        valid[:, 1:] &= candidates[:, 1:] != candidates[:, :-1]
+        candidates = np.where(valid, candidates, 0)
+
+        shared = present[chunk][:, None, :] & present[candidates]
+        n_shared = shared.sum(axis=2)
+        difference = (scaled[candidates] - scaled[chunk][:, None, :]) * shared
+        distance = np.sqrt(
+            np.einsum("ijk,ijk->ij", difference, difference) / np.maximum(n_shared, 1)
+        )
+        similarity = np.asarray(
+            tokens[np.repeat(chunk, candidates.shape[1])]
+            .multiply(tokens[candidates.ravel()])
+            .sum(axis=1)
+        ).reshape(candidates.shape)
+        score = np.where(
+            valid & (n_shared > 0), distance + name_weight * (1 - similarity), np.inf
+        )
+
+        n_best = min(k, score.shape[1])
+        for j in range(len(NUTRIENT_KEYS)):
+            needed = ~present[chunk, j]
+            if not needed.any():
+                continue
+            masked = np.where(present[candidates[needed], j], score[needed], np.inf)
+            best = np.argpartition(masked, n_best - 1, axis=1)[:, :n_best]
+            best_score = np.take_along_axis(masked, best, axis=1)
+            donors = np.take_along_axis(candidates[needed], best, axis=1)
+            weights = np.where(np.isfinite(best_score), 1 / (best_score + 1e-6), 0)
+            total = weights.sum(axis=1)
+            estimate = (weights * filled[donors, j]).sum(axis=1)
+            imputed[chunk[needed], j] = np.where(
+                total > 0, estimate / np.where(total > 0, total, 1), np.nan
+            )
+
+        best = np.argsort(score, axis=1, kind="stable")[:, :k]
+        neighbours[chunk, : best.shape[1]] = np.where(
+            np.isfinite(np.take_along_axis(score, best, axis=1)),
+            np.take_along_axis(candidates, best, axis=1),
+            -1,
+        )
+
+    for key, bound_key in UPPER_BOUNDS.items():
+        j, b = NUTRIENT_KEYS.index(key), NUTRIENT_KEYS.index(bound_key)
+        bound = np.where(present[:, b], values[:, b], imputed[:, b])
+        imputed[:, j] = np.where(
+            np.isnan(bound), imputed[:, j], np.minimum(imputed[:, j], bound)
+        )
+
+    has_estimate = ~np.isnan(imputed)
+    foods = np.flatnonzero(has_estimate.any(axis=1))
+    records = []
+    for food, estimates, flags, food_neighbours in zip(
+        foods.tolist(),
+        np.round(imputed[foods], 4).tolist(),
+        has_estimate[foods].tolist(),
+        neighbours[foods].tolist(),
+    ):
+        records.append(
+            {
+                "Nom": names[food],
+                "Imputed": {
+                    key: value
+                    for key, value, flag in zip(NUTRIENT_KEYS, estimates, flags)
+                    if flag
+                },
+                "Neighbours": [names[i] for i in food_neighbours if i >= 0],
+            }
+        )
+    return records
+
+
+def _posting_candidates(postings, tokens, n):
+    # Up to n foods listed under each token, padded with -1 (also for token -1).
+    if n == 0 or postings.shape[1] == 0:
+        return np.full((len(tokens), n), -1)
+    has_token = tokens >= 0
+    safe_tokens = np.where(has_token, tokens, 0)
+    starts = postings.indptr[safe_tokens]
+    lengths = np.where(has_token, postings.indptr[safe_tokens + 1] - starts, 0)
+    offsets = np.arange(n)
+    keep = offsets < lengths[:, None]
+    positions = np.where(keep, starts[:, None] + offsets, 0)
+    return np.where(keep, postings.indices[positions], -1)
+
+
+def save_imputations(records, path="nutrition_imputed.json"):
+    with open(path, "w") as f:
+        json.dump(records, f, indent=2, ensure_ascii=False)
+
+
+def load_imputations(path="nutrition_imputed.json"):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def apply_imputations(nutrition_list, records):
+    """
+    Fills the missing values of food rows with imputed ones.
+
+    Only values still missing are filled, so corrections made to the table since the
+    imputation win. Filled rows are copies with an 'Imputed' key listing the filled
+    nutrients, which keeps the provenance of every value.
+
+    Args:
+        nutrition_list (list): Rows of nutrition_values.json.
+        records (list): Records of `impute_missing_nutrients`.
+
+    Returns:
+        list: The rows, filled where possible.
+    """
+    imputed = {record["Nom"]: record["Imputed"] for record in records}
+    filled_list = []
+    for item in nutrition_list:
+        estimates = imputed.get(item.get("Nom"), {})
+        filled = {
+            key: value for key, value in estimates.items() if item.get(key) is None
+        }
+        if filled:
+            item = {**item, **filled, "Imputed": sorted(filled)}
+        filled_list.append(item)
+    return filled_list
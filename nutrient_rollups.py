@@ -0,0 +1,263 @@
+import numpy as np
+import pandas as pd
+
+from nutrient import Nutrient
+
+NUTRIENT_COLUMNS = list(Nutrient({}).to_dict())
+MODEL_COLUMNS = ["Base_Metabolism", "Water_Retention"]
+
+
+class RollupIndex:
+    """
+    Range sums over a daily matrix of nutrients and model outputs.
+
+    Days live on a contiguous grid (row i is `start_date + i days`), so locating a
+    date is O(1). Sums and counts of present values are kept in one Fenwick tree
+    per column (the columns share the tree layout and are updated together), so
+    appending or editing any day and any date-range sum, count or mean are all
+    O(log N). Missing values are NaN and are left out of sums and means.
+
+    Whole-series queries (rolling and period means) read every day anyway and use
+    plain prefix sums of the values instead.
+    """
+
+    def __init__(self, columns=NUTRIENT_COLUMNS + MODEL_COLUMNS, start_date=None):
+        self.columns = list(columns)
+        self._column_index = {c: i for i, c in enumerate(self.columns)}
+        self.start_date = None if start_date is None else _to_day(start_date)
+        self._n = 0
+        self._values = np.full((16, len(self.columns)), np.nan)
+        # Fenwick trees over the capacity of `_values`, 1-based (row 0 unused).
+        self._tree_sum = np.zeros((17, len(self.columns)))
+        self._tree_count = np.zeros((17, len(self.columns)), dtype=np.int64)
+
+    @classmethod
+    def from_frame(cls, df, columns=None):
+        """Builds the index from a date-indexed DataFrame (one row per day at most)."""
+        columns = list(df.columns) if columns is None else list(columns)
+        if df.empty:
+            return cls(columns)
+        days = pd.DatetimeIndex(df.index).values.astype("datetime64[D]")
+        index = cls(columns, start_date=days.min())
+        index._reserve(int((days.max() - days.min()).astype(int)) + 1)
+        rows = (days - index.start_date).astype(int)
+        index._values[rows] = df[columns].to_numpy(dtype=float)
+        index._n = int(rows.max()) + 1
+        index._build_trees()
+        return index
+
+    @classmethod
+    def from_store(cls, store):
+        """Builds the index from the per-day nutrients and model outputs of a NutritionStore."""
+        from nutrition_store import MODEL_COLUMNS as STORE_MODEL_COLUMNS
+
+        # Explicit columns, so that an empty store gives an empty frame.
+        nutrients = pd.DataFrame(
+            store.daily_nutrients_range(), columns=["date"] + NUTRIENT_COLUMNS
+        ).set_index("date")
+        model = (
+            pd.DataFrame(
+                store.model_results_range(),
+                columns=["date"] + list(STORE_MODEL_COLUMNS.values()),
+            )
+            .set_index("date")
+            .rename(columns={v: k for k, v in STORE_MODEL_COLUMNS.items()})
+        )
+        nutrients = nutrients.join(model[MODEL_COLUMNS], how="outer")
+        nutrients.index = pd.to_datetime(nutrients.index)
+        return cls.from_frame(nutrients)
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def end_date(self):
+        return (
+            None if self._n == 0 else self.start_date + np.timedelta64(self._n - 1, "D")
+        )
+
+    def set_day(self, day, values):
+        """
+        Appends or edits one day.
+
+        Args:
+            day: The date of the row.
+            values (dict | Nutrient): Column values; a Nutrient is converted with `to_dict()`.
+                Columns that are not given keep their previous value.
+        """
+        if isinstance(values, Nutrient):
+            values = values.to_dict()
+        day = _to_day(day)
+        if self.start_date is None:
+            self.start_date = day
+        if day < self.start_date:
+            self._prepend((self.start_date - day).astype(int))
+        i = int((day - self.start_date).astype(int))
+        if i >= self._n:
+            # Days skipped between the old end and this one stay missing.
+            self._reserve(i + 1)
+            self._n = i + 1
+
+        old = self._values[i].copy()
+        for column, value in values.items():
+            if column in self._column_index:
+                self._values[i, self._column_index[column]] = (
+                    np.nan if value is None else value
+                )
+        new = self._values[i]
+        self._tree_add(
+            i,
+            np.nan_to_num(new) - np.nan_to_num(old),
+            ~np.isnan(new) * 1 - ~np.isnan(old) * 1,
+        )
+
+    def range_sum(self, start=None, end=None):
+        """Sums of every column over [start, end] (inclusive), ignoring missing values."""
+        lo, hi = self._bounds(start, end)
+        return pd.Series(
+            self._tree_prefix(self._tree_sum, hi)
+            - self._tree_prefix(self._tree_sum, lo),
+            index=self.columns,
+        )
+
+    def range_count(self, start=None, end=None):
+        """Number of days with a value, per column, over [start, end]."""
+        lo, hi = self._bounds(start, end)
+        return pd.Series(
+            self._tree_prefix(self._tree_count, hi)
+            - self._tree_prefix(self._tree_count, lo),
+            index=self.columns,
+        )
+
+    def range_mean(self, start=None, end=None):
+        """Means of every column over [start, end], NaN for columns without values."""
+        lo, hi = self._bounds(start, end)
+        counts = self._tree_prefix(self._tree_count, hi) - self._tree_prefix(
+            self._tree_count, lo
+        )
+        sums = self._tree_prefix(self._tree_sum, hi) - self._tree_prefix(
+            self._tree_sum, lo
+        )
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.Series(
+                np.where(counts > 0, sums / counts, np.nan), index=self.columns
+            )
+
+    def rolling_mean(self, window, columns=None, min_periods=1):
+        """
+        Trailing `window`-day means for every day, from prefix-sum differences.
+
+        Returns:
+            pd.DataFrame: Date-indexed means; NaN where fewer than `min_periods` values.
+        """
+        prefix_sum, prefix_count = self._prefixes()
+        upper = np.arange(1, self._n + 1)
+        lower = np.maximum(upper - window, 0)
+        sums = prefix_sum[upper] - prefix_sum[lower]
+        counts = prefix_count[upper] - prefix_count[lower]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(counts >= min_periods, sums / counts, np.nan)
+        df = pd.DataFrame(means, index=self._dates(), columns=self.columns)
+        return df if columns is None else df[list(columns)]
+
+    def period_means(self, freq="W", columns=None):
+        """
+        Means per calendar period, e.g. 'W' for weeks or 'M' for months.
+
+        Returns:
+            pd.DataFrame: One row per period, indexed by the period's first day.
+        """
+        prefix_sum, prefix_count = self._prefixes()
+        dates = self._dates()
+        period_starts = dates.to_period(freq).start_time
+        boundaries = np.flatnonzero(
+            np.r_[True, period_starts[1:] != period_starts[:-1]]
+        )
+        lower = boundaries
+        upper = np.r_[boundaries[1:], self._n]
+        sums = prefix_sum[upper] - prefix_sum[lower]
+        counts = prefix_count[upper] - prefix_count[lower]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(counts > 0, sums / counts, np.nan)
+        df = pd.DataFrame(means, index=period_starts[lower], columns=self.columns)
+        return df if columns is None else df[list(columns)]
+
+    def to_frame(self):
+        return pd.DataFrame(
+            self._values[: self._n], index=self._dates(), columns=self.columns
+        )
+
+    def _dates(self):
+        if self._n == 0:
+            return pd.DatetimeIndex([])
+        return pd.date_range(pd.Timestamp(self.start_date), periods=self._n, freq="D")
+
+    def _bounds(self, start, end):
+        # Converts an inclusive date range into [lo, hi) prefix positions.
+        if self._n == 0:
+            return 0, 0
+        lo = 0 if start is None else (_to_day(start) - self.start_date).astype(int)
+        hi = (
+            self._n if end is None else (_to_day(end) - self.start_date).astype(int) + 1
+        )
+        lo = int(np.clip(lo, 0, self._n))
+        hi = int(np.clip(hi, lo, self._n))
+        return lo, hi
+
+    def _prefixes(self, n=None):
+        # Prefix sums and counts of the first n rows (every day by default).
+        rows = self._values[: self._n if n is None else n]
+        present = ~np.isnan(rows)
+        zeros = np.zeros((1, len(self.columns)))
+        prefix_sum = np.vstack([zeros, np.cumsum(np.where(present, rows, 0.0), axis=0)])
+        prefix_count = np.vstack([zeros, np.cumsum(present, axis=0)]).astype(np.int64)
+        return prefix_sum, prefix_count
+
+    def _build_trees(self):
+        # Fenwick node p holds the rows (p - lowbit(p), p], read off prefix sums in O(N).
+        prefix_sum, prefix_count = self._prefixes(len(self._values))
+        nodes = np.arange(len(prefix_sum))
+        lower = np.maximum(nodes - (nodes & -nodes), 0)
+        self._tree_sum = prefix_sum - prefix_sum[lower]
+        self._tree_count = prefix_count - prefix_count[lower]
+
+    def _tree_add(self, i, delta_sum, delta_count):
+        p = i + 1
+        while p < len(self._tree_sum):
+            self._tree_sum[p] += delta_sum
+            self._tree_count[p] += delta_count
+            p += p & -p
+
+    @staticmethod
+    def _tree_prefix(tree, k):
+        # Sums of the first k rows.
+        total = np.zeros(tree.shape[1], dtype=tree.dtype)
+        while k > 0:
+            total += tree[k]
+            k -= k & -k
+        return total
+
+    def _reserve(self, n):
+        # Grows the arrays geometrically so that appends are amortized O(log N).
+        capacity = len(self._values)
+        if n <= capacity:
+            return
+        new_capacity = max(n, 2 * capacity)
+        values = np.full((new_capacity, len(self.columns)), np.nan)
+        values[:capacity] = self._values
+        self._values = values
+        # The tree layout depends on its size, so it is rebuilt, amortized O(1) per day.
+        self._build_trees()
+
+    def _prepend(self, n_days):
+        n_days = int(n_days)
+        self._reserve(self._n + n_days)
+        self._values[n_days : n_days + self._n] = self._values[: self._n].copy()
+        self._values[:n_days] = np.nan
+        self._n += n_days
+        self.start_date = self.start_date - np.timedelta64(n_days, "D")
+        self._build_trees()
+
+
+def _to_day(value):
+    return np.datetime64(pd.Timestamp(value).date(), "D")
@@ -0,0 +1,475 @@
+"""
+Single command-line entry point for the nutrition analysis scripts.
+
+Heavy dependencies (pandas, scipy, openpyxl, matplotlib) are only imported inside
+the subcommand that needs them, so quick commands such as `search` start fast.
+
+Examples:
+    python nutrition_cli.py ingest --workbook "Journal nutrition.xlsx"
+    python nutrition_cli.py log --food "2 * Pomme" --weight 80.1 --sqlite nutrition.sqlite3
+    python nutrition_cli.py nutrition "1.5 * Pomme + 2 * Oeuf au plat"
+    python nutrition_cli.py search mojito
+    python nutrition_cli.py impute --output nutrition_imputed.json
+    python nutrition_cli.py similar "Pâtes bolognaise" -k 10 --lower Sel
+    python nutrition_cli.py plan --target calories=1800:2200 protein=120: salt=:5
+    python nutrition_cli.py fit --lambda 1.0 --bootstrap 200 --seed 0
+    python nutrition_cli.py forecast --calories 1800 2000 2200 --sport 0 300 --target 75
+    python nutrition_cli.py water --sqlite nutrition.sqlite3 --lags 7
+    python nutrition_cli.py changes --min-size 14
+    python nutrition_cli.py export --output "Journal nutrition résultats.xlsx"
+    python nutrition_cli.py plot
+    python nutrition_cli.py serve --port 8765
+"""
+
+import argparse
+import json
+import sys
+
+from defaults import RESULTS_CSV_PATH
+
+
+def cmd_ingest(args):
+    from process_journal_food_sport_weight import ingest_journal
+
+    journal_df = ingest_journal(
+        args.workbook, args.journal, args.nutrition_db, args.start_date, args.sqlite
+    )
+    return 0 if journal_df is not None else 1
+
+
+def cmd_log(args):
+    from journal_log import append_entry
+
+    entry = {
+        "Date": args.date,
+        "recorded food": args.food,
+        "weight": args.weight,
+        "sport": args.sport,
+        "Sport ajusté": args.sport_calories,
+    }
+    append_entry(args.log, {k: v for k, v in entry.items() if v is not None})
+    if args.sqlite:
+        from calculate_nutrition import FormulaParser
+        from journal_log import tail_journal_log
+        from nutrition_store import NutritionStore
+
+        with NutritionStore(args.sqlite) as store:
+            parser = FormulaParser(nutrition_list=store.load_nutrition_list())
+            changed, errors = tail_journal_log(args.log, store, parser)
+        print(f"{len(changed)} journal days added or changed")
+        for position, error in errors.items():
+            print(f"Skipped {position}: {error}")
+        return 1 if errors else 0
+    return 0
+
+
+def cmd_nutrition(args):
+    from calculate_nutrition import FormulaParser
+
+    parser = FormulaParser(
+        nutrition_data_path=args.nutrition_db, imputations_path=args.imputed
+    )
+    if args.recipes:
+        from recipes import RecipeBook
+
+        RecipeBook.from_file(args.recipes).materialize(parser, args.recipes_cache)
+    total = parser.calculate_nutrition_for_day(args.formula, args.date)
+    print(json.dumps(total.to_dict(), indent=2))
+    return 0
+
+
+def cmd_search(args):
+    from search_similar_foods import search_food_items
+
+    matches = search_food_items(args.nutrition_db, args.term, args.limit)
+    if not matches:
+        print(f"No '{args.term}' item found.")
+        return 1
+    print(json.dumps(matches, indent=2, ensure_ascii=False))
+    return 0
+
+
+def cmd_similar(args):
+    from search_similar_foods import NutrientSimilarityIndex
+
+    index = NutrientSimilarityIndex.from_json(args.nutrition_db, basis=args.basis)
+    for food in args.foods:
+        if args.lower or args.higher:
+            found = index.alternatives(
+                food, args.lower or args.higher, args.k, lower=bool(args.lower)
+            )
+        else:
+            found = index.similar_foods(food, args.k)
+        print(f"{food}:")
+        for name, distance in found:
+            print(f"  {distance:8.3f}  {name}")
+    return 0
+
+
+def cmd_impute(args):
+    from nutrient_imputation import impute_missing_nutrients, save_imputations
+
+    with open(args.nutrition_db, "r") as f:
+        nutrition_list = json.load(f)
+    records = impute_missing_nutrients(
+        nutrition_list, k=args.k, name_weight=args.name_weight
+    )
+    save_imputations(records, args.output)
+    n_values = sum(len(record["Imputed"]) for record in records)
+    print(f"Imputed {n_values} values of {len(records)} foods into {args.output}.")
+    return 0
+
+
+def parse_target(text):
+    # 'protein=120:' -> ('protein', (120.0, None))
+    name, _, bounds = text.partition("=")
+    lower, _, upper = bounds.partition(":")
+    return name, (float(lower) if lower else None, float(upper) if upper else None)
+
+
+def cmd_plan(args):
+    from calculate_nutrition import FormulaParser
+    from meal_planner import journal_foods, plan_meals
+
+    parser = FormulaParser(nutrition_data_path=args.nutrition_db)
+    foods = None
+    if args.journal:
+        with open(args.journal, "r") as f:
+            records = json.load(f)
+        foods = journal_foods(parser, (r.get("recorded food") for r in records))
+    formula, _, totals = plan_meals(
+        parser,
+        dict(args.target),
+        foods=foods,
+        max_quantity=args.max_quantity,
+        portion=args.portion,
+        max_foods=args.max_foods,
+    )
+    print(formula)
+    print(json.dumps(totals.to_dict(), indent=2))
+    return 0
+
+
+def cmd_fit(args):
+    from run_new_model import run_new_weight_model
+
+    results_df = run_new_weight_model(
+        args.journal,
+        lambda_val=args.lambda_val,
+        output_csv_path=args.output,
+        n_bootstrap=args.bootstrap,
+        n_workers=args.workers,
+        seed=args.seed,
+        window_days=args.window_days,
+        overlap_days=args.overlap_days,
+    )
+    return 0 if results_df is not None else 1
+
+
+def cmd_forecast(args):
+    import numpy as np
+    import pandas as pd
+    from forecast_weight import forecast_from_results
+
+    # One constant plan per (calories, sport) pair.
+    plans = [(c, s) for c in args.calories for s in args.sport]
+    calories_in = np.repeat([[c] for c, _ in plans], args.days, axis=1)
+    calories_sport = np.repeat([[s] for _, s in plans], args.days, axis=1)
+    _, summary = forecast_from_results(
+        pd.read_csv(args.results),
+        calories_in,
+        calories_sport,
+        target_weight=args.target,
+        baseline_days=args.baseline_days,
+    )
+    summary.insert(0, "Calories", [c for c, _ in plans])
+    summary.insert(1, "Sport", [s for _, s in plans])
+    print(summary.round(2).to_string(index=False))
+    return 0
+
+
+def cmd_water(args):
+    import pandas as pd
+    from nutrition_store import NUTRIENT_COLUMNS, NutritionStore
+    from water_retention_model import explain_water_retention
+
+    results_df = pd.read_csv(args.results)
+    with NutritionStore(args.sqlite) as store:
+        nutrients_df = pd.DataFrame(
+            store.daily_nutrients_range(), columns=["date"] + NUTRIENT_COLUMNS
+        ).set_index("date")
+    if nutrients_df.empty:
+        print(f"No daily nutrients in {args.sqlite}.")
+        return 1
+    results_df, kernels = explain_water_retention(
+        results_df, nutrients_df, n_lags=args.lags
+    )
+    explained = 1 - results_df["Water_Unexplained"].var() / (
+        results_df["Water_Retention"].var()
+    )
+    print(kernels.to_string())
+    print(f"Share of water retention variance explained: {explained:.1%}")
+    results_df.to_csv(args.results, index=False)
+    return 0
+
+
+def cmd_changes(args):
+    import pandas as pd
+    from change_points import detect_change_points
+
+    results_df = pd.read_csv(args.results, parse_dates=["Timestamp"])
+    segments = detect_change_points(
+        results_df, args.columns, penalty=args.penalty, min_size=args.min_size
+    )
+    for column, summary in segments.items():
+        print(f"{column}:")
+        print(summary.round({"Mean": 2, "Shift": 2}).to_string(index=False))
+    return 0
+
+
+def cmd_export(args):
+    import pandas as pd
+    from excel_writeback import results_table, write_back_results
+
+    nutrients_df = None
+    if args.sqlite:
+        from nutrition_store import NutritionStore
+
+        with NutritionStore(args.sqlite) as store:
+            nutrients = store.daily_nutrients_range()
+        if nutrients:
+            nutrients_df = pd.DataFrame(nutrients).set_index("date")
+    table = results_table(pd.read_csv(args.results), nutrients_df)
+    written, changed = write_back_results(
+        args.workbook, args.output, table, sheet_name=args.sheet
+    )
+    if written:
+        print(f"Wrote {args.output} ({len(changed)} changed day(s)).")
+    else:
+        print(f"{args.output} is up to date.")
+    return 0
+
+
+def cmd_plot(args):
+    from create_plots import create_plots
+
+    create_plots(args.results, args.output_dir)
+    return 0
+
+
+def cmd_serve(args):
+    from nutrition_server import serve
+
+    serve(args.nutrition_db, args.journal, args.host, args.port, args.lambda_val)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="nutrition_cli.py", description="Nutrition and weight analysis tools."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest = subparsers.add_parser(
+        "ingest", help="Extract the Excel journal into JSON files."
+    )
+    ingest.add_argument("--workbook", default="Journal nutrition.xlsx")
+    ingest.add_argument("--journal", default="journal.json")
+    ingest.add_argument("--nutrition-db", default="nutrition_values.json")
+    ingest.add_argument(
+        "--start-date", default="2024-06-30", help="Keep journal rows after this date."
+    )
+    ingest.add_argument(
+        "--sqlite", default=None, help="Also upsert into this SQLite store."
+    )
+    ingest.set_defaults(func=cmd_ingest)
+
+    log = subparsers.add_parser(
+        "log", help="Append one day to the journal log, without the workbook."
+    )
+    log.add_argument(
+        "--date",
+        default="=",
+        help="YYYY-MM-DD; by default the day after the last entry.",
+    )
+    log.add_argument("--food", default=None, help="Food formula of the day.")
+    log.add_argument("--weight", type=float, default=None)
+    log.add_argument("--sport", default=None, help="Sport formula of the day.")
+    log.add_argument("--sport-calories", type=float, default=None)
+    log.add_argument("--log", default="journal.jsonl")
+    log.add_argument(
+        "--sqlite", default=None, help="Merge the log into this SQLite store."
+    )
+    log.set_defaults(func=cmd_log)
+
+    nutrition = subparsers.add_parser(
+        "nutrition", help="Compute the nutrients of a food formula."
+    )
+    nutrition.add_argument("formula")
+    nutrition.add_argument("--date", default="")
+    nutrition.add_argument("--nutrition-db", default="nutrition_values.json")
+    nutrition.add_argument(
+        "--recipes", default=None, help="JSON file of named composite recipes."
+    )
+    nutrition.add_argument("--recipes-cache", default="recipes_cache.json")
+    nutrition.add_argument(
+        "--imputed",
+        default=None,
+        help="Fill missing values from this file of the impute command.",
+    )
+    nutrition.set_defaults(func=cmd_nutrition)
+
+    search = subparsers.add_parser("search", help="Search foods by name.")
+    search.add_argument("term")
+    search.add_argument("--limit", type=int, default=None)
+    search.add_argument("--nutrition-db", default="nutrition_values.json")
+    search.set_defaults(func=cmd_search)
+
+    impute = subparsers.add_parser(
+        "impute", help="Estimate missing nutrient values from similar foods."
+    )
+    impute.add_argument("--nutrition-db", default="nutrition_values.json")
+    impute.add_argument("--output", default="nutrition_imputed.json")
+    impute.add_argument("-k", type=int, default=5, help="Neighbours per value.")
+    impute.add_argument(
+        "--name-weight",
+        type=float,
+        default=1.0,
+        help="Weight of name similarity against nutrient similarity.",
+    )
+    impute.set_defaults(func=cmd_impute)
+
+    similar = subparsers.add_parser(
+        "similar", help="Find foods with a similar nutrient profile."
+    )
+    similar.add_argument("foods", nargs="+")
+    similar.add_argument("-k", type=int, default=10)
+    similar.add_argument("--basis", choices=["100g", "100kcal"], default="100g")
+    alternative = similar.add_mutually_exclusive_group()
+    alternative.add_argument(
+        "--lower", default=None, help="Only foods with less of this nutrient."
+    )
+    alternative.add_argument(
+        "--higher", default=None, help="Only foods with more of this nutrient."
+    )
+    similar.add_argument("--nutrition-db", default="nutrition_values.json")
+    similar.set_defaults(func=cmd_similar)
+
+    plan = subparsers.add_parser(
+        "plan", help="Pick food quantities meeting daily nutrient targets."
+    )
+    plan.add_argument(
+        "--target",
+        type=parse_target,
+        nargs="+",
+        required=True,
+        help="Targets as name=min:max with an optional side, e.g. protein=120:",
+    )
+    plan.add_argument(
+        "--journal", default=None, help="Only use foods eaten in this journal."
+    )
+    plan.add_argument("--max-quantity", type=float, default=3.0)
+    plan.add_argument("--portion", type=float, default=0.01)
+    plan.add_argument("--max-foods", type=int, default=None)
+    plan.add_argument("--nutrition-db", default="nutrition_values.json")
+    plan.set_defaults(func=cmd_plan)
+
+    fit = subparsers.add_parser("fit", help="Fit the weight model.")
+    fit.add_argument("--journal", default="journal.json")
+    fit.add_argument("--output", default=RESULTS_CSV_PATH)
+    fit.add_argument(
+        "--lambda",
+        dest="lambda_val",
+        type=float,
+        default=1.0,
+        help="L2 regularization on B(t) differences.",
+    )
+    fit.add_argument(
+        "--bootstrap", type=int, default=0, help="Number of bootstrap refits."
+    )
+    fit.add_argument("--workers", type=int, default=None)
+    fit.add_argument("--seed", type=int, default=None)
+    fit.add_argument(
+        "--window-days", type=int, default=None, help="Enable the windowed fit."
+    )
+    fit.add_argument("--overlap-days", type=int, default=240)
+    fit.set_defaults(func=cmd_fit)
+
+    forecast = subparsers.add_parser(
+        "forecast", help="Forecast weight for constant calorie and sport plans."
+    )
+    forecast.add_argument("--results", default=RESULTS_CSV_PATH)
+    forecast.add_argument("--calories", type=float, nargs="+", required=True)
+    forecast.add_argument("--sport", type=float, nargs="+", default=[0.0])
+    forecast.add_argument("--days", type=int, default=90)
+    forecast.add_argument("--target", type=float, default=None)
+    forecast.add_argument(
+        "--baseline-days",
+        type=int,
+        default=14,
+        help="Days of fitted B(t) averaged for the forecast.",
+    )
+    forecast.set_defaults(func=cmd_forecast)
+
+    water = subparsers.add_parser(
+        "water", help="Explain water retention by lagged sodium, carbs and alcohol."
+    )
+    water.add_argument("--results", default=RESULTS_CSV_PATH)
+    water.add_argument(
+        "--sqlite", default="nutrition.sqlite3", help="Store with daily nutrients."
+    )
+    water.add_argument("--lags", type=int, default=7)
+    water.set_defaults(func=cmd_water)
+
+    changes = subparsers.add_parser(
+        "changes", help="Detect regime changes in the model results."
+    )
+    changes.add_argument("--results", default=RESULTS_CSV_PATH)
+    changes.add_argument(
+        "--columns", nargs="+", default=["Base_Metabolism", "Water_Retention"]
+    )
+    changes.add_argument(
+        "--penalty", type=float, default=None, help="Cost of one change point."
+    )
+    changes.add_argument("--min-size", type=int, default=7)
+    changes.set_defaults(func=cmd_changes)
+
+    export = subparsers.add_parser(
+        "export", help="Write the results into a copy of the journal workbook."
+    )
+    export.add_argument("--workbook", default="Journal nutrition.xlsx")
+    export.add_argument(
+        "--output",
+        default="Journal nutrition résultats.xlsx",
+        help="Updated copy; may be the workbook itself.",
+    )
+    export.add_argument("--results", default=RESULTS_CSV_PATH)
+    export.add_argument(
+        "--sqlite", default=None, help="Store with daily nutrients to include."
+    )
+    export.add_argument("--sheet", default="Résultats")
+    export.set_defaults(func=cmd_export)
+
+    plot = subparsers.add_parser("plot", help="Plot the model results.")
+    plot.add_argument("--results", default=RESULTS_CSV_PATH)
+    plot.add_argument("--output-dir", default="plots")
+    plot.set_defaults(func=cmd_plot)
+
+    serve = subparsers.add_parser("serve", help="Run the local nutrition daemon.")
+    serve.add_argument("--nutrition-db", default="nutrition_values.json")
+    serve.add_argument("--journal", default=None)
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--lambda", dest="lambda_val", type=float, default=1.0)
+    serve.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+import json
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from calculate_nutrition import FormulaParser
+
+logger = logging.getLogger(__name__)
+
+# Errors caused by the request itself (bad formula, missing field), answered with 400.
+CLIENT_ERRORS = (
+    ValueError,
+    KeyError,
+    TypeError,
+    SyntaxError,
+    NameError,
+    ZeroDivisionError,
+)
+
+
+class FormulaBatcher:
+    """
+    Coalesces concurrent formula evaluations into batches.
+
+    Requests are queued and a single worker thread drains everything that arrived
+    while the previous batch was running, evaluating each distinct formula once.
+    A lone request is evaluated immediately, so batching adds no latency.
+    Having one thread own the parser also keeps it free of concurrent access.
+    """
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.batches = 0
+        self.evaluations = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, formula, date_str=""):
+        future = Future()
+        self._queue.put((formula, date_str, future))
+        return future
+
+    def evaluate(self, formula, date_str="", timeout=None):
+        return self.submit(formula, date_str).result(timeout)
+
+    def _drain(self):
+        batch = [self._queue.get()]
+        try:
+            while True:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._drain()
+            pending = {}
+            for formula, date_str, future in batch:
+                pending.setdefault(formula, (date_str, []))[1].append(future)
+
+            self.batches += 1
+            for formula, (date_str, futures) in pending.items():
+                self.evaluations += 1
+                try:
+                    result = self.parser.calculate_nutrition_for_day(formula, date_str)
+                except Exception as e:
+                    for future in futures:
+                        future.set_exception(e)
+                else:
+                    for future in futures:
+                        future.set_result(result)
+
+
+class NutritionService:
+    """
+    In-memory state of the daemon: the warm parser, the food search index and the
+    latest weight model fit.
+    """
+
+    def __init__(
+        self,
+        nutrition_data_path="nutrition_values.json",
+        journal_path=None,
+        lambda_val=1.0,
+    ):
+        self.parser = FormulaParser(nutrition_data_path=nutrition_data_path)
+        # Warm the food regex now rather than on the first request.
+        self.parser._get_food_pattern()
+        self.batcher = FormulaBatcher(self.parser)
+
+        self._search_index = [
+            (name.lower(), item) for name, item in self.parser.nutrition_data.items()
+        ]
+
+        self.lambda_val = lambda_val
+        self.journal = []
+        self.results = None
+        self.segments = {}
+        self._model_lock = threading.Lock()
+        if journal_path:
+            with open(journal_path, "r") as f:
+                self.journal = json.load(f)
+            self._refit(self.journal)
+
+    def nutrition(self, formula, date_str=""):
+        return self.nutrition_many([formula], date_str)[0]
+
+    def nutrition_many(self, formulas, date_str=""):
+        # Submit everything first so the whole list lands in one batch.
+        futures = [self.batcher.submit(formula, date_str) for formula in formulas]
+        results = []
+        for formula, future in zip(formulas, futures):
+            total = future.result()
+            results.append(
+                {
+                    "formula": formula,
+                    "nutrients": total.to_dict(),
+                    "missing_foods": sorted(total.missing_foods),
+                }
+            )
+        return results
+
+    def search(self, search_term, limit=20):
+        search_term = search_term.lower()
+        matches = [item for name, item in self._search_index if search_term in name]
+        return matches[:limit]
+
+    def add_day(self, record):
+        """
+        Adds or replaces one journal record and refits the weight model.
+
+        A record replaces the one with the same 'Date' and time of day; records of
+        the same day at other times, e.g. a morning weigh-in, are kept. 'Cals' is
+        computed from 'recorded food' when it is not given.
+        """
+        if "Date" not in record:
+            raise ValueError("The new day must contain a 'Date'.")
+        record = dict(record)
+        if record.get("Cals") is None and record.get("recorded food"):
+            record["Cals"] = self.nutrition(record["recorded food"], record["Date"])[
+                "nutrients"
+            ]["calories"]
+
+        import pandas as pd
+
+        timestamp = pd.to_datetime(record["Date"])
+        with self._model_lock:
+            journal = [
+                d for d in self.journal if pd.to_datetime(d.get("Date")) != timestamp
+            ]
+            journal.append(record)
+            # The journal only takes the day once the refit succeeded, so that a
+            # failed request leaves the journal and the results as they were.
+            self._refit(journal)
+            self.journal = journal
+            if self.results is None:
+                return None
+            return self._results_row(-1)
+
+    def _refit(self, journal):
+        # Sets the results and segments of the journal together, or raises and
+        # leaves both as they were.
+        import pandas as pd
+        from run_new_model import (
+            fit_base_metabolism,
+            prepare_model_inputs,
+            simulate_weight,
+        )
+
+        from change_points import detect_change_points
+
+        df_model = prepare_model_inputs(pd.DataFrame(journal))
+        if df_model.empty:
+            self.results = None
+            self.segments = {}
+            return
+        W_obs = df_model["Pds"].values
+        C_in = df_model["Cals"].values
+        C_sport = df_model["Sport ajusté"].values
+        result = fit_base_metabolism(W_obs, C_in, C_sport, self.lambda_val)
+        if not result.success:
+            raise ValueError(f"Optimization failed: {result.message}")
+        W_act = simulate_weight(W_obs[0], C_in, C_sport, result.x)
+        results = pd.DataFrame(
+            {
+                "Timestamp": df_model.index.strftime("%Y-%m-%d"),
+                "Observed_Weight": W_obs,
+                "Actual_Weight": W_act,
+                "Base_Metabolism": result.x,
+                "Water_Retention": W_obs - W_act,
+            }
+        )
+        # Cheap next to the fit, so regimes are kept up to date on every refit.
+        segments = detect_change_points(results)
+        self.results, self.segments = results, segments
+
+    def _results_row(self, position):
+        row = self.results.iloc[position]
+        return {
+            key: row[key] if key == "Timestamp" else float(row[key])
+            for key in row.index
+        }
+
+    def model(self, last=1):
+        with self._model_lock:
+            if self.results is None:
+                return []
+            last = min(last, len(self.results))
+            return [self._results_row(i) for i in range(-last, 0)]
+
+    def change_points(self):
+        """Segments of the latest fit, per model output (see `detect_change_points`)."""
+        with self._model_lock:
+            return {
+                column: summary.to_dict("records")
+                for column, summary in self.segments.items()
+            }
+
+
+class NutritionRequestHandler(BaseHTTPRequestHandler):
+    """
+    Endpoints:
+        POST /nutrition  {"formula": "1.5 * Pomme"} or {"formulas": [...]}
+        GET  /search?q=pomme&limit=10
+        POST /refit      {"Date": "2025-07-12", "Pds": 80.1, "Cals": 2100, "Sport ajusté": 300}
+        GET  /model?last=7
+        GET  /changes
+    """
+
+    service = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        try:
+            if url.path == "/search":
+                limit = int(query.get("limit", 20))
+                self._send_json(self.service.search(query.get("q", ""), limit))
+            elif url.path == "/model":
+                self._send_json(self.service.model(int(query.get("last", 1))))
+            elif url.path == "/changes":
+                self._send_json(self.service.change_points())
+            else:
+                self._send_json({"error": f"Unknown endpoint: {url.path}"}, 404)
+        except Exception as e:
+            self._send_error(e)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            payload = self._read_json()
+            if url.path == "/nutrition":
+                date_str = payload.get("date", "")
+                if "formulas" in payload:
+                    self._send_json(
+                        self.service.nutrition_many(payload["formulas"], date_str)
+                    )
+                else:
+                    self._send_json(
+                        self.service.nutrition(payload["formula"], date_str)
+                    )
+            elif url.path == "/refit":
+                self._send_json(self.service.add_day(payload))
+            else:
+                self._send_json({"error": f"Unknown endpoint: {url.path}"}, 404)
+        except Exception as e:
+            self._send_error(e)
+
+    def _send_error(self, error):
+        # Every error gets a JSON answer; unexpected ones are logged with their traceback.
+        if isinstance(error, CLIENT_ERRORS):
+            self._send_json({"error": f"{type(error).__name__}: {error}"}, 400)
+        else:
+            logger.exception("Error while handling %s %s", self.command, self.path)
+            self._send_json({"error": f"{type(error).__name__}: {error}"}, 500)
+
+
+def make_server(service, host="127.0.0.1", port=8765):
+    """Builds the HTTP server; port 0 picks a free port (see `server.server_address`)."""
+    handler = type(
+        "BoundNutritionRequestHandler", (NutritionRequestHandler,), {"service": service}
+    )
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(
+    nutrition_data_path="nutrition_values.json",
+    journal_path=None,
+    host="127.0.0.1",
+    port=8765,
+    lambda_val=1.0,
+):
+    service = NutritionService(nutrition_data_path, journal_path, lambda_val)
+    server = make_server(service, host, port)
+    print(f"Serving nutrition queries on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,415 @@
+import json
+import logging
+import sqlite3
+from datetime import date, datetime, timedelta
+
+from calculate_nutrition import normalize_food_name
+
+logger = logging.getLogger(__name__)
+
+# Per-day nutrient totals, in the order of `Nutrient.to_dict()`.
+NUTRIENT_COLUMNS = [
+    "calories",
+    "protein",
+    "fat",
+    "sfat",
+    "carbs",
+    "sugar",
+    "free_sugar",
+    "fibres",
+    "salt",
+    "alcohol",
+    "water",
+    "sodium",
+]
+
+# Model outputs, keyed by the column names of `run_new_weight_model` results.
+MODEL_COLUMNS = {
+    "Observed_Weight": "observed_weight",
+    "Actual_Weight": "actual_weight",
+    "Base_Metabolism": "base_metabolism",
+    "Water_Retention": "water_retention",
+}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS foods (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    normalized_name TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS foods_normalized_name ON foods (normalized_name);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS foods_fts USING fts5 (
+    name, content='foods', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS foods_ai AFTER INSERT ON foods BEGIN
+    INSERT INTO foods_fts (rowid, name) VALUES (new.id, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS foods_ad AFTER DELETE ON foods BEGIN
+    INSERT INTO foods_fts (foods_fts, rowid, name) VALUES ('delete', old.id, old.name);
+END;
+CREATE TRIGGER IF NOT EXISTS foods_au AFTER UPDATE ON foods BEGIN
+    INSERT INTO foods_fts (foods_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    INSERT INTO foods_fts (rowid, name) VALUES (new.id, new.name);
+END;
+
+-- Journal rows are keyed by `timestamp_key`, so a day may hold several rows.
+CREATE TABLE IF NOT EXISTS journal (
+    date TEXT PRIMARY KEY,
+    recorded_food TEXT,
+    weight REAL,
+    sport TEXT,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS daily_nutrients (
+    date TEXT PRIMARY KEY,
+    {", ".join(f"{c} REAL" for c in NUTRIENT_COLUMNS)}
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS model_results (
+    date TEXT PRIMARY KEY,
+    {", ".join(f"{c} REAL" for c in MODEL_COLUMNS.values())}
+);
+"""
+
+
+def date_key(value):
+    """
+    Converts a date, datetime, pandas Timestamp or date-like string to 'YYYY-MM-DD'.
+
+    ISO date strings sort chronologically, so the date primary keys serve range queries.
+    """
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    try:
+        return date.fromisoformat(str(value).strip()[:10]).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid date: {value!r}")
+
+
+def timestamp_key(value):
+    """
+    Like `date_key`, but keeps the time of day: 'YYYY-MM-DDTHH:MM:SS', or 'YYYY-MM-DD'
+    for values at midnight or without a time.
+
+    Both forms sort chronologically, a day before the timed rows of that day.
+    """
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).strip())
+        except ValueError:
+            return date_key(value)
+    if value.time() == datetime.min.time():
+        return value.strftime("%Y-%m-%d")
+    return value.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+class NutritionStore:
+    """
+    Optional SQLite backend for the food table, the journal, the per-day nutrient
+    totals and the model outputs.
+
+    Rows are upserted individually, so a changed row does not rewrite the whole
+    store, and date-range queries only read the requested rows.
+    """
+
+    def __init__(self, db_path="nutrition.sqlite3"):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # --- Metadata ---
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return json.loads(row["value"]) if row else default
+
+    def set_meta(self, key, value):
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO meta (key, value) VALUES (?, ?)
+                ON CONFLICT (key) DO UPDATE SET value = excluded.value
+                """,
+                (key, json.dumps(value)),
+            )
+
+    # --- Foods ---
+
+    def upsert_foods(self, nutrition_list):
+        """
+        Inserts or updates rows of the Variables sheet, keyed by 'Nom'.
+
+        Returns:
+            list: Names of the foods that were added or whose values changed.
+        """
+        changed = []
+        with self.conn:
+            for item in nutrition_list:
+                if "Nom" not in item:
+                    continue
+                data = json.dumps(item, ensure_ascii=False, sort_keys=True)
+                cursor = self.conn.execute(
+                    """
+                    INSERT INTO foods (name, normalized_name, data) VALUES (?, ?, ?)
+                    ON CONFLICT (name) DO UPDATE SET data = excluded.data
+                    WHERE data != excluded.data
+                    """,
+                    (item["Nom"], normalize_food_name(item["Nom"]), data),
+                )
+                if cursor.rowcount:
+                    changed.append(item["Nom"])
+        return changed
+
+    def delete_foods(self, names):
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM foods WHERE name = ?", [(name,) for name in names]
+            )
+
+    def get_food(self, name):
+        """Looks a food up by name, ignoring case, accents and separators."""
+        row = self.conn.execute(
+            "SELECT data FROM foods WHERE normalized_name = ?",
+            (normalize_food_name(name),),
+        ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def search_foods(self, search_term, limit=20):
+        """
+        Full-text search on food names; every word is matched as a prefix.
+
+        Accents and case are ignored, e.g. 'pat bolo' finds 'Pâtes bolognaise'.
+        """
+        words = [w for w in normalize_food_name(search_term).split("_") if w]
+        if not words:
+            return []
+        query = " ".join(f'"{w}"*' for w in words)
+        rows = self.conn.execute(
+            """
+            SELECT foods.data FROM foods_fts
+            JOIN foods ON foods.id = foods_fts.rowid
+            WHERE foods_fts MATCH ? ORDER BY rank LIMIT ?
+            """,
+            (query, limit),
+        ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def load_nutrition_list(self):
+        """Returns every food row, e.g. for `FormulaParser(nutrition_list=...)`."""
+        rows = self.conn.execute("SELECT data FROM foods ORDER BY id").fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    # --- Journal ---
+
+    def upsert_journal(self, records):
+        """
+        Inserts or updates journal rows keyed by their 'Date' and time of day.
+
+        Both the extracted journal ('weight', 'sport') and the model journal
+        ('Pds', 'Sport ajusté') layouts are accepted; the full record is kept as JSON,
+        with its 'Date' as `timestamp_key`. Sub-daily rows, e.g. a morning and an
+        evening weigh-in, are kept as separate rows of their day.
+
+        Returns:
+            list: Dates ('YYYY-MM-DD') of the days with rows that were added or changed.
+        """
+        changed = []
+        with self.conn:
+            for record in records:
+                key = timestamp_key(record["Date"])
+                record = dict(record, Date=key)
+                weight = record.get("weight", record.get("Pds"))
+                sport = record.get("sport", record.get("Sport ajusté"))
+                cursor = self.conn.execute(
+                    """
+                    INSERT INTO journal (date, recorded_food, weight, sport, data)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (date) DO UPDATE SET
+                        recorded_food = excluded.recorded_food,
+                        weight = excluded.weight,
+                        sport = excluded.sport,
+                        data = excluded.data
+                    WHERE data != excluded.data
+                    """,
+                    (
+                        key,
+                        record.get("recorded food"),
+                        weight,
+                        None if sport is None else str(sport),
+                        json.dumps(record, ensure_ascii=False, default=str),
+                    ),
+                )
+                if cursor.rowcount and date_key(key) not in changed:
+                    changed.append(date_key(key))
+        return changed
+
+    def journal_range(self, start=None, end=None):
+        """Journal records between two dates (inclusive), in timestamp order."""
+        rows = self._range("journal", "data", start, end)
+        return [json.loads(row["data"]) for row in rows]
+
+    def model_journal(self, start=None, end=None):
+        """
+        Journal records in the layout of `run_new_model.prepare_model_inputs`.
+
+        'Pds' is the weight, 'Cals' the stored per-day calories, given with the first
+        record of the day (or else the record's own 'Cals'), and 'Sport ajusté' the
+        record's value, or else its sport formula evaluated with `evaluate_sport_formula`
+        and the record's weight. Records without a sport count 0; records whose sport
+        formula cannot be evaluated are left out, with a warning, rather than counted
+        with a made-up value.
+        """
+        from process_journal_food_sport_weight import evaluate_sport_formula
+
+        calories = {
+            row["date"]: row["calories"]
+            for row in self._range("daily_nutrients", "date, calories", start, end)
+        }
+        records, seen = [], set()
+        for record in self.journal_range(start, end):
+            day = date_key(record["Date"])
+            weight = record.get("Pds", record.get("weight"))
+            sport = record.get("Sport ajusté")
+            if not isinstance(sport, (int, float)):
+                try:
+                    sport = evaluate_sport_formula(
+                        record.get("sport", sport),
+                        weight if isinstance(weight, (int, float)) else None,
+                    )
+                except ValueError as e:
+                    logger.warning("Skipping journal day %s: %s", record["Date"], e)
+                    continue
+            cals = record.get("Cals")
+            if day in calories:
+                cals = None if day in seen else calories[day]
+                seen.add(day)
+            records.append(
+                {
+                    "Date": record["Date"],
+                    "Pds": weight,
+                    "Cals": cals,
+                    "Sport ajusté": sport,
+                }
+            )
+        return records
+
+    # --- Per-day nutrients and model outputs ---
+
+    def upsert_daily_nutrients(self, daily_nutrients):
+        """
+        Stores per-day nutrient totals.
+
+        Args:
+            daily_nutrients (dict): Maps a date to a `Nutrient` or its `to_dict()`.
+        """
+        columns = ", ".join(NUTRIENT_COLUMNS)
+        placeholders = ", ".join("?" for _ in NUTRIENT_COLUMNS)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in NUTRIENT_COLUMNS)
+        rows = []
+        for day, nutrients in daily_nutrients.items():
+            if not isinstance(nutrients, dict):
+                nutrients = nutrients.to_dict()
+            rows.append([date_key(day)] + [nutrients[c] for c in NUTRIENT_COLUMNS])
+        with self.conn:
+            self.conn.executemany(
+                f"""
+                INSERT INTO daily_nutrients (date, {columns}) VALUES (?, {placeholders})
+                ON CONFLICT (date) DO UPDATE SET {updates}
+                """,
+                rows,
+            )
+
+    def refresh_daily_nutrients(self, parser, dates=None):
+        """
+        Recomputes the nutrient totals of the given journal dates (all when None),
+        e.g. the dates returned by `upsert_journal`. The formulas of the rows of a
+        day add up to its totals.
+
+        Returns:
+            dict: Maps dates to the error message of formulas that failed to evaluate.
+        """
+        if dates is None:
+            records = self.journal_range()
+        else:
+            records = []
+            for day in dates:
+                records.extend(self.journal_range(day, day))
+
+        totals, errors = {}, {}
+        for record in records:
+            day = date_key(record["Date"])
+            formula = record.get("recorded food")
+            if not formula or day in errors:
+                continue
+            try:
+                nutrients = parser.calculate_nutrition_for_day(formula, day)
+            except Exception as e:
+                errors[day] = str(e)
+                totals.pop(day, None)
+                continue
+            totals[day] = totals[day] + nutrients if day in totals else nutrients
+        self.upsert_daily_nutrients(totals)
+        return errors
+
+    def daily_nutrients_range(self, start=None, end=None):
+        rows = self._range("daily_nutrients", "*", start, end)
+        return [dict(row) for row in rows]
+
+    def upsert_model_results(self, results_df):
+        """Stores the per-day outputs of `run_new_weight_model`."""
+        columns = ", ".join(MODEL_COLUMNS.values())
+        placeholders = ", ".join("?" for _ in MODEL_COLUMNS)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in MODEL_COLUMNS.values())
+        rows = [
+            [date_key(row["Timestamp"])] + [float(row[c]) for c in MODEL_COLUMNS]
+            for row in results_df.to_dict("records")
+        ]
+        with self.conn:
+            self.conn.executemany(
+                f"""
+                INSERT INTO model_results (date, {columns}) VALUES (?, {placeholders})
+                ON CONFLICT (date) DO UPDATE SET {updates}
+                """,
+                rows,
+            )
+
+    def model_results_range(self, start=None, end=None):
+        rows = self._range("model_results", "*", start, end)
+        return [dict(row) for row in rows]
+
+    def _range(self, table, columns, start, end):
+        # Uses the date primary key index; only the requested rows are read. The end
+        # is exclusive of the next day, so that it includes the timed journal rows.
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("date >= ?")
+            params.append(date_key(start))
+        if end is not None:
+            clauses.append("date < ?")
+            params.append(
+                (date.fromisoformat(date_key(end)) + timedelta(days=1)).isoformat()
+            )
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.conn.execute(
+            f"SELECT {columns} FROM {table} {where} ORDER BY date", params
+        ).fetchall()
@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import json
 import re
 from openpyxl import load_workbook
@@ -78,43 +79,50 @@ def process_date_column(df: pd.DataFrame) -> pd.DataFrame:
     """
     Processes the 'Date' column in a DataFrame, handling initial date strings
     and subsequent formula strings like '=A2+1'.
+
+    A formula row is the previous row's date plus the formula's offset in days,
+    which may be fractional for several rows per day ('=A2+0.25' is six hours
+    later, '=A2+0' the same time). A bare reference ('=A2') and formulas without
+    a readable offset add one day, as they always have.
+    Dates may carry a time of day. The rows are processed with vectorized
+    operations rather than row by row.
     """
     if "Date" not in df.columns:
         raise ValueError("DataFrame must contain a 'Date' column.")
+    if df.empty:
+        return df
 
-    processed_dates = []
-    previous_date = None
+    values = df["Date"]
+    text = values.astype(str).str.strip()
+    is_formula = text.str.startswith("=").to_numpy()
+    if is_formula[0]:
+        raise ValueError(f"Invalid date format in the first row: {values.iloc[0]}.")
 
-    for index, row in df.iterrows():
-        date_value = row["Date"]
+    # Literal dates are parsed at once; empty cells stay NaT.
+    literal = values[~is_formula]
+    literal_dates = pd.to_datetime(literal, errors="coerce", format="mixed")
+    invalid = literal_dates.isna() & literal.notna()
+    if invalid.any():
+        row = invalid.idxmax()
+        if row == df.index[0]:
+            raise ValueError(f"Invalid date format in the first row: {literal[row]}.")
+        raise ValueError(
+            f"Unexpected value in 'Date' column at row {row}: {literal[row]}. Expected formula or date."
+        )
 
-        if index == 0:
-            # First row contains the initial date string
-            try:
-                # pd.to_datetime is more robust for the first date
-                previous_date = pd.to_datetime(date_value)
-            except (ValueError, TypeError):
-                raise ValueError(f"Invalid date format in the first row: {date_value}.")
-            processed_dates.append(previous_date)
-        else:
-            # Subsequent rows contain formulas like '=A2+1'
-            if str(date_value).strip().startswith("="):
-                if previous_date is None:
-                    raise ValueError("Previous date not set for formula processing.")
-                previous_date += timedelta(days=1)
-                processed_dates.append(previous_date)
-            else:
-                # If it's not a formula, try to parse it as a date
-                try:
-                    current_date = pd.to_datetime(date_value)
-                    previous_date = current_date
-                    processed_dates.append(current_date)
-                except (ValueError, TypeError):
-                    raise ValueError(
-                        f"Unexpected value in 'Date' column at row {index}: {date_value}. Expected formula or date."
-                    )
+    # Offsets in days: 0 on literal rows, '+k' on '=A2+k' formulas and 1 on the
+    # other formulas, '=A2' included.
+    parts = text.str.extract(r"^=\s*\$?[A-Za-z]+\$?\d+\s*([+-])\s*(\d+(?:\.\d*)?)\s*$")
+    days = pd.to_numeric(parts[1], errors="coerce")
+    days = days.where(parts[0] != "-", -days).fillna(1.0)
+    days = np.where(is_formula, days, 0.0)
 
-    df["Date"] = processed_dates
+    # Each formula row continues from the last literal date above it (NaT after
+    # an empty cell).
+    group = np.cumsum(~is_formula) - 1
+    anchor = literal_dates.to_numpy()[group]
+    elapsed = pd.Series(days, index=df.index).groupby(group).cumsum()
+    df["Date"] = anchor + pd.to_timedelta(elapsed.to_numpy(), unit="D")
     return df
 
 
@@ -129,21 +137,108 @@ def transform_sport_formula(formula):
     # Replace weight reference (e.g., F316) with WEIGHT
     formula = re.sub(r"F\d+", "WEIGHT", formula)
 
-    # Replace weight lifting pattern (e.g., 14*8) with weight_lifting(14)
-    formula = re.sub(r"(\d+)\*8", r"weight_lifting(\1)", formula)
+    # Replace weight lifting pattern (e.g., 14*8) with weight_lifting(14), leaving
+    # other numbers such as 10.5*8.0 or 14*80 whole
+    formula = re.sub(
+        r"(?<![\w.])(\d+(?:\.\d+)?)\*8(?![\w.])", r"weight_lifting(\1)", formula
+    )
 
     return formula
 
 
-if __name__ == "__main__":
-    file_path = "Journal nutrition.xlsx"
+# Calories burned per kg of body weight and hour of each activity (MET values).
+ACTIVITY_METS = {
+    "running": 10.0,
+    "swimming": 8.0,
+    "walking_calories": 4.0,
+    "cycling_calories": 7.5,
+}
+# Calories per kg lifted and repetition.
+WEIGHT_LIFTING_FACTOR = 0.1
+DEFAULT_BODY_WEIGHT = 75.0
+# A 'kg*reps' set: two numbers heading a product, e.g. '14*8' in '14*8*3'.
+LIFTING_SET = re.compile(
+    r"(?<![\w.*/])(\d+(?:\.\d+)?)\s*\*\s*(\d+(?:\.\d+)?)(?![\w.(])"
+)
+
+
+def evaluate_sport_formula(formula, body_weight=None):
+    """
+    Evaluates a sport formula into burned calories.
+
+    Raw journal cells ('14*8*3 + running(20)') and the output of
+    `transform_sport_formula` are both accepted. A product starting with two
+    numbers is a weight lifting set, kg * reps * `WEIGHT_LIFTING_FACTOR`, times the
+    rest of the product (e.g. the number of sets); so is
+    `weight_lifting(kg, reps=8)`. Formulas may also use the activities of
+    `ACTIVITY_METS` with a duration in minutes (case-insensitive), and WEIGHT (or
+    a cell reference such as F312) for the body weight.
+
+    Args:
+        formula (str | float): The sport cell; numbers are calories as they are.
+        body_weight (float, optional): Weight of the day; defaults to
+            `DEFAULT_BODY_WEIGHT`.
+
+    Returns:
+        float: The calories, 0 for an empty formula.
+
+    Raises:
+        ValueError: If the formula cannot be evaluated.
+    """
+    if formula is None or (isinstance(formula, float) and np.isnan(formula)):
+        return 0.0
+    if isinstance(formula, (int, float)):
+        return float(formula)
+    formula = str(formula).strip().lstrip("=")
+    formula = re.sub(r"F\d+", "WEIGHT", formula)
+    formula = LIFTING_SET.sub(r"weight_lifting(\1, \2)", formula)
+    if not formula:
+        return 0.0
+    body_weight = DEFAULT_BODY_WEIGHT if body_weight is None else body_weight
+
+    context = {
+        name: lambda minutes, met=met: met * body_weight * minutes / 60.0
+        for name, met in ACTIVITY_METS.items()
+    }
+    context["weight_lifting"] = lambda kg, reps=8: kg * reps * WEIGHT_LIFTING_FACTOR
+    context["weight"] = body_weight
+    try:
+        calories = eval(formula.lower(), {"__builtins__": None}, context)
+    except Exception as e:
+        raise ValueError(f"Invalid sport formula '{formula}': {e}") from e
+    if not isinstance(calories, (int, float)):
+        raise ValueError(f"Invalid sport formula '{formula}'.")
+    return float(calories)
+
+
+def ingest_journal(
+    file_path="Journal nutrition.xlsx",
+    journal_json_path="journal.json",
+    nutrition_json_path="nutrition_values.json",
+    start_date="2024-06-30",
+    sqlite_path=None,
+):
+    """
+    Extracts the workbook into `journal.json` and `nutrition_values.json`.
+
+    Args:
+        file_path (str): The path to the Excel file.
+        journal_json_path (str): Where to write the processed journal.
+        nutrition_json_path (str): Where to write the nutrition table, or None to skip it.
+        start_date (str): Only journal rows after this date are kept.
+        sqlite_path (str, optional): Also upsert the nutrition table and journal into this
+            SQLite store (see `nutrition_store.NutritionStore`).
+
+    Returns:
+        pd.DataFrame: The processed journal, or None if it could not be read.
+    """
     journal_df, nutrition_df = extract_sheets_from_excel(file_path)
 
     if journal_df is not None:
         journal_df = process_date_column(journal_df)
 
-        # Filter rows where Date is after 2024-06-30
-        journal_df = journal_df[journal_df["Date"] > "2024-06-30"]
+        # Filter rows where Date is after start_date
+        journal_df = journal_df[journal_df["Date"] > start_date]
 
         # Apply the transformation to the 'sport' column
         journal_df["sport"] = journal_df["sport"].apply(transform_sport_formula)
@@ -152,5 +247,33 @@ if __name__ == "__main__":
         print(journal_df.head())
 
         journal_df.to_json(
-            "journal.json", orient="records", indent=2, default_handler=str
+            journal_json_path, orient="records", indent=2, default_handler=str
         )
+
+    if nutrition_df is not None and nutrition_json_path:
+        nutrition_df.to_json(
+            nutrition_json_path, orient="records", indent=2, force_ascii=False
+        )
+
+    if sqlite_path:
+        from nutrition_store import NutritionStore
+
+        with NutritionStore(sqlite_path) as store:
+            if nutrition_df is not None:
+                nutrition_list = json.loads(nutrition_df.to_json(orient="records"))
+                changed = store.upsert_foods(nutrition_list)
+                print(f"{len(changed)} foods added or changed")
+            if journal_df is not None:
+                journal_records = json.loads(
+                    journal_df.to_json(
+                        orient="records", date_format="iso", default_handler=str
+                    )
+                )
+                changed = store.upsert_journal(journal_records)
+                print(f"{len(changed)} journal days added or changed")
+
+    return journal_df
+
+
+if __name__ == "__main__":
+    ingest_journal()
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+
+
+def food_fingerprint(item):
+    """Stable hash of a food row, used to detect changed ingredients."""
+    data = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+class RecipeBook:
+    """
+    Named composite foods defined by a formula of other foods, e.g.
+    {"Pâtes bolo": "1.2 * Pâtes + 0.8 * Sauce bolognaise + 0.1 * Parmesan"}.
+
+    Each recipe is materialized once into a per-100g row (total nutrients divided
+    by the total quantity of the formula) and added to a `FormulaParser`, which
+    then matches it like any other food. Recipes may use other recipes.
+
+    With a cache file, only the recipes whose formula changed, or that depend
+    (directly or through other recipes) on a food whose row changed, are
+    recomputed.
+    """
+
+    def __init__(self, recipes):
+        self.recipes = dict(recipes)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Loads recipes from a JSON side file: either {"name": "formula"} or a list of
+        {"Nom": ..., "Formule": ...} rows.
+        """
+        with open(path, "r") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            data = {item["Nom"]: item["Formule"] for item in data}
+        return cls(data)
+
+    @classmethod
+    def from_workbook(cls, file_path, sheet_name="Recettes"):
+        """Loads recipes from the 'Nom' and 'Formule' columns of a workbook sheet."""
+        from openpyxl import load_workbook
+
+        wb = load_workbook(filename=file_path, read_only=True, data_only=False)
+        if sheet_name not in wb.sheetnames:
+            wb.close()
+            raise ValueError(f"Sheet '{sheet_name}' not found.")
+        rows = wb[sheet_name].iter_rows(values_only=True)
+        header = list(next(rows))
+        name_idx, formula_idx = header.index("Nom"), header.index("Formule")
+        recipes = {
+            row[name_idx]: str(row[formula_idx])
+            for row in rows
+            if row[name_idx] and row[formula_idx]
+        }
+        wb.close()
+        return cls(recipes)
+
+    def ingredients(self, parser):
+        """
+        Maps each recipe to the foods and recipes its formula uses.
+
+        Recipe names are registered in the parser as placeholders while the
+        formulas are parsed, so that a recipe using another recipe resolves to it;
+        they are removed afterwards, whatever happens.
+
+        Raises:
+            ValueError: If a recipe has the name of a food that is not a recipe, or
+                uses undefined foods.
+        """
+        placeholders = []
+        for name in self.recipes:
+            existing = parser.normalization_map.get(parser._normalize(name))
+            if existing is None:
+                placeholders.append(name)
+            elif "Recette" not in parser.nutrition_data[existing]:
+                raise ValueError(
+                    f"Recipe '{name}' has the name of the food '{existing}'."
+                )
+        parser.add_foods([{"Nom": name} for name in placeholders])
+        try:
+            ingredients = {}
+            for name, formula in self.recipes.items():
+                _, food_vars_map, unmatched = parser._parse_and_prepare_formula(formula)
+                if unmatched:
+                    raise ValueError(
+                        f"Recipe '{name}' uses undefined food item(s): {', '.join(unmatched)}"
+                    )
+                ingredients[name] = set(food_vars_map.values())
+        finally:
+            parser.remove_foods(placeholders)
+        return ingredients
+
+    def topological_order(self, ingredients):
+        """
+        Orders recipes so that every recipe comes after the recipes it uses.
+
+        Raises:
+            ValueError: If recipes use each other in a cycle.
+        """
+        order = []
+        state = {}  # 1 while visiting, 2 once done
+
+        def visit(name, path):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                cycle = path[path.index(name) :] + [name]
+                raise ValueError(f"Recipe cycle detected: {' -> '.join(cycle)}")
+            state[name] = 1
+            for ingredient in sorted(ingredients[name]):
+                if ingredient in self.recipes:
+                    visit(ingredient, path + [name])
+            state[name] = 2
+            order.append(name)
+
+        for name in self.recipes:
+            visit(name, [])
+        return order
+
+    def compute(self, parser, name):
+        """Evaluates one recipe into a per-100g row keyed like nutrition_values.json."""
+        formula = self.recipes[name]
+        total = parser.calculate_nutrition_for_day(formula, name)
+
+        # The same formula with every food set to 1 gives the total quantity, in units
+        # of 100g. Constant terms are calorie adjustments, not quantities: they are
+        # what remains with every food set to 0, and are subtracted.
+        pythonic_formula, food_vars_map, _ = parser._parse_and_prepare_formula(formula)
+        quantity, constant = (
+            eval(
+                pythonic_formula,
+                {"__builtins__": None},
+                {var_name: value for var_name in food_vars_map},
+            )
+            for value in (1.0, 0.0)
+        )
+        if isinstance(quantity, (int, float)) and isinstance(constant, (int, float)):
+            quantity -= constant
+        if not isinstance(quantity, (int, float)) or quantity <= 0:
+            raise ValueError(f"Recipe '{name}' has no positive total quantity.")
+
+        row = (total / quantity).to_nutrition_values()
+        row["Nom"] = name
+        row["Recette"] = formula
+        return row
+
+    def materialize(self, parser, cache_path=None):
+        """
+        Adds every recipe to the parser as a per-100g food.
+
+        Args:
+            parser (FormulaParser): Parser holding the ingredient foods.
+            cache_path (str, optional): JSON file keeping the materialized rows and the
+                fingerprints of the foods they were computed from.
+
+        Returns:
+            list: Names of the recipes that were (re)computed.
+        """
+        cache = {"foods": {}, "recipes": {}}
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, "r") as f:
+                cache = json.load(f)
+
+        base_foods = {
+            name: item
+            for name, item in parser.nutrition_data.items()
+            if name not in self.recipes
+        }
+        fingerprints = {
+            name: food_fingerprint(item) for name, item in base_foods.items()
+        }
+        changed_foods = {
+            name
+            for name in set(fingerprints) | set(cache["foods"])
+            if fingerprints.get(name) != cache["foods"].get(name)
+        }
+
+        ingredients = self.ingredients(parser)
+        order = self.topological_order(ingredients)
+
+        recomputed = []
+        rows = {}
+        for name in order:
+            cached = cache["recipes"].get(name)
+            dirty = (
+                cached is None
+                or cached["formula"] != self.recipes[name]
+                or ingredients[name] & changed_foods
+                or ingredients[name] & set(recomputed)
+            )
+            if dirty:
+                rows[name] = self.compute(parser, name)
+                recomputed.append(name)
+            else:
+                rows[name] = cached["row"]
+            # Make the recipe available to the recipes that use it.
+            parser.add_foods([rows[name]])
+
+        if cache_path:
+            cache = {
+                "foods": fingerprints,
+                "recipes": {
+                    name: {"formula": self.recipes[name], "row": rows[name]}
+                    for name in order
+                },
+            }
+            with open(cache_path, "w") as f:
+                json.dump(cache, f, indent=2, ensure_ascii=False)
+        return recomputed
+
+
+def load_parser_with_recipes(
+    nutrition_data_path="nutrition_values.json",
+    recipes_path="recipes.json",
+    cache_path="recipes_cache.json",
+):
+    """Builds a FormulaParser whose food list includes the materialized recipes."""
+    from calculate_nutrition import FormulaParser
+
+    parser = FormulaParser(nutrition_data_path=nutrition_data_path)
+    RecipeBook.from_file(recipes_path).materialize(parser, cache_path)
+    return parser
@@ -1,42 +1,303 @@
 import json
 import pandas as pd
 import numpy as np
-from scipy.optimize import minimize
+from scipy import sparse
+from scipy.linalg import solveh_banded
+from scipy.optimize import OptimizeResult, minimize
 
+from defaults import RESULTS_CSV_PATH
 
-def run_new_weight_model(json_file_path="journal.json", lambda_val=1.0):
+# Calories stored in one kilogram of body weight.
+KCAL_PER_KG = 7700
+
+# Bounds for B(t) to ensure it's positive and within a reasonable range.
+# This helps guide the optimizer and prevent unrealistic metabolism values.
+B_BOUNDS = (1000, 4000)
+
+
+# How the weigh-ins of one day are reduced to the day's weight.
+WEIGHT_RULES = ("morning", "median", "mean", "min", "last")
+
+
+def aggregate_sub_daily(df, weight_rule="morning"):
     """
-    Loads nutrition data, implements a new weight model to optimize base metabolism (B(t)),
-    and saves the results to a CSV file.
+    Reduces timestamped records (several weigh-ins and meals per day) to one row per day.
 
     Args:
-        json_file_path (str): Path to the nutrition data JSON file.
-        lambda_val (float): Hyperparameter for L2 regularization on B(t) differences.
+        df (pd.DataFrame): Records with a datetime 'Date' and 'Pds', 'Cals' and
+            'Sport ajusté' columns; rows may carry only some of them.
+        weight_rule (str): One of `WEIGHT_RULES`. 'morning' keeps the first weigh-in of
+            the day, the others aggregate all of them.
+
+    Returns:
+        pd.DataFrame: Date-indexed (midnight) frame with the day's weight, and the summed
+            calories and sport, NaN on days without any value.
     """
-    # 1. Load and prepare time-series data
-    df = pd.read_json(json_file_path)
+    if weight_rule not in WEIGHT_RULES:
+        raise ValueError(
+            f"Unknown weight rule '{weight_rule}', use one of {WEIGHT_RULES}."
+        )
+    df = df.sort_values("Date", kind="stable")
+    values = pd.DataFrame(
+        {
+            column: pd.to_numeric(df[column], errors="coerce")
+            for column in ["Pds", "Cals", "Sport ajusté"]
+        }
+    )
+    grouped = values.groupby(df["Date"].dt.normalize().to_numpy())
+    weight_rule = {"morning": "first"}.get(weight_rule, weight_rule)
+    daily = pd.DataFrame(
+        {
+            "Pds": grouped["Pds"].agg(weight_rule),
+            "Cals": grouped["Cals"].sum(min_count=1),
+            "Sport ajusté": grouped["Sport ajusté"].sum(min_count=1),
+        }
+    )
+    daily.index.name = "Date"
+    return daily
 
-    # Convert data to a pandas DataFrame
-    df["Date"] = pd.to_datetime(df["Date"])
-    df = df.set_index("Date")
-    df = df[df.index.notna()]  # Filter out rows where index (timestamp) is NaT
-    df = df.sort_index()
 
-    # Extract relevant series and handle missing data
-    # Pds (observed weight), Cals (calorie intake), Sport ajusté (sport calories)
-    df_model = df[["Pds", "Cals", "Sport ajusté"]].copy()
+def prepare_model_inputs(df, weight_rule="morning"):
+    """
+    Cleans a journal DataFrame into the daily series used by the weight model.
+
+    Args:
+        df (pd.DataFrame): Journal records with 'Date', 'Pds', 'Cals' and 'Sport ajusté' columns.
+            Dates may carry a time of day, with several records per day (see `aggregate_sub_daily`).
+        weight_rule (str): How several weigh-ins of a day are reduced, see `WEIGHT_RULES`.
+
+    Returns:
+        pd.DataFrame: Date-indexed frame with numeric 'Pds', 'Cals' and 'Sport ajusté' columns.
+    """
+    df = df.copy()
+    df["Date"] = pd.to_datetime(df["Date"], format="mixed")
+    df = df[df["Date"].notna()]  # Filter out rows without a timestamp
+    df_model = aggregate_sub_daily(df, weight_rule)
 
     # Forward-fill missing values for Cals and Sport ajusté, then interpolate Pds
-    df_model["Cals"] = pd.to_numeric(df_model["Cals"], errors="coerce").ffill()
-    df_model["Sport ajusté"] = pd.to_numeric(
-        df_model["Sport ajusté"], errors="coerce"
-    ).ffill()
-    df_model["Pds"] = pd.to_numeric(df_model["Pds"], errors="coerce").interpolate(
-        method="linear"
-    )
+    df_model["Cals"] = df_model["Cals"].ffill()
+    df_model["Sport ajusté"] = df_model["Sport ajusté"].ffill()
+    df_model["Pds"] = df_model["Pds"].interpolate(method="linear")
 
     # Drop rows with any remaining NaN values (e.g., if initial values are missing)
     df_model.dropna(inplace=True)
+    return df_model
+
+
+def daily_weight_samples(df, days):
+    """
+    Number and mean of the weigh-ins of each model day, with `np.bincount`.
+
+    Args:
+        df (pd.DataFrame): Journal records with 'Date' and 'Pds'.
+        days (pd.DatetimeIndex): The model days, e.g. `prepare_model_inputs(df).index`.
+
+    Returns:
+        tuple: (counts, means), arrays aligned with `days`; means are NaN without weigh-ins.
+    """
+    dates = pd.to_datetime(df["Date"], format="mixed")
+    weights = pd.to_numeric(df["Pds"], errors="coerce")
+    valid = (dates.notna() & weights.notna()).to_numpy()
+    positions = days.get_indexer(dates[valid].dt.normalize())
+    found = positions >= 0
+    counts = np.bincount(positions[found], minlength=len(days))
+    sums = np.bincount(
+        positions[found],
+        weights=weights.to_numpy()[valid][found],
+        minlength=len(days),
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    return counts, means
+
+
+def load_model_inputs(json_file_path="journal.json", weight_rule="morning"):
+    """
+    Loads the journal JSON file and prepares it for the weight model.
+
+    Args:
+        json_file_path (str): Path to the nutrition data JSON file.
+        weight_rule (str): See `prepare_model_inputs`.
+
+    Returns:
+        pd.DataFrame: See `prepare_model_inputs`.
+    """
+    return prepare_model_inputs(pd.read_json(json_file_path), weight_rule)
+
+
+def simulate_weight(W0, C_in, C_sport, B):
+    """
+    Integrates the energy balance (C_in - C_sport - B) / 7700 from the starting weight W0.
+
+    The first day is the anchor, so its own balance does not move the weight.
+    """
+    delta_W = (C_in - C_sport - B) / KCAL_PER_KG
+    W_act = np.empty(len(delta_W))
+    W_act[0] = W0
+    W_act[1:] = W0 + np.cumsum(delta_W[1:])
+    return W_act
+
+
+def weight_model_objective(B, W_obs, C_in, C_sport, lambda_val, obs_weights=None):
+    """
+    Objective of the weight model and its analytic gradient with respect to B.
+
+    Args:
+        obs_weights (np.ndarray, optional): Weight of each day's squared error, e.g. its
+            number of weigh-ins when W_obs holds daily means (see `daily_weight_samples`).
+
+    Returns:
+        tuple: (value, gradient) as expected by `minimize(..., jac=True)`.
+    """
+    residuals = W_obs - simulate_weight(W_obs[0], C_in, C_sport, B)
+    weighted = residuals if obs_weights is None else obs_weights * residuals
+    B_diff = np.diff(B)
+    value = np.sum(weighted * residuals) + lambda_val * np.sum(B_diff**2)
+
+    # B(s) lowers every W_act(t) with t >= s by 1/7700, hence a reversed cumsum of residuals.
+    gradient = np.zeros_like(B)
+    gradient[1:] = 2 / KCAL_PER_KG * np.cumsum(weighted[::-1])[::-1][1:]
+    gradient[1:] += 2 * lambda_val * B_diff
+    gradient[:-1] -= 2 * lambda_val * B_diff
+    return value, gradient
+
+
+def solve_base_metabolism(
+    W_obs, C_in, C_sport, lambda_val=1.0, anchor_first=True, obs_weights=None
+):
+    """
+    Solves the weight model exactly, ignoring the bounds on B(t).
+
+    Written in terms of W_act instead of B, the objective is a linear least-squares
+    problem: B(t) - B(t-1) only involves second differences of W_act, so the normal
+    equations are pentadiagonal and are solved in O(N) with a banded Cholesky.
+    B(0) does not move the weight, so it simply equals B(1).
+
+    Args:
+        anchor_first (bool): Pin W_act(0) to W_obs(0) as the model does. When False the
+            starting weight is fitted too, which suits series that start mid-history.
+        obs_weights (np.ndarray, optional): See `weight_model_objective`.
+
+    Returns:
+        tuple: (B, W_act), the unconstrained optimum of B(t) and the matching weight curve.
+    """
+    N = len(W_obs)
+    E = C_in - C_sport
+    if N == 1:
+        return E.astype(float), W_obs.astype(float)
+
+    # (Q + lambda * K^2 * D2'D2) W_act = Q W_obs + lambda * K * D2'dE, Q = diag(obs_weights)
+    weights = np.ones(N) if obs_weights is None else np.asarray(obs_weights, float)
+    D2 = sparse.diags([1.0, -2.0, 1.0], [0, 1, 2], shape=(N - 2, N), format="csr")
+    A = (sparse.diags(weights) + lambda_val * KCAL_PER_KG**2 * (D2.T @ D2)).tocsr()
+    rhs = weights * W_obs + lambda_val * KCAL_PER_KG * (D2.T @ np.diff(E)[1:])
+    if anchor_first:
+        # Move the known W_act(0) = W_obs(0) to the right-hand side.
+        rhs = rhs[1:] - A[1:, 0].toarray().ravel() * W_obs[0]
+        A = A[1:, 1:]
+
+    bands = np.zeros((3, A.shape[0]))
+    for k in range(3):
+        bands[2 - k, k:] = A.diagonal(k)
+    W_act = solveh_banded(bands, rhs)
+    if anchor_first:
+        W_act = np.concatenate(([W_obs[0]], W_act))
+
+    B = np.empty(N)
+    B[1:] = E[1:] - KCAL_PER_KG * np.diff(W_act)
+    B[0] = B[1]
+    return B, W_act
+
+
+def fit_base_metabolism(
+    W_obs, C_in, C_sport, lambda_val=1.0, initial_B=None, obs_weights=None
+):
+    """
+    Fits B(t) by minimizing the squared weight error plus an L2 smoothness penalty.
+
+    The exact banded solution is used when it respects the bounds on B(t); otherwise
+    L-BFGS-B refines it (or `initial_B`) under the bounds.
+
+    Args:
+        W_obs, C_in, C_sport (np.ndarray): Daily observed weight, calorie intake and sport calories.
+        lambda_val (float): Hyperparameter for L2 regularization on B(t) differences.
+        initial_B (np.ndarray, optional): Starting point for L-BFGS-B, e.g. a previous fit.
+        obs_weights (np.ndarray, optional): See `weight_model_objective`.
+
+    Returns:
+        scipy.optimize.OptimizeResult: The optimizer result, with B(t) in `x`.
+    """
+    B, _ = solve_base_metabolism(
+        W_obs, C_in, C_sport, lambda_val, obs_weights=obs_weights
+    )
+    if np.all((B >= B_BOUNDS[0]) & (B <= B_BOUNDS[1])):
+        value, _ = weight_model_objective(
+            B, W_obs, C_in, C_sport, lambda_val, obs_weights
+        )
+        return OptimizeResult(
+            x=B, fun=value, success=True, nit=0, message="Solved normal equations"
+        )
+
+    if initial_B is None:
+        initial_B = B
+    return minimize(
+        weight_model_objective,
+        np.clip(initial_B, *B_BOUNDS),
+        args=(W_obs, C_in, C_sport, lambda_val, obs_weights),
+        jac=True,
+        method="L-BFGS-B",
+        bounds=[B_BOUNDS] * len(W_obs),
+        options={
+            "maxiter": 2000,
+            "ftol": 1e-9,  # Tighter tolerance for function value change
+        },
+    )
+
+
+def run_new_weight_model(
+    json_file_path="journal.json",
+    lambda_val=1.0,
+    output_csv_path=RESULTS_CSV_PATH,
+    n_bootstrap=0,
+    n_workers=None,
+    seed=None,
+    window_days=None,
+    overlap_days=240,
+    weight_rule="morning",
+    within_day=False,
+    **bootstrap_options,
+):
+    """
+    Loads nutrition data, implements a new weight model to optimize base metabolism (B(t)),
+    and saves the results to a CSV file.
+
+    Args:
+        json_file_path (str): Path to the nutrition data JSON file.
+        lambda_val (float): Hyperparameter for L2 regularization on B(t) differences.
+        output_csv_path (str): Where to save the results, or None to skip saving.
+        n_bootstrap (int): Number of bootstrap refits used for uncertainty bands (0 disables them).
+        n_workers (int, optional): Worker processes for the bootstrap refits and windowed fits.
+        seed (int, optional): Seed making the bootstrap reproducible.
+        window_days (int, optional): Fit overlapping windows of this many days in parallel
+            and stitch them, instead of one global fit (see `windowed_weight_model`).
+        overlap_days (int): Days shared by consecutive windows when `window_days` is set.
+        weight_rule (str): How several weigh-ins of a day give its weight, see `WEIGHT_RULES`.
+        within_day (bool): Fit every weigh-in rather than one weight per day: each day's
+            error is its mean weigh-in's, weighted by the number of weigh-ins, and days
+            without any do not count. 'Observed_Weight' and 'Water_Retention' are
+            then the daily means and their distance to the curve, which starts from
+            the first day's mean. Not combined with bootstrap or windowed fits.
+        **bootstrap_options: Extra arguments for `bootstrap_weight_model.bootstrap_weight_model`.
+
+    Returns:
+        pd.DataFrame: The per-day results, or None if the model could not be fitted.
+    """
+    if within_day and (n_bootstrap > 0 or window_days):
+        raise ValueError("within_day is not supported with bootstrap or windowed fits.")
+
+    # 1. Load and prepare time-series data
+    journal_df = pd.read_json(json_file_path)
+    df_model = prepare_model_inputs(journal_df, weight_rule)
 
     # Convert to numpy arrays for optimization
     W_obs = df_model["Pds"].values
@@ -49,81 +310,46 @@ def run_new_weight_model(json_file_path="journal.json", lambda_val=1.0):
         print("No valid data points after preprocessing. Exiting.")
         return
 
-    # 2. Implement the optimization problem to find B(t)
-    # Initial guess for B(t) - can be average daily calorie expenditure or a constant
-    # A simple initial guess: average (C_in - C_sport)
-    # A more dynamic initial guess for B(t) based on observed weight changes
-    # Vectorized initial guess for B(t)
-    initial_B = np.zeros(N)
-    if N > 1:
-        # For t > 0, estimate B(t) based on observed weight change
-        # B(t) = C_in(t) - C_sport(t) - 7700 * (W_obs(t) - W_obs(t-1))
-        delta_W_obs = np.diff(W_obs)
-        initial_B[1:] = C_in[1:] - C_sport[1:] - 7700 * delta_W_obs
-        # For the first value, use the average of the estimated B values
-        initial_B[0] = np.mean(initial_B[1:])
-    elif N == 1:
-        initial_B[0] = np.mean(C_in - C_sport)  # Fallback for single data point
-
-    # Ensure initial_B values are within the bounds
-    initial_B = np.clip(initial_B, 1000, 4000)
-
-    # Define the objective function to minimize
-    def objective(B):
-        # Vectorized calculation of W_act(t)
-        delta_W = (C_in - C_sport - B) / 7700
-        W_act = np.zeros_like(W_obs)
-        W_act[0] = W_obs[0]
-        if N > 1:
-            W_act[1:] = W_obs[0] + np.cumsum(delta_W[1:])
-
-        # Calculate the sum of squared differences for observed vs actual weight
-        weight_diff_sq = np.sum((W_obs - W_act) ** 2)
-
-        # Calculate the regularization term for B(t) smoothness
-        B_diff_sq = np.sum(np.diff(B) ** 2)
-
-        return weight_diff_sq + lambda_val * B_diff_sq
-
-    # Perform the optimization
-    # Using 'L-BFGS-B' method as it's suitable for bound-constrained problems (though no explicit bounds here)
-    # and generally performs well for smooth functions.
-    # Add bounds for B(t) to ensure it's positive and within a reasonable range (e.g., 1000 to 4000 calories)
-    # This helps guide the optimizer and prevent unrealistic metabolism values.
-    # Consider using a different method or increasing maxiter further if still failing
-    # For now, let's try a different method that might be more robust to initial guess
-    # 'TNC' is another good choice for bound-constrained problems
-    # Also, let's remove the 'disp' option as it's deprecated and not critical for functionality.
-    bounds_B = [(1000, 4000) for _ in range(N)]
-    result = minimize(
-        objective,
-        initial_B,
-        method="L-BFGS-B",  # Switched to L-BFGS-B for faster convergence
-        bounds=bounds_B,
-        options={
-            "maxiter": 2000,  # Reduced maxiter, L-BFGS-B is more efficient
-            "ftol": 1e-9,  # Tighter tolerance for function value change
-        },
-    )
+    # 2. Find B(t): an exact O(N) banded solve, with a bounded L-BFGS-B fallback
+    # using the analytic gradient (O(N) per iteration instead of N objective evaluations).
+    if window_days:
+        from windowed_weight_model import fit_base_metabolism_windowed
 
-    if not result.success:
-        print(f"Optimization failed: {result.message}")
-        return
+        try:
+            B_optimized, W_act_final = fit_base_metabolism_windowed(
+                W_obs,
+                C_in,
+                C_sport,
+                lambda_val,
+                window_days=window_days,
+                overlap_days=overlap_days,
+                n_workers=n_workers,
+            )
+        except ValueError as e:
+            print(f"Optimization failed: {e}")
+            return
+    else:
+        obs_weights = None
+        if within_day:
+            # The daily mean weigh-ins are the series that is fitted, anchored
+            # (first day) and compared with the curve; days without weigh-ins do
+            # not count and only carry an interpolated value.
+            obs_weights, means = daily_weight_samples(journal_df, df_model.index)
+            W_obs = pd.Series(means).interpolate().bfill().to_numpy()
+        result = fit_base_metabolism(
+            W_obs, C_in, C_sport, lambda_val, obs_weights=obs_weights
+        )
 
-    B_optimized = result.x
+        if not result.success:
+            print(f"Optimization failed: {result.message}")
+            return
 
-    # 3. Calculate final W_act(t) and Water_Retention(t)
-    # Vectorized calculation of final W_act(t)
-    delta_W_final = (C_in - C_sport - B_optimized) / 7700
-    W_act_final = np.zeros(N)
-    W_act_final[0] = W_obs[0]
-    if N > 1:
-        W_act_final[1:] = W_obs[0] + np.cumsum(delta_W_final[1:])
+        B_optimized = result.x
+        W_act_final = simulate_weight(W_obs[0], C_in, C_sport, B_optimized)
 
+    # 3. Calculate Water_Retention(t)
     Water_Retention = W_obs - W_act_final
 
-    # 4. Create a new Python script run_new_model.py (this file itself)
-    # 5. Save the results to a CSV file
     results_df = pd.DataFrame(
         {
             "Timestamp": timestamps,
@@ -133,5 +359,29 @@ def run_new_weight_model(json_file_path="journal.json", lambda_val=1.0):
             "Water_Retention": Water_Retention,
         }
     )
-    results_df.to_csv("new_model_results.csv", index=False)
-    print("New weight model results saved to new_model_results.csv")
+
+    if n_bootstrap > 0:
+        from bootstrap_weight_model import bootstrap_weight_model
+
+        bands_df = bootstrap_weight_model(
+            W_obs,
+            C_in,
+            C_sport,
+            B_optimized,
+            lambda_val=lambda_val,
+            n_bootstrap=n_bootstrap,
+            n_workers=n_workers,
+            seed=seed,
+            **bootstrap_options,
+        )
+        results_df = pd.concat([results_df, bands_df], axis=1)
+
+    # 4. Save the results to a CSV file
+    if output_csv_path:
+        results_df.to_csv(output_csv_path, index=False)
+        print(f"New weight model results saved to {output_csv_path}")
+    return results_df
+
+
+if __name__ == "__main__":
+    run_new_weight_model()
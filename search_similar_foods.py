@@ -1,5 +1,19 @@
 import json
 
+from calculate_nutrition import normalize_food_name
+
+# Nutrients compared by the similarity search, keyed as in nutrition_values.json
+SIMILARITY_NUTRIENTS = [
+    "Calories / 100g",
+    "Protéine",
+    "Fat",
+    "SFat",
+    "Carbs",
+    "Sugar",
+    "Fibres",
+    "Sel",
+]
+
 
 def find_food_item(data_file, search_term):
     with open(data_file, "r") as f:
@@ -12,6 +26,147 @@ def find_food_item(data_file, search_term):
     return None
 
 
+def search_food_items(data_file, search_term, limit=None):
+    with open(data_file, "r") as f:
+        data = json.load(f)
+
+    search_term = search_term.lower()
+    matches = [
+        item for item in data if "Nom" in item and search_term in item["Nom"].lower()
+    ]
+    return matches[:limit]
+
+
+class NutrientSimilarityIndex:
+    """
+    Finds foods with a similar nutrient profile ("foods like this one").
+
+    Each food is a vector of `nutrients`, per 100g or per 100 kcal, where missing
+    values count as 0 as in `FormulaParser`. Every nutrient is divided by its
+    standard deviation over the database so that grams of salt weigh as much as
+    grams of carbs, and the vectors go into a KD-tree built once; queries are
+    batched into a single tree lookup.
+    """
+
+    def __init__(self, nutrition_list, nutrients=SIMILARITY_NUTRIENTS, basis="100g"):
+        import numpy as np
+        from scipy.spatial import cKDTree
+
+        if basis not in ("100g", "100kcal"):
+            raise ValueError(f"Unknown basis '{basis}', use '100g' or '100kcal'.")
+        self.nutrients = list(nutrients)
+        self.basis = basis
+
+        rows = [item for item in nutrition_list if "Nom" in item]
+        values = np.array(
+            [[item.get(key) or 0.0 for key in self.nutrients] for item in rows],
+            dtype=float,
+        ).reshape(len(rows), len(self.nutrients))
+        if basis == "100kcal":
+            calories = np.array(
+                [item.get("Calories / 100g") or 0.0 for item in rows], dtype=float
+            )
+            # Per-100 kcal profiles are undefined for foods without calories.
+            keep = calories > 0
+            rows = [item for item, k in zip(rows, keep) if k]
+            values = values[keep] * (100.0 / calories[keep, None])
+
+        self.names = [item["Nom"] for item in rows]
+        self._positions = {normalize_food_name(n): i for i, n in enumerate(self.names)}
+        self.values = values
+        scale = values.std(axis=0) if len(values) else np.ones(len(self.nutrients))
+        self._scale = np.where(scale > 0, scale, 1.0)
+        self.tree = cKDTree(values / self._scale)
+
+    @classmethod
+    def from_json(cls, data_file, **kwargs):
+        with open(data_file, "r") as f:
+            return cls(json.load(f), **kwargs)
+
+    def vector(self, name):
+        """Nutrient vector of a food of the index, looked up like the parser does."""
+        return self.values[self._position(name)]
+
+    def query_vectors(self, vectors, k=10):
+        """
+        The `k` nearest foods of each nutrient vector.
+
+        Args:
+            vectors (np.ndarray): Shape (n_queries, n_nutrients), on the index basis.
+            k (int): Number of neighbours per query.
+
+        Returns:
+            list: One list of (name, distance) pairs per query, nearest first.
+        """
+        import numpy as np
+
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=float))
+        distances, positions = self._query(vectors, k)
+        return [
+            [(self.names[p], float(d)) for p, d in zip(row_p, row_d)]
+            for row_p, row_d in zip(positions, distances)
+        ]
+
+    def similar_foods(self, names, k=10):
+        """
+        The `k` foods closest in nutrients to each of the given foods, the foods
+        themselves excluded.
+
+        Args:
+            names (str | list): A food name or a list of them, for a batch query.
+
+        Returns:
+            list: (name, distance) pairs for a single name, else one such list per name.
+        """
+        single = isinstance(names, str)
+        own = [self._position(n) for n in ([names] if single else names)]
+        distances, positions = self._query(self.values[own], k + 1)
+        results = [
+            [(self.names[p], float(d)) for p, d in zip(row_p, row_d) if p != o][:k]
+            for o, row_p, row_d in zip(own, positions, distances)
+        ]
+        return results[0] if single else results
+
+    def alternatives(self, name, nutrient="Sel", k=10, lower=True):
+        """
+        The `k` foods closest in nutrients to `name` with strictly less (or, with
+        `lower=False`, more) of one nutrient, e.g. lower-salt alternatives.
+        """
+        column = self.nutrients.index(nutrient)
+        own = self._position(name)
+        reference = self.values[own, column]
+        candidates = 4 * k
+        while True:
+            distances, positions = self._query(self.values[[own]], candidates)
+            distances, positions = distances[0], positions[0]
+            other = self.values[positions, column]
+            keep = (other < reference) if lower else (other > reference)
+            if keep.sum() >= k or len(positions) == len(self.names):
+                return [
+                    (self.names[p], float(d))
+                    for p, d in zip(positions[keep], distances[keep])
+                ][:k]
+            candidates *= 4
+
+    def _position(self, name):
+        position = self._positions.get(normalize_food_name(name))
+        if position is None:
+            raise KeyError(f"Food '{name}' not found in the similarity index.")
+        return position
+
+    def _query(self, vectors, k):
+        # One batched tree lookup; always returns (n_queries, k) arrays.
+        k = min(k, len(self.names))
+        if k == 0:
+            empty = [[] for _ in vectors]
+            return empty, empty
+        distances, positions = self.tree.query(vectors / self._scale, k=k, workers=-1)
+        return (
+            distances.reshape(len(vectors), k),
+            positions.reshape(len(vectors), k),
+        )
+
+
 if __name__ == "__main__":
     search_results = find_food_item("nutrition_values.json", "mojito")
     if search_results:
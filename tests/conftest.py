@@ -39,3 +39,58 @@ def pytest_addoption(parser):
         action="store",
         help="Path to the nutrition data JSON file",
     )
+
+
+SAMPLE_FOODS = [
+    {
+        "Nom": "Pomme",
+        "Calories / 100g": 52,
+        "Protéine": 0.3,
+        "Carbs": 14,
+        "Fat": 0.2,
+        "SFat": 0.0,
+        "Sugar": 10.0,
+        "Free sugar": 5.0,
+        "Fibres": 2.4,
+        "Sel": 0.01,
+        "Alcool": 0.0,
+        "Water": 85.0,
+    },
+    {
+        "Nom": "Banane",
+        "Calories / 100g": 89,
+        "Protéine": 1.1,
+        "Carbs": 23,
+        "Fat": 0.3,
+        "SFat": 0.1,
+        "Sugar": 12.0,
+        "Free sugar": 8.0,
+        "Fibres": 2.6,
+        "Sel": 0.01,
+        "Alcool": 0.0,
+        "Water": 75.0,
+    },
+    {
+        "Nom": "Oeuf_au_plat",
+        "Calories / 100g": 155,
+        "Protéine": 13,
+        "Carbs": 1.1,
+        "Fat": 11,
+        "SFat": 3.0,
+        "Sugar": 0.5,
+        "Free sugar": 0.0,
+        "Fibres": 0.0,
+        "Sel": 0.13,
+        "Alcool": 0.0,
+        "Water": 76.0,
+    },
+]
+
+
+@pytest.fixture
+def sample_nutrition_path(tmp_path):
+    # A small nutrition_values.json written to a temporary directory
+    path = tmp_path / "nutrition_values.json"
+    with open(path, "w") as f:
+        json.dump(SAMPLE_FOODS, f)
+    return str(path)
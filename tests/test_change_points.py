@@ -0,0 +1,73 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from change_points import (
+    detect_change_points,
+    detect_change_points_batch,
+    pelt,
+    segment_summary,
+)
+
+
+def optimal_partitioning(x, penalty, min_size):
+    """Exhaustive O(n^2) search of the same objective, for reference."""
+    n = len(x)
+    S1 = np.r_[0.0, np.cumsum(x)]
+    S2 = np.r_[0.0, np.cumsum(x**2)]
+    F = np.full(n + 1, np.inf)
+    F[0] = -penalty
+    last_change = np.zeros(n + 1, dtype=int)
+    for t in range(1, n + 1):
+        for s in range(0, t - min_size + 1):
+            cost = F[s] + S2[t] - S2[s] - (S1[t] - S1[s]) ** 2 / (t - s) + penalty
+            if cost < F[t]:
+                F[t], last_change[t] = cost, s
+    change_points, t = [], n
+    while t > 0:
+        t = last_change[t]
+        if t > 0:
+            change_points.append(t)
+    return change_points[::-1]
+
+
+def test_pelt_matches_exhaustive_search():
+    """Pruning never drops the optimal segmentation."""
+    for seed in range(10):
+        rng = np.random.default_rng(seed)
+        n = int(rng.integers(20, 100))
+        x = np.cumsum(rng.normal(0, 0.3, n)) + rng.normal(0, 1, n)
+        penalty, min_size = rng.uniform(1, 10), int(rng.integers(1, 6))
+        assert list(pelt(x, penalty, min_size)) == optimal_partitioning(
+            x, penalty, min_size
+        )
+
+
+def test_detects_level_shifts_with_segment_means():
+    """Shifts are found with the default penalty and summarized per segment."""
+    rng = np.random.default_rng(0)
+    x = np.r_[rng.normal(0, 1, 200), rng.normal(3, 1, 150), rng.normal(-1, 1, 300)]
+    change_points = pelt(x)
+    assert list(change_points) == [200, 350]
+
+    summary = segment_summary(x, change_points)
+    assert list(summary["Length"]) == [200, 150, 300]
+    assert np.allclose(summary["Mean"], [0, 3, -1], atol=0.2)
+    assert np.isnan(summary["Shift"][0])
+
+    results_df = pd.DataFrame(
+        {
+            "Timestamp": pd.date_range("2024-01-01", periods=len(x)),
+            "Water_Retention": x,
+        }
+    )
+    segments = detect_change_points(results_df, columns=("Water_Retention",))
+    assert segments["Water_Retention"]["Start"][1] == pd.Timestamp("2024-07-19")
+
+    batch = detect_change_points_batch([x, x[:200], x[150:]], n_workers=1)
+    assert [list(c) for c in batch] == [[200, 350], [], [50, 200]]
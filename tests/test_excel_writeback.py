@@ -0,0 +1,80 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from excel_writeback import RESULTS_SHEET, results_table, write_back_results
+
+
+def _journal_workbook(path):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Journal"
+    ws.append(["Date", "Nourriture", "Pds", "Sport"])
+    ws.append(["2025-07-10", "=1.5*Pomme", 80.1, "14*8"])
+    for row in range(3, 6):
+        ws.append([f"=A{row - 1}+1", "=2*Banane", 80.0, None])
+    wb.create_sheet("Variables").append(["Nom", "Calories / 100g"])
+    wb.save(path)
+
+
+def test_write_back_preserves_journal_and_skips_unchanged(tmp_path):
+    """Results land in their own sheet, formulas survive, unchanged runs are no-ops."""
+    workbook_path = str(tmp_path / "Journal nutrition.xlsx")
+    output_path = str(tmp_path / "Journal résultats.xlsx")
+    _journal_workbook(workbook_path)
+
+    results_df = pd.DataFrame(
+        {
+            "Timestamp": pd.date_range("2025-07-10", periods=4),
+            "Base_Metabolism": [2500.0, 2510.0, np.nan, 2530.0],
+            "Water_Retention": [0.1, 0.2, 0.3, 0.4],
+        }
+    )
+    nutrients_df = pd.DataFrame(
+        {"calories": [1800.0, 2100.0], "sodium": [2000.0, 2500.0]},
+        index=["2025-07-11", "2025-07-10"],
+    )
+    table = results_table(results_df, nutrients_df)
+    assert list(table.columns) == [
+        "Date",
+        "calories",
+        "sodium",
+        "Base_Metabolism",
+        "Water_Retention",
+    ]
+
+    written, changed = write_back_results(workbook_path, output_path, table)
+    assert written
+    assert changed == ["2025-07-10", "2025-07-11", "2025-07-12", "2025-07-13"]
+
+    wb = load_workbook(output_path)
+    assert wb.sheetnames == ["Journal", "Variables", RESULTS_SHEET]
+    assert wb["Journal"]["A3"].value == "=A2+1"
+    assert wb["Journal"]["B2"].value == "=1.5*Pomme"
+    rows = list(wb[RESULTS_SHEET].iter_rows(values_only=True))
+    assert rows[0] == tuple(table.columns)
+    assert rows[1] == ("2025-07-10", 2100, 2500, 2500, 0.1)
+    assert rows[3] == ("2025-07-12", None, None, None, 0.3)
+
+    assert write_back_results(workbook_path, output_path, table) == (False, [])
+
+    table.loc[2, "Base_Metabolism"] = 2520.0
+    assert write_back_results(workbook_path, output_path, table) == (
+        True,
+        ["2025-07-12"],
+    )
+
+    # In place: the sheet is replaced rather than added twice.
+    for _ in range(2):
+        write_back_results(workbook_path, workbook_path, table)
+    assert write_back_results(workbook_path, workbook_path, table) == (False, [])
+    wb = load_workbook(workbook_path)
+    assert wb.sheetnames == ["Journal", "Variables", RESULTS_SHEET]
+    assert wb[RESULTS_SHEET]["D4"].value == 2520
+    assert wb["Journal"]["A5"].value == "=A4+1"
@@ -0,0 +1,59 @@
+import sys
+import os
+import math
+
+import numpy as np
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from conftest import SAMPLE_FOODS
+from food_layers import BaseFoodIndex, LayeredFormulaParser
+
+
+def test_overlay_adds_and_overrides_foods(tmp_path):
+    """User foods shadow the shared base without changing it or other users."""
+    BaseFoodIndex.from_nutrition_list(SAMPLE_FOODS).save(str(tmp_path / "base"))
+    base = BaseFoodIndex.load(str(tmp_path / "base"), mmap=True)
+    assert isinstance(base.values, np.memmap)
+
+    alice = LayeredFormulaParser(
+        base,
+        [
+            {"Nom": "pomme", "Calories / 100g": 60},
+            {"Nom": "Pomme au four", "Calories / 100g": 80},
+        ],
+    )
+    bob = LayeredFormulaParser(base)
+
+    result = alice.calculate_nutrition_for_day("2 * Pomme + Banane", "2025-07-12")
+    assert math.isclose(result.calories, 2 * 60 + 89)
+    # The longer overlay name wins over the base name it contains.
+    result = alice.calculate_nutrition_for_day("1 * pomme au four", "2025-07-12")
+    assert math.isclose(result.calories, 80)
+    # Typo correction sees both layers.
+    result = alice.calculate_nutrition_for_day("1 * Bananne", "2025-07-12")
+    assert math.isclose(result.calories, 89)
+
+    result = bob.calculate_nutrition_for_day("2 * Pomme + Oeuf au plat", "2025-07-12")
+    assert math.isclose(result.calories, 2 * 52 + 155)
+    assert math.isclose(result.fibres, 2 * 2.4)
+
+    # Removing an overlay food uncovers the base one again.
+    alice.remove_foods(["pomme", "Pomme au four"])
+    result = alice.calculate_nutrition_for_day("2 * Pomme", "2025-07-12")
+    assert math.isclose(result.calories, 2 * 52)
+    assert "Pomme au four" not in alice.nutrition_data
+    assert alice.base.get_food_pattern() is bob.base.get_food_pattern()
+
+
+def test_missing_base_values_are_reported():
+    """Values missing in the base matrix still count as missing foods."""
+    base = BaseFoodIndex.from_nutrition_list(
+        [{"Nom": "Mystere", "Calories / 100g": 10}]
+    )
+    result = LayeredFormulaParser(base).calculate_nutrition_for_day(
+        "3 * Mystere", "2025-07-12"
+    )
+    assert math.isclose(result.calories, 30)
+    assert result.missing_foods
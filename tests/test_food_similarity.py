@@ -0,0 +1,45 @@
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from conftest import SAMPLE_FOODS
+from search_similar_foods import NutrientSimilarityIndex
+
+FOODS = SAMPLE_FOODS + [
+    dict(SAMPLE_FOODS[0], **{"Nom": "Pomme verte", "Calories / 100g": 50}),
+    {"Nom": "Chips", "Calories / 100g": 536, "Fat": 35, "Carbs": 53, "Sel": 1.5},
+    {"Nom": "Chips light", "Calories / 100g": 480, "Fat": 25, "Carbs": 60, "Sel": 0.6},
+    {"Nom": "Bretzel", "Calories / 100g": 380, "Fat": 3, "Carbs": 80, "Sel": 3.0},
+]
+
+
+def test_similar_foods_matches_brute_force():
+    """KD-tree neighbours equal a brute-force scan, batched or not."""
+    index = NutrientSimilarityIndex(FOODS)
+    scaled = index.values / index._scale
+    for name in index.names:
+        own = index.names.index(name)
+        distances = np.linalg.norm(scaled - scaled[own], axis=1)
+        expected = [index.names[i] for i in np.argsort(distances) if i != own][:3]
+        assert [n for n, _ in index.similar_foods(name, 3)] == expected
+
+    batch = index.similar_foods(["pomme", "CHIPS"], 1)
+    assert batch == [index.similar_foods("Pomme", 1), index.similar_foods("Chips", 1)]
+    assert batch[0][0][0] == "Pomme verte"
+
+
+def test_alternatives_and_basis():
+    """Alternatives keep only foods with less of the nutrient; 100 kcal rescales."""
+    index = NutrientSimilarityIndex(FOODS)
+    found = [n for n, _ in index.alternatives("Chips", "Sel", k=2)]
+    assert found[0] == "Chips light"
+    assert all(index.vector(n)[index.nutrients.index("Sel")] < 1.5 for n in found)
+    assert "Bretzel" in [n for n, _ in index.alternatives("Chips", "Sel", lower=False)]
+
+    per_kcal = NutrientSimilarityIndex(FOODS, basis="100kcal")
+    assert np.isclose(per_kcal.vector("Pomme")[0], 100.0)
+    assert np.isclose(per_kcal.vector("Chips")[2], 35 * 100 / 536)
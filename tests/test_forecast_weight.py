@@ -0,0 +1,51 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from forecast_weight import forecast_from_results, forecast_weight_scenarios
+
+
+def test_matches_day_by_day_simulation():
+    """Vectorized trajectories equal a plain loop over the energy balance."""
+    rng = np.random.default_rng(0)
+    calories_in = rng.normal(2000, 300, size=(50, 30))
+    calories_sport = rng.uniform(0, 500, size=(50, 30))
+
+    trajectories, summary = forecast_weight_scenarios(
+        80.0, calories_in, calories_sport, base_metabolism=2100.0, target_weight=79.0
+    )
+
+    weight = np.full(50, 80.0)
+    for day in range(30):
+        weight = weight + (calories_in[:, day] - calories_sport[:, day] - 2100) / 7700
+        assert np.allclose(trajectories[:, day], weight)
+    assert np.allclose(summary["Final_Weight"], weight)
+
+    for i in range(50):
+        below = np.flatnonzero(trajectories[i] <= 79.0)
+        expected = below[0] + 1 if len(below) else -1
+        assert summary["Days_To_Target"][i] == expected
+
+
+def test_forecast_from_results():
+    """Forecasts start from the last modelled weight with the recent B(t)."""
+    results_df = pd.DataFrame(
+        {
+            "Actual_Weight": [81.0, 80.5, 80.0],
+            "Base_Metabolism": [2500.0, 2300.0, 2300.0],
+        }
+    )
+    plans = np.array([[1530.0] * 10, [2300.0] * 10])
+
+    trajectories, summary = forecast_from_results(
+        results_df, plans, target_weight=79.0, baseline_days=2
+    )
+
+    assert np.allclose(trajectories[0], 80.0 - 0.1 * np.arange(1, 11))
+    assert np.allclose(trajectories[1], 80.0)
+    assert list(summary["Days_To_Target"]) == [10, -1]
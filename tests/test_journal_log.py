@@ -0,0 +1,96 @@
+import sys
+import os
+
+import pandas as pd
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from calculate_nutrition import FormulaParser
+from conftest import SAMPLE_FOODS
+from journal_log import append_entry, tail_journal_log
+from nutrition_store import NutritionStore
+from run_new_model import prepare_model_inputs
+
+
+def test_tail_merges_new_entries_incrementally(tmp_path):
+    """Only new complete lines are read; relative dates and partial days merge."""
+    log_path = str(tmp_path / "journal.jsonl")
+    parser = FormulaParser(nutrition_list=SAMPLE_FOODS)
+    with NutritionStore(str(tmp_path / "store.sqlite3")) as store:
+        append_entry(log_path, {"Date": "2025-07-12", "weight": 80.1, "sport": "14*8"})
+        append_entry(log_path, {"recorded food": "2 * Pomme", "weight": 79.9})
+        changed, errors = tail_journal_log(log_path, store, parser)
+        assert changed == ["2025-07-12", "2025-07-13"] and not errors
+        assert store.journal_range("2025-07-12")[0]["sport"] == "weight_lifting(14)"
+
+        # Nothing new: nothing is read again.
+        assert tail_journal_log(log_path, store, parser) == ([], {})
+
+        append_entry(log_path, {"Date": "2025-07-12", "recorded food": "1 * Banane"})
+        append_entry(log_path, {"Date": "not a date"})
+        with open(log_path, "a") as f:
+            f.write('{"Date": "2025-07-14", "weight"')  # still being written
+        changed, errors = tail_journal_log(log_path, store, parser)
+        assert changed == ["2025-07-12"]
+        assert len(errors) == 1
+
+        with open(log_path, "a") as f:
+            f.write(": 79.5}\n")
+        changed, _ = tail_journal_log(log_path, store, parser)
+        assert changed == ["2025-07-14"]
+
+        day = store.journal_range("2025-07-12", "2025-07-12")[0]
+        assert day["weight"] == 80.1 and day["recorded food"] == "1 * Banane"
+        model = store.model_journal()
+        assert [r["Pds"] for r in model] == [80.1, 79.9, 79.5]
+        assert [r["Cals"] for r in model] == [89, 104, None]
+
+
+def test_logged_sport_reaches_the_model_inputs(tmp_path):
+    """Sport formulas count as calories, with the day's weight; no sport counts 0."""
+    log_path = str(tmp_path / "journal.jsonl")
+    parser = FormulaParser(nutrition_list=SAMPLE_FOODS)
+    with NutritionStore(str(tmp_path / "store.sqlite3")) as store:
+        append_entry(
+            log_path,
+            {
+                "Date": "2025-07-12",
+                "weight": 80.0,
+                "recorded food": "20 * Pomme",
+                "sport": "14*8*3 + running(30)",
+            },
+        )
+        append_entry(log_path, {"weight": 79.8, "recorded food": "20 * Banane"})
+        append_entry(log_path, {"weight": 79.6, "sport": "running(30) +"})
+        changed, errors = tail_journal_log(log_path, store, parser)
+        assert len(changed) == 2 and len(errors) == 1
+
+        df_model = prepare_model_inputs(pd.DataFrame(store.model_journal()))
+        assert list(df_model.index.strftime("%Y-%m-%d")) == ["2025-07-12", "2025-07-13"]
+        assert df_model["Sport ajusté"].tolist() == [
+            14 * 8 * 0.1 * 3 + 10.0 * 80.0 * 30 / 60,
+            0,
+        ]
+
+
+def test_days_with_unreadable_sport_are_skipped(tmp_path, caplog):
+    """Ingested days whose sport cannot be evaluated are left out and logged, not 0."""
+    with NutritionStore(str(tmp_path / "store.sqlite3")) as store:
+        store.upsert_journal(
+            [
+                {
+                    "Date": "2025-07-12",
+                    "weight": 80.0,
+                    "sport": "10.5*8.0 + running(22.5)",
+                },
+                {"Date": "2025-07-13", "weight": 79.8, "sport": "running(30) +"},
+                {"Date": "2025-07-14", "weight": 79.6, "Sport ajusté": 250},
+            ]
+        )
+        with caplog.at_level("WARNING", logger="nutrition_store"):
+            model = store.model_journal()
+        assert [r["Date"] for r in model] == ["2025-07-12", "2025-07-14"]
+        assert abs(model[0]["Sport ajusté"] - (8.4 + 10.0 * 80.0 * 22.5 / 60)) < 1e-9
+        assert model[1]["Sport ajusté"] == 250
+        assert "2025-07-13" in caplog.text
@@ -0,0 +1,114 @@
+import sys
+import os
+
+import pytest
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from calculate_nutrition import FormulaParser
+from conftest import SAMPLE_FOODS
+from meal_planner import journal_foods, plan_meals
+
+FOODS = SAMPLE_FOODS + [
+    {
+        "Nom": "Poulet",
+        "Calories / 100g": 165,
+        "Protéine": 31,
+        "Fat": 3.6,
+        "SFat": 1.0,
+        "Carbs": 0,
+        "Sugar": 0,
+        "Fibres": 0,
+        "Sel": 0.2,
+    },
+    {
+        "Nom": "Lentilles",
+        "Calories / 100g": 116,
+        "Protéine": 9,
+        "Fat": 0.4,
+        "SFat": 0.1,
+        "Carbs": 20,
+        "Sugar": 1.8,
+        "Fibres": 8,
+        "Sel": 0.0,
+    },
+    {"Nom": "Mystere", "Calories / 100g": 10},
+]
+
+
+def test_plan_meets_targets_and_round_trips():
+    """The plan's formula evaluates back to totals within the targets."""
+    parser = FormulaParser(nutrition_list=FOODS)
+    targets = {
+        "calories": (1800, 2200),
+        "protein": (120, None),
+        "fibres": (30, None),
+        "salt": (None, 5),
+    }
+    formula, quantities, totals = plan_meals(parser, targets, max_quantity=6)
+
+    assert "Mystere" not in quantities
+    assert all(
+        0 < q <= 6 and round(q * 100, 6).is_integer() for q in quantities.values()
+    )
+    assert 1800 <= totals.calories <= 2200
+    assert totals.protein >= 120 - 1e-6
+    assert totals.fibres >= 30 - 1e-6
+    assert totals.salt <= 5
+    assert formula == " + ".join(f"{q:g} * {n}" for n, q in quantities.items())
+
+
+def test_portions_max_foods_and_journal_restriction():
+    """Whole portions, a food count limit and journal foods are honoured."""
+    parser = FormulaParser(nutrition_list=FOODS)
+    eaten = journal_foods(parser, ["2 * pomme + 1.5 * poulet", None, "1 * Lentilles"])
+    assert eaten == {"Pomme", "Poulet", "Lentilles"}
+
+    _, quantities, totals = plan_meals(
+        parser,
+        {"calories": (1500, 1700), "protein": (100, None)},
+        foods=eaten,
+        portion=0.5,
+        max_foods=2,
+        max_quantity=8,
+    )
+    assert set(quantities) <= eaten and len(quantities) <= 2
+    assert all((q / 0.5).is_integer() for q in quantities.values())
+    assert 1500 <= totals.calories <= 1700
+
+    with pytest.raises(ValueError):
+        plan_meals(parser, {"calories": (5000, None)}, foods=["Pomme"])
+
+
+def test_formula_round_trips_names_with_digits_and_operators():
+    """Names with digits, accents or operator characters parse back to the same foods."""
+    names = ["Pain 7-céréales", "Yaourt 0% (nature)", "Coca 0sucre"]
+    # Each a copy of Poulet, so that the plan needs all of them.
+    foods = FOODS + [dict(FOODS[3], Nom=name) for name in names]
+    parser = FormulaParser(nutrition_list=foods)
+
+    formula, quantities, totals = plan_meals(
+        parser, {"calories": (1000, 1100), "protein": (150, None)}, foods=names
+    )
+    assert set(quantities) == set(names)
+    _, food_vars_map, unmatched = parser._parse_and_prepare_formula(formula)
+    assert not unmatched
+    assert sorted(food_vars_map.values()) == sorted(quantities)
+    expected = sum(
+        q * next(f for f in foods if f["Nom"] == name)["Calories / 100g"]
+        for name, q in quantities.items()
+    )
+    assert abs(totals.calories - expected) < 1e-6
+
+
+def test_implicit_multiplication_still_applies_to_quantities():
+    """Quantities glued to a name, also without a leading zero, still multiply it."""
+    parser = FormulaParser(nutrition_list=FOODS)
+    for formula, calories in [
+        (".5pomme", 0.5 * 52),
+        ("1.5Pomme + 2(Banane)", 1.5 * 52 + 2 * 89),
+        ("2 pomme + ,5 banane", 2 * 52 + 0.5 * 89),
+    ]:
+        result = parser.calculate_nutrition_for_day(formula, "")
+        assert abs(result.calories - calories) < 1e-9, formula
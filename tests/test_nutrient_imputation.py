@@ -0,0 +1,100 @@
+import json
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from calculate_nutrition import FormulaParser
+from conftest import SAMPLE_FOODS
+from nutrient import NUTRIENT_KEYS
+from nutrient_imputation import (
+    apply_imputations,
+    impute_missing_nutrients,
+    load_imputations,
+    save_imputations,
+)
+
+
+def test_imputation_matches_brute_force():
+    """With every food as a candidate, values are the weighted k-NN of a plain scan."""
+    rng = np.random.default_rng(0)
+    values = rng.gamma(2, 5, (120, len(NUTRIENT_KEYS)))
+    values[rng.random(values.shape) < 0.2] = np.nan
+    foods = [
+        {"Nom": f"Food {chr(65 + i // 26)}{chr(65 + i % 26)}"}
+        | {
+            key: None if np.isnan(value) else float(value)
+            for key, value in zip(NUTRIENT_KEYS, row)
+        }
+        for i, row in enumerate(values)
+    ]
+    records = impute_missing_nutrients(
+        foods,
+        k=3,
+        n_candidates=len(foods),
+        n_name_candidates=0,
+        n_components=len(NUTRIENT_KEYS),
+        name_weight=0,
+    )
+    imputed = {record["Nom"]: record["Imputed"] for record in records}
+
+    present = ~np.isnan(values)
+    scaled = (values - np.nanmean(values, axis=0)) / np.nanstd(values, axis=0)
+    for i, food in enumerate(foods):
+        for j, key in enumerate(NUTRIENT_KEYS):
+            if present[i, j] or key in ("SFat", "Sugar", "Free sugar"):
+                continue
+            scores = []
+            for other in range(len(foods)):
+                shared = present[i] & present[other]
+                if other != i and present[other, j] and shared.any():
+                    difference = scaled[i, shared] - scaled[other, shared]
+                    scores.append((np.sqrt(np.mean(difference**2)), other))
+            best = sorted(scores)[:3]
+            weights = np.array([1 / (score + 1e-6) for score, _ in best])
+            expected = weights @ [values[other, j] for _, other in best] / weights.sum()
+            assert np.isclose(imputed[food["Nom"]][key], expected, atol=1e-4)
+
+
+def test_imputed_values_feed_the_parser(tmp_path):
+    """Imputed values fill only missing fields, with provenance, when asked."""
+    foods = SAMPLE_FOODS + [
+        dict(SAMPLE_FOODS[0], Nom=f"Pomme {variety}", Fibres=fibres)
+        for variety, fibres in [("verte", 2.2), ("rouge", 2.6), ("jaune", 2.4)]
+    ]
+    foods.append(dict(SAMPLE_FOODS[0], Nom="Pomme golden", Fibres=None, SFat=None))
+    foods.append(dict(SAMPLE_FOODS[1], Nom="Banane plantain", Water=None, Sugar=50))
+
+    records = impute_missing_nutrients(foods, k=3)
+    by_name = {record["Nom"]: record for record in records}
+    assert set(by_name) == {"Pomme golden", "Banane plantain"}
+    assert 2.2 <= by_name["Pomme golden"]["Imputed"]["Fibres"] <= 2.6
+    assert by_name["Pomme golden"]["Neighbours"][0].startswith("Pomme")
+    # Capped by the food's own fat.
+    assert by_name["Pomme golden"]["Imputed"]["SFat"] <= 0.2
+
+    path = str(tmp_path / "nutrition_imputed.json")
+    save_imputations(records, path)
+    assert load_imputations(path) == records
+
+    # A value entered since the imputation wins over the estimate.
+    foods[-2] = dict(foods[-2], SFat=0.05)
+    filled = {row["Nom"]: row for row in apply_imputations(foods, records)}
+    assert filled["Pomme golden"]["SFat"] == 0.05
+    assert filled["Pomme golden"]["Imputed"] == ["Fibres"]
+    assert "Imputed" not in filled["Pomme"]
+
+    nutrition_path = str(tmp_path / "nutrition_values.json")
+    with open(nutrition_path, "w") as f:
+        json.dump(foods, f)
+    plain = FormulaParser(nutrition_path).calculate_nutrition_for_day(
+        "1 * Pomme golden", ""
+    )
+    assert plain.fibres == 0 and plain.missing_foods
+    parser = FormulaParser(nutrition_path, imputations_path=path)
+    total = parser.calculate_nutrition_for_day("1 * Pomme golden", "")
+    assert total.fibres == by_name["Pomme golden"]["Imputed"]["Fibres"]
+    assert not total.missing_foods
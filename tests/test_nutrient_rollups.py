@@ -0,0 +1,116 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from nutrient import Nutrient
+from nutrient_rollups import MODEL_COLUMNS, NUTRIENT_COLUMNS, RollupIndex
+from nutrition_store import NutritionStore
+
+
+def make_daily_frame(n_days=400, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "calories": rng.normal(2200, 300, n_days),
+            "sodium": rng.normal(2500, 500, n_days),
+            "Base_Metabolism": rng.normal(2300, 50, n_days),
+        },
+        index=pd.date_range("2024-07-01", periods=n_days, freq="D"),
+    )
+    df.iloc[::7, 2] = np.nan  # some days without model output
+    return df
+
+
+def test_range_queries_match_pandas():
+    """Range sums, means, rolling and monthly means agree with pandas."""
+    df = make_daily_frame()
+    index = RollupIndex.from_frame(df)
+
+    expected = df.loc["2024-09-03":"2024-12-24"]
+    sums = index.range_sum("2024-09-03", "2024-12-24")
+    means = index.range_mean("2024-09-03", "2024-12-24")
+    assert np.allclose(sums.values, expected.sum().values)
+    assert np.allclose(means.values, expected.mean().values)
+
+    rolling = index.rolling_mean(7)
+    assert (rolling.index.date == df.index.date).all()
+    assert np.allclose(
+        rolling.values, df.rolling(7, min_periods=1).mean().values, equal_nan=True
+    )
+    monthly = index.period_means("M")
+    assert np.allclose(monthly.values, df.resample("MS").mean().values)
+
+
+def test_incremental_updates():
+    """Appended and edited days are reflected in later queries."""
+    df = make_daily_frame(60)
+    index = RollupIndex.from_frame(df)
+
+    index.set_day("2024-08-30", {"calories": 3000.0})
+    index.set_day("2024-07-10", {"calories": 0.0})
+    index.set_day("2024-09-05", Nutrient({"Calories / 100g": 1000.0}))
+    expected = df["calories"].copy()
+    expected["2024-08-30"] = 3000.0
+    expected["2024-07-10"] = 0.0
+    expected["2024-09-05"] = 1000.0
+
+    assert len(index) == 67
+    assert np.isclose(index.range_sum()["calories"], expected.sum())
+    assert np.isclose(
+        index.range_mean("2024-08-25", "2024-09-10")["calories"],
+        expected["2024-08-25":"2024-09-10"].mean(),
+    )
+    assert index.range_count("2024-09-01", "2024-09-04")["calories"] == 0
+
+
+def test_random_edits_match_a_full_recomputation():
+    """Range queries stay exact through edits, appends and prepends in any order."""
+    rng = np.random.default_rng(1)
+    df = make_daily_frame(100)
+    index = RollupIndex.from_frame(df)
+    expected = df.copy()
+    for _ in range(300):
+        day = pd.Timestamp("2024-06-20") + pd.Timedelta(days=int(rng.integers(0, 130)))
+        value = None if rng.random() < 0.1 else float(rng.normal(2200, 300))
+        index.set_day(day, {"calories": value})
+        expected.loc[day, "calories"] = np.nan if value is None else value
+    expected = expected.sort_index().asfreq("D")
+
+    assert (index.to_frame().index == expected.index).all()
+    for start, end in [("2024-06-20", "2024-10-27"), ("2024-07-03", "2024-07-03")]:
+        window = expected.loc[start:end]
+        assert np.allclose(index.range_sum(start, end).values, window.sum().values)
+        assert (index.range_count(start, end).values == window.count().values).all()
+
+
+def test_empty_frame_gives_an_empty_index():
+    """An empty frame builds an empty index that accepts later days."""
+    df = make_daily_frame().iloc[:0]
+    index = RollupIndex.from_frame(df)
+    assert len(index) == 0 and index.end_date is None
+    assert (index.range_sum().values == 0).all()
+    assert index.to_frame().empty and index.rolling_mean(7).empty
+
+    index.set_day("2024-07-01", {"calories": 2000.0})
+    assert index.range_sum()["calories"] == 2000.0
+
+
+def test_empty_store_gives_an_empty_index(tmp_path):
+    """An empty store builds an empty index; later stores keep every column."""
+    with NutritionStore(str(tmp_path / "store.sqlite3")) as store:
+        index = RollupIndex.from_store(store)
+        assert len(index) == 0
+        assert index.columns == NUTRIENT_COLUMNS + MODEL_COLUMNS
+
+        store.upsert_daily_nutrients(
+            {"2025-07-12": Nutrient({"Calories / 100g": 1800})}
+        )
+        index = RollupIndex.from_store(store)
+        assert index.columns == NUTRIENT_COLUMNS + MODEL_COLUMNS
+        assert index.range_sum()["calories"] == 1800
+        assert index.range_count()["Base_Metabolism"] == 0
@@ -0,0 +1,190 @@
+import sys
+import os
+import json
+import math
+import threading
+import time
+import urllib.request
+
+import pytest
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from nutrition_server import NutritionService, make_server
+
+
+@pytest.fixture
+def server_url(sample_nutrition_path):
+    service = NutritionService(sample_nutrition_path)
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", service
+    server.shutdown()
+    server.server_close()
+
+
+def request_json(url, payload=None):
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    request = urllib.request.Request(
+        url, data=data, headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_nutrition_and_search(server_url):
+    """The daemon evaluates formulas and searches foods on localhost."""
+    url, _ = server_url
+
+    status, body = request_json(f"{url}/nutrition", {"formula": "1.5 * Pomme"})
+    assert status == 200
+    assert math.isclose(body["nutrients"]["calories"], 1.5 * 52)
+
+    status, body = request_json(f"{url}/nutrition", {"formula": "1 * Pizza"})
+    assert status == 400
+    assert "pizza" in body["error"].lower()
+
+    status, body = request_json(f"{url}/search?q=ban")
+    assert status == 200
+    assert [item["Nom"] for item in body] == ["Banane"]
+
+
+class GatedParser:
+    """Wraps a parser; the first evaluation blocks until `release` is set."""
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = []
+
+    def calculate_nutrition_for_day(self, formula, date_str):
+        self.calls.append(formula)
+        if not self.started.is_set():
+            self.started.set()
+            assert self.release.wait(10)
+        return self.parser.calculate_nutrition_for_day(formula, date_str)
+
+
+def test_concurrent_requests_are_coalesced(server_url):
+    """Requests queued while a batch runs form the next batch, one evaluation per formula."""
+    url, service = server_url
+    batcher = service.batcher
+    gate = GatedParser(batcher.parser)
+    batcher.parser = gate
+
+    first = batcher.submit("Pomme")
+    assert gate.started.wait(10)
+    # The worker is blocked inside the first batch, so the whole request queues up.
+    formulas = ["2 * Oeuf_au_plat + Banane"] * 50 + ["Pomme"] * 50
+    responses = []
+    client = threading.Thread(
+        target=lambda: responses.append(
+            request_json(f"{url}/nutrition", {"formulas": formulas})
+        )
+    )
+    client.start()
+    while batcher._queue.qsize() < len(formulas):
+        assert client.is_alive()
+        time.sleep(0.001)
+    gate.release.set()
+    client.join(10)
+
+    assert first.result(10).calories == 52
+    status, body = responses[0]
+    assert status == 200
+    assert len(body) == 100
+    assert math.isclose(body[-1]["nutrients"]["calories"], 52)
+    assert batcher.batches == 2
+    assert gate.calls == ["Pomme", "2 * Oeuf_au_plat + Banane", "Pomme"]
+
+
+def test_unexpected_errors_get_a_json_answer(server_url):
+    """Errors outside the expected formula errors still answer with JSON, as a 500."""
+    url, service = server_url
+
+    class BrokenParser:
+        def calculate_nutrition_for_day(self, formula, date_str):
+            raise OverflowError("math range error")
+
+    service.batcher.parser = BrokenParser()
+    status, body = request_json(f"{url}/nutrition", {"formula": "1 * Pomme"})
+    assert status == 500
+    assert body["error"] == "OverflowError: math range error"
+
+    status, body = request_json(f"{url}/nutrition", {"formulas": 3})
+    assert status == 400
+
+
+def test_refit_with_new_day(server_url):
+    """Adding days refits the model and returns the latest estimate."""
+    url, _ = server_url
+    for day, weight in enumerate([80.0, 79.9, 80.1, 79.8]):
+        status, body = request_json(
+            f"{url}/refit",
+            {
+                "Date": f"2025-07-{day + 10}",
+                "Pds": weight,
+                "recorded food": "10 * Banane",
+                "Sport ajusté": 300,
+            },
+        )
+        assert status == 200
+
+    assert body["Timestamp"] == "2025-07-13"
+    assert body["Observed_Weight"] == 79.8
+    status, body = request_json(f"{url}/model?last=10")
+    assert len(body) == 4
+
+    status, body = request_json(f"{url}/changes")
+    assert status == 200
+    assert [segment["Length"] for segment in body["Base_Metabolism"]] == [4]
+
+
+def test_failed_refit_keeps_the_journal(server_url, monkeypatch):
+    """A day whose refit fails is not kept, and the previous results stay."""
+    import run_new_model
+    from scipy.optimize import OptimizeResult
+
+    url, service = server_url
+    day = {"Cals": 2000, "Sport ajusté": 0}
+    for date, weight in [("2025-07-10", 80.0), ("2025-07-11", 79.9)]:
+        request_json(f"{url}/refit", {"Date": date, "Pds": weight, **day})
+    journal, results = list(service.journal), service.results
+    assert len(results) == 2
+
+    monkeypatch.setattr(
+        run_new_model,
+        "fit_base_metabolism",
+        lambda *args, **kwargs: OptimizeResult(success=False, message="Stalled"),
+    )
+    status, body = request_json(
+        f"{url}/refit", {"Date": "2025-07-12", "Pds": 79.7, **day}
+    )
+    assert status == 400 and "Stalled" in body["error"]
+    assert service.journal == journal and service.results is results
+
+
+def test_refit_keeps_the_other_records_of_the_day(server_url):
+    """A timed record is added to its day, and replaces only the same timestamp."""
+    url, service = server_url
+    day = {"Cals": 2000, "Sport ajusté": 0}
+    for date, weight in [
+        ("2025-07-10T07:00", 80.0),
+        ("2025-07-10T21:00", 81.0),
+        ("2025-07-11T07:00", 79.9),
+        ("2025-07-11T07:00", 79.7),
+    ]:
+        request_json(f"{url}/refit", {"Date": date, "Pds": weight, **day})
+
+    assert [(d["Date"], d["Pds"]) for d in service.journal] == [
+        ("2025-07-10T07:00", 80.0),
+        ("2025-07-10T21:00", 81.0),
+        ("2025-07-11T07:00", 79.7),
+    ]
+    assert list(service.results["Observed_Weight"]) == [80.0, 79.7]
@@ -0,0 +1,117 @@
+import sys
+import os
+import math
+
+import pandas as pd
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from calculate_nutrition import FormulaParser
+from conftest import SAMPLE_FOODS
+from nutrition_store import NutritionStore
+
+
+def test_foods_upsert_and_search(tmp_path):
+    """Only new or changed foods are reported, and FTS search ignores accents."""
+    with NutritionStore(str(tmp_path / "store.sqlite3")) as store:
+        foods = SAMPLE_FOODS + [{"Nom": "Pâtes bolognaise", "Calories / 100g": 150}]
+        assert len(store.upsert_foods(foods)) == 4
+        assert store.upsert_foods(foods) == []
+
+        changed = dict(SAMPLE_FOODS[0], **{"Calories / 100g": 55})
+        assert store.upsert_foods([changed]) == ["Pomme"]
+        assert store.get_food("POMME")["Calories / 100g"] == 55
+        assert store.get_food("oeuf au plat")["Nom"] == "Oeuf_au_plat"
+
+        assert [f["Nom"] for f in store.search_foods("pat bolo")] == [
+            "Pâtes bolognaise"
+        ]
+        assert [f["Nom"] for f in store.search_foods("oeuf")] == ["Oeuf_au_plat"]
+
+        parser = FormulaParser(nutrition_list=store.load_nutrition_list())
+        result = parser.calculate_nutrition_for_day("2 * Pomme", "2025-07-12")
+        assert math.isclose(result.calories, 110)
+
+
+def test_journal_nutrients_and_model_ranges(tmp_path):
+    """Changed journal days are recomputed and date ranges only return those days."""
+    with NutritionStore(str(tmp_path / "store.sqlite3")) as store:
+        store.upsert_foods(SAMPLE_FOODS)
+        parser = FormulaParser(nutrition_list=store.load_nutrition_list())
+
+        records = [
+            {"Date": f"2025-07-{day:02d} 00:00:00", "recorded food": "1 * Pomme"}
+            for day in range(1, 11)
+        ]
+        assert len(store.upsert_journal(records)) == 10
+        assert store.refresh_daily_nutrients(parser) == {}
+
+        records[4]["recorded food"] = "2 * Banane"
+        changed = store.upsert_journal(records)
+        assert changed == ["2025-07-05"]
+        store.refresh_daily_nutrients(parser, changed)
+
+        rows = store.daily_nutrients_range("2025-07-04", "2025-07-06")
+        assert [r["date"] for r in rows] == ["2025-07-04", "2025-07-05", "2025-07-06"]
+        assert math.isclose(rows[1]["calories"], 2 * 89)
+        assert math.isclose(rows[0]["sodium"], 0.01 * 400)
+
+        results_df = pd.DataFrame(
+            {
+                "Timestamp": pd.date_range("2025-07-01", periods=10),
+                "Observed_Weight": 80.0,
+                "Actual_Weight": 79.5,
+                "Base_Metabolism": 2300.0,
+                "Water_Retention": 0.5,
+            }
+        )
+        store.upsert_model_results(results_df)
+        rows = store.model_results_range(start="2025-07-09")
+        assert [r["date"] for r in rows] == ["2025-07-09", "2025-07-10"]
+        assert rows[0]["base_metabolism"] == 2300.0
+
+
+def test_sub_daily_journal_rows_survive_the_store(tmp_path):
+    """Rows of the same day ('=A2+0.25') are kept apart and add up per day."""
+    from openpyxl import Workbook
+
+    from process_journal_food_sport_weight import ingest_journal
+    from run_new_model import prepare_model_inputs
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Journal"
+    ws.append(["Date", "Nourriture", "Pds", "Sport"])
+    ws.append(["2025-07-01 07:00", "1 * Pomme", 80.0, 0])
+    ws.append(["=A2+0.5", "2 * Banane", 81.0, 300])
+    ws.append(["=A3+0.5", "1 * Pomme", 79.8, 0])
+    workbook_path = tmp_path / "journal.xlsx"
+    wb.save(workbook_path)
+
+    sqlite_path = str(tmp_path / "store.sqlite3")
+    ingest_journal(
+        str(workbook_path),
+        journal_json_path=str(tmp_path / "journal.json"),
+        nutrition_json_path=None,
+        start_date="2025-06-30",
+        sqlite_path=sqlite_path,
+    )
+    with NutritionStore(sqlite_path) as store:
+        rows = store.journal_range("2025-07-01", "2025-07-01")
+        assert [r["Date"] for r in rows] == [
+            "2025-07-01T07:00:00",
+            "2025-07-01T19:00:00",
+        ]
+        assert [r["weight"] for r in rows] == [80.0, 81.0]
+
+        store.upsert_foods(SAMPLE_FOODS)
+        parser = FormulaParser(nutrition_list=store.load_nutrition_list())
+        assert store.refresh_daily_nutrients(parser) == {}
+        calories = [r["calories"] for r in store.daily_nutrients_range()]
+        assert calories == [52 + 2 * 89, 52]
+
+        df_model = prepare_model_inputs(pd.DataFrame(store.model_journal()))
+        assert list(df_model["Pds"]) == [80.0, 79.8]
+        assert list(df_model["Cals"]) == calories
+        assert list(df_model["Sport ajusté"]) == [300, 0]
@@ -0,0 +1,66 @@
+import sys
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from process_journal_food_sport_weight import process_date_column
+
+
+def test_process_date_column_offsets():
+    """Formulas add their offset to the row above, including sub-daily ones."""
+    df = pd.DataFrame(
+        {
+            "Date": [
+                datetime(2024, 6, 30),
+                "=A2+1",
+                "=A3+0",
+                "2024-07-10 08:00",
+                "=A5+0.5",
+                "=A6-0.25",
+                "=A7+1",
+                None,
+                "=A9+1",
+            ]
+        }
+    )
+    dates = process_date_column(df)["Date"]
+    assert list(dates[:7]) == [
+        pd.Timestamp("2024-06-30"),
+        pd.Timestamp("2024-07-01"),
+        pd.Timestamp("2024-07-01"),
+        pd.Timestamp("2024-07-10 08:00"),
+        pd.Timestamp("2024-07-10 20:00"),
+        pd.Timestamp("2024-07-10 14:00"),
+        pd.Timestamp("2024-07-11 14:00"),
+    ]
+    assert dates[7:].isna().all()
+
+    with pytest.raises(ValueError, match="first row"):
+        process_date_column(pd.DataFrame({"Date": ["=A1+1", "=A2+1"]}))
+    with pytest.raises(ValueError, match="row 2"):
+        process_date_column(pd.DataFrame({"Date": ["2024-06-30", "=A2+1", "x"]}))
+
+
+def test_bare_reference_is_the_next_day():
+    """A bare '=A5' is the day after the row above, as in the original extraction."""
+    df = pd.DataFrame(
+        {"Date": ["2024-06-30", "=A2", "=$A$3", "=A4 + 0", "=A5", "=TODAY()"]}
+    )
+    dates = process_date_column(df)["Date"]
+    assert list(dates) == list(
+        pd.to_datetime(
+            [
+                "2024-06-30",
+                "2024-07-01",
+                "2024-07-02",
+                "2024-07-02",
+                "2024-07-03",
+                "2024-07-04",
+            ]
+        )
+    )
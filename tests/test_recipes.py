@@ -0,0 +1,94 @@
+import sys
+import os
+import json
+import math
+
+import pytest
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from calculate_nutrition import FormulaParser
+from conftest import SAMPLE_FOODS
+from recipes import RecipeBook
+
+RECIPES = {
+    "Salade de fruits": "1 * Pomme + 1 * Banane",
+    "Brunch": "2 * Salade de fruits + 1 * Oeuf_au_plat",
+    "Oeufs brouilles": "2 * Oeuf_au_plat",
+}
+
+
+def test_recipes_are_matched_per_100g(sample_nutrition_path):
+    """Recipes, including nested ones, become per-100g foods of the parser."""
+    parser = FormulaParser(nutrition_data_path=sample_nutrition_path)
+    recomputed = RecipeBook(RECIPES).materialize(parser)
+    assert set(recomputed) == set(RECIPES)
+
+    salad = parser.calculate_nutrition_for_day("2 * salade de fruits", "2025-07-12")
+    assert math.isclose(salad.calories, 52 + 89)
+
+    brunch = parser.calculate_nutrition_for_day("3 * Brunch", "2025-07-12")
+    assert math.isclose(brunch.calories, 2 * (52 + 89) / 2 + 155)
+    assert math.isclose(brunch.protein, 0.3 + 1.1 + 13)
+
+
+def test_cycles_are_rejected(sample_nutrition_path):
+    """Recipes using each other in a loop raise a ValueError naming the cycle."""
+    parser = FormulaParser(nutrition_data_path=sample_nutrition_path)
+    book = RecipeBook({"Alpha": "1 * Beta + 1 * Pomme", "Beta": "1 * Alpha"})
+    with pytest.raises(ValueError, match="cycle"):
+        book.materialize(parser)
+
+
+def test_only_dependent_recipes_are_recomputed(sample_nutrition_path, tmp_path):
+    """Changing an ingredient row recomputes the recipes that use it, and only those."""
+    cache_path = str(tmp_path / "recipes_cache.json")
+    book = RecipeBook(RECIPES)
+
+    parser = FormulaParser(nutrition_data_path=sample_nutrition_path)
+    assert len(book.materialize(parser, cache_path)) == 3
+    parser = FormulaParser(nutrition_data_path=sample_nutrition_path)
+    assert book.materialize(parser, cache_path) == []
+
+    foods = [dict(item) for item in SAMPLE_FOODS]
+    foods[1]["Calories / 100g"] = 100  # Banane
+    with open(sample_nutrition_path, "w") as f:
+        json.dump(foods, f)
+
+    parser = FormulaParser(nutrition_data_path=sample_nutrition_path)
+    assert book.materialize(parser, cache_path) == ["Salade de fruits", "Brunch"]
+    brunch = parser.calculate_nutrition_for_day("3 * Brunch", "2025-07-12")
+    assert math.isclose(brunch.calories, 52 + 100 + 155)
+    eggs = parser.calculate_nutrition_for_day("Oeufs brouilles", "2025-07-12")
+    assert math.isclose(eggs.calories, 155)
+
+
+def test_constant_terms_are_not_quantities(sample_nutrition_path):
+    """A constant term adds calories to the recipe without adding to its weight."""
+    parser = FormulaParser(nutrition_data_path=sample_nutrition_path)
+    RecipeBook({"Salade au sirop": "1 * Pomme + 1 * Banane + 20"}).materialize(parser)
+
+    salad = parser.calculate_nutrition_for_day("2 * Salade au sirop", "2025-07-12")
+    assert math.isclose(salad.calories, 52 + 89 + 20)
+    assert math.isclose(salad.protein, 0.3 + 1.1)
+
+
+def test_failed_recipes_do_not_stay_resolvable(sample_nutrition_path):
+    """A recipe that fails leaves no placeholder behind; base names are not taken."""
+    parser = FormulaParser(nutrition_data_path=sample_nutrition_path)
+    book = RecipeBook({"Salade vide": "0 * Pomme", "Salade": "1 * Salade vide"})
+    with pytest.raises(ValueError, match="positive total quantity"):
+        book.materialize(parser)
+    for name in ("Salade vide", "Salade"):
+        with pytest.raises(ValueError, match="Undefined"):
+            parser.calculate_nutrition_for_day(f"1 * {name}", "2025-07-12")
+
+    with pytest.raises(ValueError, match="name of the food 'Pomme'"):
+        RecipeBook({"pomme": "1 * Banane"}).materialize(parser)
+    assert parser.calculate_nutrition_for_day("1 * Pomme", "").calories == 52
+
+    # Materializing again into the same parser replaces its own recipe rows.
+    book = RecipeBook(RECIPES)
+    book.materialize(parser)
+    assert book.materialize(parser) and "Brunch" in parser.nutrition_data
@@ -5,7 +5,12 @@ import math
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from process_journal_food_sport_weight import transform_sport_formula
+import pytest
+
+from process_journal_food_sport_weight import (
+    evaluate_sport_formula,
+    transform_sport_formula,
+)
 
 
 def test_empty_and_invalid_formulas():
@@ -14,12 +19,12 @@ def test_empty_and_invalid_formulas():
     assert transform_sport_formula("") == 0, "Empty string should return 0"
     assert transform_sport_formula(None) == 0, "None input should return 0"
     assert transform_sport_formula("   ") == 0, "Whitespace string should return 0"
-    assert transform_sport_formula("running(30) +") == 0, (
-        "Incomplete formula should return 0"
-    )
-    assert transform_sport_formula("unknown_function(10)") == 0, (
-        "Unknown function should return 0"
-    )
+    assert (
+        transform_sport_formula("running(30) +") == 0
+    ), "Incomplete formula should return 0"
+    assert (
+        transform_sport_formula("unknown_function(10)") == 0
+    ), "Unknown function should return 0"
     assert transform_sport_formula("10 / 0") == 0, "Division by zero should return 0"
     print("PASSED")
 
@@ -29,9 +34,9 @@ def test_simple_weight_lifting():
     print("Running test: test_simple_weight_lifting")
     # 10kg * 12 reps * 0.1 factor
     expected = 10 * 12 * 0.1
-    assert math.isclose(transform_sport_formula("10*12"), expected), (
-        "Simple weight lifting formula failed"
-    )
+    assert math.isclose(
+        transform_sport_formula("10*12"), expected
+    ), "Simple weight lifting formula failed"
     print("PASSED")
 
 
@@ -41,9 +46,9 @@ def test_complex_weight_lifting():
     # (14kg * 8 reps * 0.1) * 3 sets + (16kg * 8 reps * 0.1) * 2 sets
     formula = "14*8*3 + 16*8*2"
     expected = (14 * 8 * 0.1) * 3 + (16 * 8 * 0.1) * 2
-    assert math.isclose(transform_sport_formula(formula), expected), (
-        "Complex weight lifting formula failed"
-    )
+    assert math.isclose(
+        transform_sport_formula(formula), expected
+    ), "Complex weight lifting formula failed"
     print("PASSED")
 
 
@@ -52,15 +57,15 @@ def test_cardio_formulas():
     print("Running test: test_cardio_formulas")
     # running(30): 10 MET * 75kg * (30/60)h
     expected_running = 10.0 * 75.0 * (30.0 / 60.0)
-    assert math.isclose(transform_sport_formula("running(30)"), expected_running), (
-        "Running formula failed"
-    )
+    assert math.isclose(
+        transform_sport_formula("running(30)"), expected_running
+    ), "Running formula failed"
 
     # swimming(45): 8 MET * 75kg * (45/60)h
     expected_swimming = 8.0 * 75.0 * (45.0 / 60.0)
-    assert math.isclose(transform_sport_formula("swimming(45)"), expected_swimming), (
-        "Swimming formula failed"
-    )
+    assert math.isclose(
+        transform_sport_formula("swimming(45)"), expected_swimming
+    ), "Swimming formula failed"
     print("PASSED")
 
 
@@ -70,9 +75,9 @@ def test_mixed_activities():
     formula = "15*10 + running(20)"
     # (15kg * 10 reps * 0.1) + (10 MET * 75kg * (20/60)h)
     expected = (15 * 10 * 0.1) + (10.0 * 75.0 * (20.0 / 60.0))
-    assert math.isclose(transform_sport_formula(formula), expected), (
-        "Mixed activities formula failed"
-    )
+    assert math.isclose(
+        transform_sport_formula(formula), expected
+    ), "Mixed activities formula failed"
     print("PASSED")
 
 
@@ -82,9 +87,9 @@ def test_body_weight_variable():
     # The variable WEIGHT is 75.0
     formula = "F312 / 10"
     expected = 75.0 / 10.0
-    assert math.isclose(transform_sport_formula(formula), expected), (
-        "Body weight variable formula failed"
-    )
+    assert math.isclose(
+        transform_sport_formula(formula), expected
+    ), "Body weight variable formula failed"
     print("PASSED")
 
 
@@ -94,9 +99,9 @@ def test_float_values_in_formula():
     formula = "10.5*8.0 + running(22.5)"
     # (10.5kg * 8.0 reps * 0.1) + (10 MET * 75kg * (22.5/60)h)
     expected = (10.5 * 8.0 * 0.1) + (10.0 * 75.0 * (22.5 / 60.0))
-    assert math.isclose(transform_sport_formula(formula), expected), (
-        "Floating point formula failed"
-    )
+    assert math.isclose(
+        transform_sport_formula(formula), expected
+    ), "Floating point formula failed"
     print("PASSED")
 
 
@@ -122,12 +127,41 @@ def test_case_insensitivity():
     print("Running test: test_case_insensitivity")
     formula = "RuNnInG(30) + cycLinG_caLoRies(20)"
     expected = (10.0 * 75.0 * (30.0 / 60.0)) + (7.5 * 75.0 * (20.0 / 60.0))
-    assert math.isclose(transform_sport_formula(formula), expected), (
-        "Case-insensitive formula failed"
-    )
+    assert math.isclose(
+        transform_sport_formula(formula), expected
+    ), "Case-insensitive formula failed"
     print("PASSED")
 
 
+def test_evaluate_sport_formula_calories():
+    """Lifting sets of any rep count and float operands follow the same rules."""
+    cases = {
+        "10*12": 10 * 12 * 0.1,
+        "14*80": 14 * 80 * 0.1,
+        "14*8*3 + 16*8*2": (14 * 8 * 0.1) * 3 + (16 * 8 * 0.1) * 2,
+        "15*10 + running(20)": (15 * 10 * 0.1) + (10.0 * 75.0 * (20.0 / 60.0)),
+        "10.5*8.0 + running(22.5)": (10.5 * 8.0 * 0.1) + (10.0 * 75.0 * (22.5 / 60.0)),
+        "RuNnInG(30) + cycLinG_caLoRies(20)": (10.0 * 75.0 * 0.5)
+        + (7.5 * 75.0 * (20.0 / 60.0)),
+        "F312 / 10": 75.0 / 10.0,
+        "300": 300.0,
+        "": 0.0,
+        None: 0.0,
+    }
+    for formula, expected in cases.items():
+        assert math.isclose(evaluate_sport_formula(formula), expected), formula
+    # Transformed cells are evaluated alike, and WEIGHT is the day's weight.
+    assert math.isclose(
+        evaluate_sport_formula(transform_sport_formula("14*8*3")), 14 * 8 * 0.1 * 3
+    )
+    assert transform_sport_formula("10.5*8.0") == "10.5*8.0"
+    assert math.isclose(evaluate_sport_formula("F3 / 10", body_weight=80.0), 8.0)
+
+    for formula in ["running(30) +", "unknown_function(10)", "10 / 0"]:
+        with pytest.raises(ValueError):
+            evaluate_sport_formula(formula)
+
+
 if __name__ == "__main__":
     test_empty_and_invalid_formulas()
     test_simple_weight_lifting()
@@ -138,4 +172,5 @@ if __name__ == "__main__":
     test_float_values_in_formula()
     test_walking_and_cycling_calories()
     test_case_insensitivity()
+    test_evaluate_sport_formula_calories()
     print("\nAll sport formula tests passed successfully!")
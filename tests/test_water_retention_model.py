@@ -0,0 +1,104 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from water_retention_model import (
+    explain_water_retention,
+    fit_water_retention,
+    lagged_design,
+    predict_water_retention,
+)
+
+
+def test_lagged_design_matches_loop():
+    """Row t holds every driver at lags 0..n_lags, zero before the start."""
+    X = np.arange(20, dtype=float).reshape(10, 2)
+    expected = [
+        [X[t - k, j] if t - k >= 0 else 0.0 for j in range(2) for k in range(4)]
+        for t in range(10)
+    ]
+    assert np.array_equal(lagged_design(X, 3), expected)
+
+
+def test_recovers_lag_kernels():
+    """Known sodium and carbs kernels are recovered from noisy retention."""
+    rng = np.random.default_rng(0)
+    n = 3000
+    drivers = pd.DataFrame(
+        {
+            "sodium": rng.gamma(4, 600, n),
+            "carbs": rng.gamma(6, 40, n),
+            "alcohol": rng.exponential(5, n) * (rng.random(n) < 0.2),
+        }
+    )
+    lags = np.arange(8)
+    sodium_kernel = 1e-4 * np.exp(-lags / 2)
+    carbs_kernel = 2e-3 * np.exp(-lags / 3)
+    retention = (
+        np.convolve(drivers["sodium"], sodium_kernel)[:n]
+        + np.convolve(drivers["carbs"], carbs_kernel)[:n]
+        + rng.normal(0, 0.3, n)
+    )
+    retention[::50] = np.nan
+
+    components, kernels = fit_water_retention(retention, drivers, n_lags=7)
+
+    assert np.allclose(kernels["sodium"], sodium_kernel, atol=2e-5)
+    assert np.allclose(kernels["carbs"], carbs_kernel, atol=3e-4)
+    assert np.allclose(kernels["alcohol"], 0, atol=5e-3)
+    total = components["Explained"] + components["Unexplained"]
+    assert np.allclose(total, retention, equal_nan=True)
+    assert np.allclose(
+        predict_water_retention(kernels, drivers), components["Explained"]
+    )
+
+    results_df = pd.DataFrame(
+        {
+            "Timestamp": pd.date_range("2020-01-01", periods=n),
+            "Water_Retention": retention,
+        }
+    )
+    nutrients_df = drivers.set_index(results_df["Timestamp"]).iloc[::-1]
+    explained_df, _ = explain_water_retention(results_df, nutrients_df, n_lags=7)
+    assert np.allclose(explained_df["Water_Explained"], components["Explained"])
+
+
+def test_missing_and_repeated_days_keep_calendar_lags():
+    """Lags are calendar days even when result or nutrient days are missing or repeated."""
+    rng = np.random.default_rng(1)
+    n = 3000
+    dates = pd.date_range("2020-01-01", periods=n)
+    drivers = pd.DataFrame(
+        {"sodium": rng.gamma(4, 600, n), "carbs": rng.gamma(6, 40, n)}, index=dates
+    )
+    lags = np.arange(8)
+    sodium_kernel = 1e-4 * np.exp(-lags / 2)
+    carbs_kernel = 2e-3 * np.exp(-lags / 3)
+    retention = (
+        np.convolve(drivers["sodium"], sodium_kernel)[:n]
+        + np.convolve(drivers["carbs"], carbs_kernel)[:n]
+        + rng.normal(0, 0.05, n)
+    )
+    results_df = pd.DataFrame({"Timestamp": dates, "Water_Retention": retention})
+    # Some result days are missing, one is repeated, and days without nutrients
+    # still weigh on the retention of the days after.
+    results_df = results_df[rng.random(n) > 0.3]
+    results_df = pd.concat([results_df, results_df.iloc[[100]]])
+    nutrients_df = drivers[rng.random(n) > 0.03]
+
+    explained_df, kernels = explain_water_retention(
+        results_df, nutrients_df, drivers=["sodium", "carbs"], n_lags=7
+    )
+
+    assert np.allclose(kernels["sodium"], sodium_kernel, atol=5e-6)
+    assert np.allclose(kernels["carbs"], carbs_kernel, atol=5e-5)
+    assert len(explained_df) == len(results_df)
+    assert np.allclose(
+        explained_df["Water_Explained"] + explained_df["Water_Unexplained"],
+        results_df["Water_Retention"],
+    )
@@ -0,0 +1,184 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from run_new_model import (
+    B_BOUNDS,
+    daily_weight_samples,
+    fit_base_metabolism,
+    prepare_model_inputs,
+    run_new_weight_model,
+    simulate_weight,
+    weight_model_objective,
+)
+from scipy.optimize import minimize
+
+
+def make_journal(n_days, seed=0):
+    """Builds a synthetic journal whose weight follows the energy balance plus noise."""
+    rng = np.random.default_rng(seed)
+    true_B = 2300 + 150 * np.sin(np.arange(n_days) / 60)
+    C_in = rng.normal(2300, 300, n_days)
+    C_sport = rng.uniform(0, 400, n_days)
+    W = simulate_weight(80.0, C_in, C_sport, true_B) + rng.normal(0, 0.4, n_days)
+    return pd.DataFrame(
+        {
+            "Date": pd.date_range("2024-07-01", periods=n_days, freq="D"),
+            "Pds": W,
+            "Cals": C_in,
+            "Sport ajusté": C_sport,
+        }
+    )
+
+
+def test_fit_matches_bounded_optimizer():
+    """The banded solve reaches the same optimum as a bounded L-BFGS-B run."""
+    df = make_journal(200)
+    W, C_in, C_sport = (df[c].values for c in ("Pds", "Cals", "Sport ajusté"))
+
+    result = fit_base_metabolism(W, C_in, C_sport, lambda_val=1.0)
+    reference = minimize(
+        weight_model_objective,
+        np.full(len(W), 2000.0),
+        args=(W, C_in, C_sport, 1.0),
+        jac=True,
+        method="L-BFGS-B",
+        bounds=[B_BOUNDS] * len(W),
+        options={"maxiter": 20000, "ftol": 1e-12},
+    )
+
+    assert result.success
+    assert result.fun <= reference.fun * (1 + 1e-6)
+
+
+def test_bootstrap_bands_are_reproducible(tmp_path):
+    """Bands depend on the seed only, not on the number of worker processes."""
+    journal_path = tmp_path / "journal.json"
+    make_journal(120).to_json(journal_path, orient="records", date_format="iso")
+
+    in_process = run_new_weight_model(
+        str(journal_path), output_csv_path=None, n_bootstrap=40, n_workers=1, seed=3
+    )
+    pooled = run_new_weight_model(
+        str(journal_path), output_csv_path=None, n_bootstrap=40, n_workers=2, seed=3
+    )
+
+    for column in ("Base_Metabolism_q5", "Base_Metabolism_q95", "Water_Retention_q50"):
+        assert column in in_process.columns
+    pd.testing.assert_frame_equal(in_process, pooled)
+    assert (in_process["Base_Metabolism_q5"] <= in_process["Base_Metabolism_q95"]).all()
+
+
+def test_windowed_fit_is_continuous_and_close_to_global():
+    """Stitched windows stay close to the global fit without jumps at the seams."""
+    from windowed_weight_model import fit_base_metabolism_windowed, split_windows
+
+    df = make_journal(1500)
+    W, C_in, C_sport = (df[c].values for c in ("Pds", "Cals", "Sport ajusté"))
+
+    windows = split_windows(len(W), window_days=500, overlap_days=200)
+    assert windows[0][0] == 0 and windows[-1][1] == len(W)
+    assert all(b[0] < a[1] for a, b in zip(windows, windows[1:]))
+
+    B_global = fit_base_metabolism(W, C_in, C_sport).x
+    B, W_act = fit_base_metabolism_windowed(
+        W, C_in, C_sport, window_days=500, overlap_days=200, n_workers=2
+    )
+
+    assert np.sqrt(np.mean((B - B_global) ** 2)) < 15
+    assert np.max(np.abs(np.diff(W_act))) < 0.5
+    assert np.max(np.abs(np.diff(B[1:]))) < 20
+    # The reported weight is the weight of the reported metabolism.
+    assert np.allclose(W_act, simulate_weight(W[0], C_in, C_sport, B))
+
+
+def test_failed_window_fit_is_not_blended_in(monkeypatch):
+    """A window whose bounded fallback fails raises instead of being stitched in."""
+    import windowed_weight_model
+    from scipy.optimize import OptimizeResult
+
+    df = make_journal(300)
+    W, C_in, C_sport = (df[c].values for c in ("Pds", "Cals", "Sport ajusté"))
+    monkeypatch.setattr(
+        windowed_weight_model,
+        "solve_base_metabolism",
+        lambda W_obs, *args, **kwargs: (np.full(len(W_obs), 1e5), W_obs),
+    )
+    monkeypatch.setattr(
+        windowed_weight_model,
+        "fit_base_metabolism",
+        lambda *args, **kwargs: OptimizeResult(success=False, message="Stalled"),
+    )
+    with pytest.raises(ValueError, match="Stalled"):
+        windowed_weight_model.fit_base_metabolism_windowed(
+            W, C_in, C_sport, window_days=200, overlap_days=50, n_workers=1
+        )
+
+
+def test_sub_daily_records_and_within_day_fit(tmp_path):
+    """Sub-daily rows aggregate per day; within-day weigh-ins weight the fit."""
+    daily = make_journal(120, seed=3)
+    rng = np.random.default_rng(3)
+    weigh_ins = daily.loc[daily.index.repeat(rng.integers(1, 4, len(daily)))]
+    weigh_ins = weigh_ins.assign(
+        Date=weigh_ins["Date"]
+        + pd.to_timedelta(rng.uniform(6, 22, len(weigh_ins)), "h"),
+        Pds=weigh_ins["Pds"] + rng.normal(0, 0.3, len(weigh_ins)),
+        Cals=np.nan,
+        **{"Sport ajusté": np.nan},
+    )
+    meals = daily.loc[daily.index.repeat(2)].assign(Pds=np.nan)
+    meals["Cals"] /= 2
+    meals["Sport ajusté"] /= 2
+    records = pd.concat([meals, weigh_ins]).sample(frac=1, random_state=0)
+
+    df_model = prepare_model_inputs(records, weight_rule="morning")
+    first = weigh_ins.sort_values("Date").groupby(weigh_ins["Date"].dt.normalize())
+    assert len(df_model) == 120
+    assert np.allclose(df_model["Cals"], daily["Cals"])
+    assert np.allclose(df_model["Pds"], first["Pds"].first())
+    median = prepare_model_inputs(records, weight_rule="median")
+    assert np.allclose(median["Pds"], first["Pds"].median())
+
+    counts, means = daily_weight_samples(records, df_model.index)
+    assert np.array_equal(counts, first.size())
+    assert np.allclose(means, first["Pds"].mean())
+
+    # The weighted banded solve is the optimum of the weighted objective.
+    W, C_in, C_sport = means, df_model["Cals"].values, df_model["Sport ajusté"].values
+    result = fit_base_metabolism(W, C_in, C_sport, 1.0, obs_weights=counts)
+    _, gradient = weight_model_objective(result.x, W, C_in, C_sport, 1.0, counts)
+    assert np.abs(gradient).max() < 1e-6
+
+    path = tmp_path / "journal.json"
+    records.to_json(path, orient="records", date_format="iso")
+    results_df = run_new_weight_model(str(path), output_csv_path=None, within_day=True)
+    assert np.allclose(results_df["Base_Metabolism"], result.x)
+    assert np.allclose(results_df["Observed_Weight"], means)
+
+
+def test_within_day_fit_is_not_biased_by_evening_weigh_ins(tmp_path):
+    """An evening weigh-in 1 kg above the morning one biases neither B nor the water."""
+    daily = make_journal(120, seed=5)
+    daily["Pds"] = simulate_weight(
+        80.0, daily["Cals"].values, daily["Sport ajusté"].values, np.full(120, 2300.0)
+    )
+    evening = daily.assign(
+        Date=daily["Date"] + pd.Timedelta(hours=21),
+        Pds=daily["Pds"] + 1.0,
+        Cals=np.nan,
+        **{"Sport ajusté": np.nan},
+    )
+    morning = daily.assign(Date=daily["Date"] + pd.Timedelta(hours=7))
+    path = tmp_path / "journal.json"
+    pd.concat([morning, evening]).to_json(path, orient="records", date_format="iso")
+
+    results_df = run_new_weight_model(str(path), output_csv_path=None, within_day=True)
+    assert np.allclose(results_df["Base_Metabolism"], 2300, atol=1)
+    assert abs(results_df["Water_Retention"].mean()) < 0.01
@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+from scipy.linalg import solve
+from scipy.signal import fftconvolve
+
+# Default drivers, as in `Nutrient.to_dict()`
+WATER_DRIVERS = ["sodium", "carbs", "alcohol"]
+
+
+def lagged_design(drivers, n_lags, fill=0.0):
+    """
+    Lagged design matrix of daily drivers, without Python loops over days.
+
+    Column block j holds driver j at lags 0..n_lags, so row t is
+    [x_j(t), x_j(t-1), ..., x_j(t-n_lags)] for every driver. Rows are
+    consecutive days; days before the start of the series count as `fill`.
+
+    Args:
+        drivers (np.ndarray): Shape (n_days, n_drivers).
+        n_lags (int): Number of past days, besides the same day.
+        fill (float): Value of the days before the start, e.g. NaN to mark them
+            unknown.
+
+    Returns:
+        np.ndarray: Shape (n_days, n_drivers * (n_lags + 1)).
+    """
+    drivers = np.asarray(drivers, dtype=float)
+    n_days, n_drivers = drivers.shape
+    padded = np.vstack([np.full((n_lags, n_drivers), fill), drivers])
+    # windows[t, j, k] = padded[t + k, j]; reversed so that column k is lag k.
+    windows = np.lib.stride_tricks.sliding_window_view(padded, n_lags + 1, axis=0)
+    return windows[:, :, ::-1].reshape(n_days, n_drivers * (n_lags + 1))
+
+
+def fit_water_retention(
+    water_retention, drivers, n_lags=7, alpha=1e-3, smoothness=1e-2
+):
+    """
+    Explains water retention by distributed-lag kernels of daily drivers.
+
+    Models W_r(t) = c + sum_j sum_k h_j(k) x_j(t - k), with k from 0 to `n_lags`,
+    by regularized least squares: a ridge penalty on the kernels and a penalty on
+    their second differences along the lag axis, which keeps them smooth. Drivers
+    are centred and scaled, so the penalties do not depend on units; both are
+    relative to the number of days. The normal equations are only
+    n_drivers * (n_lags + 1) wide, so the fit is linear in the number of days.
+
+    Rows are consecutive calendar days (see `explain_water_retention` for dated
+    series with gaps). Days whose lag window reaches a missing driver value or
+    the days before the start are left out of the fit; their 'Explained' part
+    counts the unknown days as average ones, as `predict_water_retention` does.
+
+    Args:
+        water_retention (np.ndarray): Daily water retention, e.g. the model's
+            'Water_Retention'; NaN days are left out of the fit.
+        drivers (pd.DataFrame | dict): Daily drivers of the same length, e.g.
+            {"sodium": ..., "carbs": ..., "alcohol": ...}, NaN where unknown.
+        n_lags (int): Number of past days the kernels span.
+        alpha (float): Ridge penalty.
+        smoothness (float): Penalty on the second differences of the kernels.
+
+    Returns:
+        tuple: (components, kernels)
+            components (pd.DataFrame): 'Explained' and 'Unexplained' water
+                retention per day, summing to the input.
+            kernels (pd.DataFrame): Effect of one unit of each driver (column) on
+                the water retention of the days after (row = lag), with the
+                intercept in `kernels.attrs["intercept"]`.
+    """
+    y = np.asarray(water_retention, dtype=float)
+    drivers = pd.DataFrame(drivers)
+    names = list(drivers.columns)
+    X = drivers.to_numpy(dtype=float)
+
+    mean = np.nanmean(X, axis=0)
+    scale = np.nanstd(X, axis=0)
+    scale = np.where(scale > 0, scale, 1.0)
+    X = (X - mean) / scale
+
+    design = lagged_design(X, n_lags, fill=np.nan)
+    valid = ~np.isnan(y) & ~np.isnan(design).any(axis=1)
+    design = np.nan_to_num(design)
+    n_valid = max(int(valid.sum()), 1)
+    y_mean = y[valid].mean() if valid.any() else 0.0
+    y_centred = np.where(valid, y - y_mean, 0.0)
+
+    # Second differences along the lags, one block per driver.
+    width = n_lags + 1
+    second_difference = np.diff(np.eye(width), n=2, axis=0)
+    roughness = np.kron(np.eye(len(names)), second_difference.T @ second_difference)
+    gram = design[valid].T @ design[valid] / n_valid
+    gram += alpha * np.eye(gram.shape[0]) + smoothness * roughness
+    coefficients = solve(
+        gram, design[valid].T @ y_centred[valid] / n_valid, assume_a="pos"
+    )
+
+    kernel_matrix = coefficients.reshape(len(names), width).T / scale
+    intercept = float(y_mean - (kernel_matrix.sum(axis=0) * mean).sum())
+    explained = y_mean + design @ coefficients
+    components = pd.DataFrame({"Explained": explained, "Unexplained": y - explained})
+    kernels = pd.DataFrame(kernel_matrix, columns=names)
+    kernels.index.name = "Lag"
+    kernels.attrs["intercept"] = intercept
+    kernels.attrs["driver_means"] = dict(zip(names, mean.tolist()))
+    return components, kernels
+
+
+def predict_water_retention(kernels, drivers):
+    """
+    Water retention implied by fitted kernels for any daily drivers, e.g. a planned
+    week, by FFT convolution of each driver with its kernel.
+
+    As in the 'Explained' part of the fit, days before the first one (and missing
+    days) count as average days of the fitted period.
+    """
+    names = list(kernels.columns)
+    n_lags = len(kernels) - 1
+    means = np.array([kernels.attrs["driver_means"][name] for name in names])
+    drivers = pd.DataFrame(drivers)[names].to_numpy(dtype=float)
+    drivers = np.where(np.isnan(drivers), means, drivers)
+    padded = np.vstack([np.tile(means, (n_lags, 1)), drivers])
+
+    total = np.full(len(drivers), kernels.attrs["intercept"])
+    for j, name in enumerate(names):
+        convolved = fftconvolve(padded[:, j], kernels[name].to_numpy())
+        total += convolved[n_lags : n_lags + len(drivers)]
+    return total
+
+
+def explain_water_retention(results_df, nutrients_df, drivers=WATER_DRIVERS, **options):
+    """
+    Second stage of `run_new_weight_model`: splits its 'Water_Retention' into the
+    part explained by lagged nutrients and the rest.
+
+    Both inputs are put on a contiguous daily grid from the first to the last
+    result day, so that lags are calendar days even when days are missing or
+    repeated: repeated days are averaged, and days without nutrients are missing
+    drivers, which leave the days they reach out of the fit. The explained part of
+    each grid day is then mapped back to the result rows.
+
+    Args:
+        results_df (pd.DataFrame): Model results with 'Timestamp' and 'Water_Retention'.
+        nutrients_df (pd.DataFrame): Date-indexed daily nutrients with the driver
+            columns, e.g. `NutritionStore.daily_nutrients_range()` or
+            `RollupIndex.to_frame()`.
+        drivers (list): Driver columns.
+        **options: `fit_water_retention` options (n_lags, alpha, smoothness).
+
+    Returns:
+        tuple: (results_df with 'Water_Explained' and 'Water_Unexplained' columns,
+            kernels).
+    """
+    days = pd.DatetimeIndex(pd.to_datetime(results_df["Timestamp"])).normalize()
+    grid = pd.date_range(days.min(), days.max(), freq="D")
+    retention = (
+        results_df["Water_Retention"].groupby(days).mean().reindex(grid).to_numpy()
+    )
+    nutrients = nutrients_df[list(drivers)]
+    nutrients = nutrients.groupby(
+        pd.DatetimeIndex(pd.to_datetime(nutrients.index)).normalize()
+    ).mean()
+    components, kernels = fit_water_retention(
+        retention, nutrients.reindex(grid).reset_index(drop=True), **options
+    )
+    explained = components["Explained"].to_numpy()[grid.get_indexer(days)]
+    results_df = results_df.copy()
+    results_df["Water_Explained"] = explained
+    results_df["Water_Unexplained"] = results_df["Water_Retention"] - explained
+    return results_df, kernels
@@ -0,0 +1,190 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from run_new_model import (
+    B_BOUNDS,
+    fit_base_metabolism,
+    simulate_weight,
+    solve_base_metabolism,
+    weight_model_objective,
+)
+
+
+def split_windows(N, window_days=730, overlap_days=240):
+    """
+    Splits N days into overlapping [start, end) windows covering the whole timeline.
+
+    A trailing window shorter than twice the overlap is merged into the previous one.
+    """
+    if overlap_days >= window_days:
+        raise ValueError("overlap_days must be smaller than window_days.")
+    if N <= window_days:
+        return [(0, N)]
+
+    step = window_days - overlap_days
+    windows = []
+    start = 0
+    while start + window_days < N:
+        windows.append((start, start + window_days))
+        start += step
+    if N - start < 2 * overlap_days and windows:
+        windows[-1] = (windows[-1][0], N)
+    else:
+        windows.append((start, N))
+    return windows
+
+
+def _fit_window(args):
+    """
+    Fits one window; only the first window keeps the model's W_act(0) = W_obs(0) anchor.
+
+    The other windows start mid-history, where pinning the curve to a single noisy
+    weigh-in would bias B(t), so their starting weight is fitted as well.
+
+    Raises:
+        ValueError: If the bounded fallback fit fails.
+    """
+    W_obs, C_in, C_sport, lambda_val, anchor_first = args
+    B, W_act = solve_base_metabolism(
+        W_obs, C_in, C_sport, lambda_val, anchor_first=anchor_first
+    )
+    if np.any((B < B_BOUNDS[0]) | (B > B_BOUNDS[1])):
+        # Bounds are active: refine with the bounded optimizer from the fitted start.
+        W_anchored = np.concatenate(([W_act[0]], W_obs[1:]))
+        result = fit_base_metabolism(W_anchored, C_in, C_sport, lambda_val, initial_B=B)
+        if not result.success:
+            raise ValueError(f"Window fit failed: {result.message}")
+        B = result.x
+        W_act = simulate_weight(W_act[0], C_in, C_sport, B)
+    return B, W_act
+
+
+def _blend_weights(start, end, overlap_days, is_first, is_last):
+    """Linear ramps over the overlaps, so neighbouring windows hand over smoothly."""
+    t = np.arange(start, end)
+    weights = np.ones(end - start)
+    ramp = overlap_days + 1
+    if not is_first:
+        weights = np.minimum(weights, (t - start + 1) / ramp)
+    if not is_last:
+        weights = np.minimum(weights, (end - t) / ramp)
+    return weights
+
+
+def fit_base_metabolism_windowed(
+    W_obs,
+    C_in,
+    C_sport,
+    lambda_val=1.0,
+    window_days=730,
+    overlap_days=240,
+    n_workers=None,
+):
+    """
+    Fits B(t) window by window and stitches the windows back together.
+
+    Each window is an independent fit, so memory is bounded by the window size and the
+    windows are spread over a process pool. In the overlaps, B(t) is blended with
+    linear ramp weights, which keeps it continuous, and W_act(t) is the simulation of
+    the blended B(t) from the first window's starting weight, so both agree.
+
+    Args:
+        W_obs, C_in, C_sport (np.ndarray): Daily observed weight, calorie intake and sport calories.
+        lambda_val (float): Hyperparameter for L2 regularization on B(t) differences.
+        window_days (int): Length of each window in days.
+        overlap_days (int): Number of days shared by consecutive windows.
+        n_workers (int, optional): Worker processes; defaults to the CPU count, 1 runs in-process.
+
+    Returns:
+        tuple: (B, W_act), the stitched base metabolism and weight curve.
+
+    Raises:
+        ValueError: If the fit of a window fails.
+    """
+    W_obs = np.asarray(W_obs, dtype=float)
+    C_in = np.asarray(C_in, dtype=float)
+    C_sport = np.asarray(C_sport, dtype=float)
+
+    windows = split_windows(len(W_obs), window_days, overlap_days)
+    tasks = [
+        (W_obs[s:e], C_in[s:e], C_sport[s:e], lambda_val, i == 0)
+        for i, (s, e) in enumerate(windows)
+    ]
+    n_workers = min(n_workers or os.cpu_count() or 1, len(tasks))
+    if n_workers <= 1:
+        fits = [_fit_window(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            fits = list(executor.map(_fit_window, tasks))
+
+    B_sum = np.zeros(len(W_obs))
+    weight_sum = np.zeros(len(W_obs))
+    for i, ((s, e), (B, _)) in enumerate(zip(windows, fits)):
+        weights = _blend_weights(s, e, overlap_days, i == 0, i == len(windows) - 1)
+        B_sum[s:e] += weights * B
+        weight_sum[s:e] += weights
+    B = B_sum / weight_sum
+    return B, simulate_weight(fits[0][1][0], C_in, C_sport, B)
+
+
+def compare_with_global_fit(W_obs, C_in, C_sport, lambda_val=1.0, **window_options):
+    """
+    Measures how far the windowed fit is from the global fit, and how long each takes.
+
+    Returns:
+        dict: Wall-clock times, RMS and max differences of B(t) and Actual_Weight,
+              and the relative increase of the global objective.
+    """
+    t0 = time.perf_counter()
+    B_global = fit_base_metabolism(W_obs, C_in, C_sport, lambda_val).x
+    t1 = time.perf_counter()
+    B_windowed, W_windowed = fit_base_metabolism_windowed(
+        W_obs, C_in, C_sport, lambda_val, **window_options
+    )
+    t2 = time.perf_counter()
+
+    W_global = simulate_weight(W_obs[0], C_in, C_sport, B_global)
+    objective_global, _ = weight_model_objective(
+        B_global, W_obs, C_in, C_sport, lambda_val
+    )
+    objective_windowed, _ = weight_model_objective(
+        B_windowed, W_obs, C_in, C_sport, lambda_val
+    )
+    return {
+        "days": len(W_obs),
+        "global_seconds": t1 - t0,
+        "windowed_seconds": t2 - t1,
+        "B_rms_diff": float(np.sqrt(np.mean((B_windowed - B_global) ** 2))),
+        "B_max_diff": float(np.max(np.abs(B_windowed - B_global))),
+        "weight_rms_diff": float(np.sqrt(np.mean((W_windowed - W_global) ** 2))),
+        "weight_max_diff": float(np.max(np.abs(W_windowed - W_global))),
+        "objective_increase": float(objective_windowed / objective_global - 1),
+    }
+
+
+def _synthetic_journal(n_days, seed=0):
+    """Daily intake, sport and noisy weight following a slowly drifting B(t)."""
+    rng = np.random.default_rng(seed)
+    true_B = 2300 + 200 * np.sin(np.arange(n_days) / 120)
+    C_in = rng.normal(2300, 300, n_days)
+    C_sport = rng.uniform(0, 400, n_days)
+    W_obs = simulate_weight(80.0, C_in, C_sport, true_B) + rng.normal(0, 0.5, n_days)
+    return W_obs, C_in, C_sport
+
+
+if __name__ == "__main__":
+    print(
+        f"{'years':>5} {'days':>6} {'global s':>9} {'windowed s':>10} "
+        f"{'B rms':>7} {'B max':>7} {'W rms':>7} {'obj +%':>7}"
+    )
+    for years in (1, 5, 10, 20, 40):
+        stats = compare_with_global_fit(*_synthetic_journal(365 * years))
+        print(
+            f"{years:>5} {stats['days']:>6} {stats['global_seconds']:>9.4f} "
+            f"{stats['windowed_seconds']:>10.4f} {stats['B_rms_diff']:>7.2f} "
+            f"{stats['B_max_diff']:>7.2f} {stats['weight_rms_diff']:>7.3f} "
+            f"{100 * stats['objective_increase']:>7.3f}"
+        )